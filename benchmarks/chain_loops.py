@@ -0,0 +1,34 @@
+""" Chains the shuffled border loops of a piece with holes and prints how
+long it took. It runs outside of Blender: chain_loops only needs the vert
+and link_loop_next of the loops.
+
+    python benchmarks/chain_loops.py """
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mesh_islands
+
+class Loop:
+    __slots__ = ("vert", "link_loop_next")
+
+def benchmark(loop_counts=(5000, 50000), holes=3):
+    for loop_count in loop_counts:
+        loops = []
+        for hole in range(holes):
+            ring = [Loop() for _ in range(loop_count // holes)]
+            for i, loop in enumerate(ring):
+                loop.vert = (hole, i)
+                loop.link_loop_next = ring[(i + 1) % len(ring)]
+            loops += ring
+        random.Random(0).shuffle(loops)
+
+        start = time.perf_counter()
+        groups = mesh_islands.chain_loops(loops)
+        print(f"{len(loops)} border loops -> {len(groups)} outlines in {time.perf_counter() - start:.3f}s")
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,57 @@
+""" Cleans up a cut along the middle of a strip of quads, size edges long,
+and prints how long it took. Every other cut edge is too short and every
+50th edge across the strip is a seam, so the collapse and the delimit
+passes have work to do. Runs in Blender:
+
+    blender -b --python benchmarks/clean_up_knife_cut.py """
+import os
+import sys
+import time
+
+import bpy
+import bmesh
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import op_clean_up_edges
+
+def benchmark(sizes=(2000, 20000), rows=6):
+    for size in sizes:
+        bm = bmesh.new()
+        middle = rows // 2
+        grid = [
+            [bm.verts.new((x * 0.05 + (0.035 if y == middle and x % 2 else 0), y * 0.05, 0)) for y in range(rows + 1)]
+            for x in range(size + 1)
+        ]
+        for x in range(size):
+            for y in range(rows):
+                bm.faces.new((grid[x][y], grid[x + 1][y], grid[x + 1][y + 1], grid[x][y + 1]))
+        for x in range(size):
+            e = bm.edges.get((grid[x][middle], grid[x + 1][middle]))
+            e.select = True
+            for v in e.verts:
+                v.select = True
+        for x in range(0, size + 1, 50):
+            for y in range(rows):
+                bm.edges.get((grid[x][y], grid[x][y + 1])).seam = True
+
+        mesh = bpy.data.meshes.new("Clean up benchmark")
+        bm.to_mesh(mesh)
+        bm.free()
+        obj = bpy.data.objects.new(mesh.name, mesh)
+        bpy.context.scene.collection.objects.link(obj)
+        bpy.context.view_layer.objects.active = obj
+        obj.select_set(True)
+        bpy.ops.object.mode_set(mode='EDIT')
+
+        start = time.perf_counter()
+        bpy.ops.mesh.clean_up_knife_cut()
+        print(f"{size} cut edges: {time.perf_counter() - start:.3f}s")
+
+        bpy.ops.object.mode_set(mode='OBJECT')
+        bpy.data.objects.remove(obj)
+        bpy.data.meshes.remove(mesh)
+
+if __name__ == "__main__":
+    bpy.utils.register_class(op_clean_up_edges.CleanUpEdges)
+    benchmark()
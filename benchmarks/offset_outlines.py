@@ -0,0 +1,28 @@
+""" Offsets noisy circles of more and more points and prints how long it
+took, the time should grow about linearly.
+
+    python benchmarks/offset_outlines.py """
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import seam_allowance
+
+def benchmark(length=300.0, noise=0.5, distance=10.0):
+    rng = np.random.default_rng(0)
+    for count in (1000, 10000, 100000):
+        angle = np.linspace(0, 2 * np.pi, count, endpoint=False)
+        radius = length / (2 * np.pi) + rng.uniform(-noise, noise, count)
+        points = np.stack((radius * np.cos(angle), radius * np.sin(angle)), axis=1)
+        for join in ('ROUND', 'MITER'):
+            start = time.perf_counter()
+            result = seam_allowance.offset_outlines([points], distance, join)
+            print(f"{count} points, {join.lower()}: {sum(len(p) for p in result)} points "
+                  f"in {time.perf_counter() - start:.3f}s")
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,34 @@
+""" Remeshes a jittered grid over the unit square and prints how long it took.
+The array remesher doesn't need Blender.
+
+    python benchmarks/remesh_island.py """
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import remesh_core
+
+def benchmark(size=40, edge_length=0.02, iterations=10):
+    rng = np.random.default_rng(0)
+    x, y = np.meshgrid(np.linspace(0, 1, size), np.linspace(0, 1, size), indexing='ij')
+    co = np.stack((x.ravel(), y.ravel(), np.zeros(size * size)), axis=1)
+    inner = (co[:, 0] > 0) & (co[:, 0] < 1) & (co[:, 1] > 0) & (co[:, 1] < 1)
+    co[inner, :2] += rng.uniform(-0.3, 0.3, (inner.sum(), 2)) / size
+
+    corner = (np.arange(size - 1)[:, None] * size + np.arange(size - 1)[None, :]).ravel()
+    faces = np.concatenate((
+        np.stack((corner, corner + size, corner + size + 1), axis=1),
+        np.stack((corner, corner + size + 1, corner + 1), axis=1),
+    ))
+
+    start = time.perf_counter()
+    result = remesh_core.remesh_island({"co": co, "faces": faces}, {"edge_length": edge_length, "iterations": iterations})
+    print(f"{len(faces)} -> {len(result['faces'])} triangles in "
+          f"{result['iterations']} iterations, {time.perf_counter() - start:.3f}s")
+
+if __name__ == "__main__":
+    benchmark()
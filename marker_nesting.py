@@ -0,0 +1,254 @@
+import time
+import random
+import numpy as np
+
+# Nests sewing pattern pieces on a strip of fabric of a given width, as short
+# as possible: a cutting marker. The fabric runs down along y, the grain of
+# the pieces is their y axis, so unturned pieces follow the grain.
+#
+# Pieces are rasterized onto a grid of square cells. A piece goes to the
+# lowest spot where it doesn't touch anything placed so far (bottom left
+# fill). All spots are tested at once by correlating the piece with the
+# occupied cells through FFTs.
+
+# Quarter turns allowed for every rotation setting. Half turns keep the grain
+# line of a piece along the fabric
+rotation_turns = {
+    'NONE': (0,),
+    'GRAIN': (0, 2),
+    'ANY': (0, 1, 2, 3),
+}
+
+def turn(points, turns):
+    """ Turns points a quarter turns times, in the y-down document space """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    for _ in range(turns % 4):
+        points = np.stack((points[:, 1], -points[:, 0]), axis=1)
+    return points
+
+def polyline_bounds(polylines):
+    points = np.concatenate([np.asarray(p, dtype=np.float64).reshape(-1, 2) for p in polylines])
+    return points[:, 0].min(), points[:, 1].min(), points[:, 0].max(), points[:, 1].max()
+
+def rasterize(polylines, cell_size):
+    """ Cells covered by closed polylines, with coordinates starting at 0.
+
+    Cells are filled even-odd by their centers, the cells under the outlines
+    are always filled too, so thin parts don't fall through """
+    polylines = [np.asarray(p, dtype=np.float64).reshape(-1, 2) / cell_size for p in polylines]
+    extent = np.max([p.max(axis=0) for p in polylines], axis=0)
+    rows = int(np.floor(extent[1])) + 1
+    columns = int(np.floor(extent[0])) + 1
+
+    crossings = np.zeros((rows, columns + 1), dtype=np.int64)
+    mask = np.zeros((rows, columns), dtype=bool)
+    for p in polylines:
+        a = p
+        b = np.roll(p, -1, axis=0)
+
+        # Every edge crosses the centers of the rows with y0 <= row + 0.5 < y1
+        y0 = np.minimum(a[:, 1], b[:, 1])
+        y1 = np.maximum(a[:, 1], b[:, 1])
+        first = np.ceil(y0 - 0.5).astype(np.int64)
+        count = np.maximum(np.ceil(y1 - 0.5).astype(np.int64) - first, 0)
+        edge = np.repeat(np.arange(len(a)), count)
+        row = np.repeat(first, count) + np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)
+        t = (row + 0.5 - a[edge, 1]) / (b[edge, 1] - a[edge, 1])
+        x = a[edge, 0] + t * (b[edge, 0] - a[edge, 0])
+        column = np.clip(np.ceil(x - 0.5).astype(np.int64), 0, columns)
+        np.add.at(crossings, (np.clip(row, 0, rows - 1), column), 1)
+
+        # Samples along the outline, at most half a cell apart
+        length = np.abs(b - a).max(axis=1)
+        steps = np.ceil(length * 2).astype(np.int64) + 1
+        edge = np.repeat(np.arange(len(a)), steps)
+        t = (np.arange(steps.sum()) - np.repeat(np.cumsum(steps) - steps, steps)) / np.repeat(np.maximum(steps - 1, 1), steps)
+        samples = a[edge] + t[:, None] * (b[edge] - a[edge])
+        cells = np.clip(np.floor(samples).astype(np.int64), 0, (columns - 1, rows - 1))
+        mask[cells[:, 1], cells[:, 0]] = True
+
+    mask |= (np.cumsum(crossings, axis=1) % 2)[:, :columns].astype(bool)
+    return mask
+
+def fast_length(n):
+    """ Smallest length >= n with no prime factors above 5, FFTs are fast for those """
+    best = None
+    five = 1
+    while five < 2 * n:
+        three = five
+        while three < 2 * n:
+            two = three
+            while two < n:
+                two *= 2
+            if best is None or two < best:
+                best = two
+            three *= 3
+        five *= 5
+    return best
+
+def dilate(mask, radius):
+    """ Grows a mask by radius cells on every side, the result is 2 * radius bigger """
+    rows, columns = mask.shape
+    grown = np.zeros((rows + 2 * radius, columns), dtype=bool)
+    for i in range(2 * radius + 1):
+        grown[i:i + rows] |= mask
+    result = np.zeros((rows + 2 * radius, columns + 2 * radius), dtype=bool)
+    for i in range(2 * radius + 1):
+        result[:, i:i + columns] |= grown
+    return result
+
+# One piece in every orientation it may take, rasterized
+class NestingPiece:
+
+    def __init__(self, polylines, turns, cell_size, radius):
+        self.orientations = []
+        for t in turns:
+            turned = [turn(p, t) for p in polylines]
+            min_x, min_y, max_x, max_y = polyline_bounds(turned)
+            mask = rasterize([p - (min_x, min_y) for p in turned], cell_size)
+            self.orientations.append((t, mask, dilate(mask, radius)))
+        self.area = int(self.orientations[0][1].sum())
+
+# A strip of fabric, the occupied cells have a border of radius free cells
+# around them, so the grown pieces can stick out on the sides and the top
+class Strip:
+
+    def __init__(self, columns, radius, lookback):
+        self.columns = columns
+        self.radius = radius
+        self.lookback = lookback
+        self.cells = np.zeros((256, columns + 2 * radius), dtype=bool)
+        self.bottom = radius  # first row below everything placed
+
+    def reserve(self, rows):
+        if rows > len(self.cells):
+            cells = np.zeros((max(rows, 2 * len(self.cells)), self.cells.shape[1]), dtype=bool)
+            cells[:len(self.cells)] = self.cells
+            self.cells = cells
+
+    def find(self, piece):
+        """ Lowest, then leftmost, free spot for the piece, as (bottom, column, row, orientation) """
+        radius = self.radius
+        tallest = max(grown.shape[0] for _, _, grown in piece.orientations)
+
+        # Holes far above the bottom are not revisited, that keeps the searched
+        # window small however long the strip gets
+        start = max(0, self.bottom - self.lookback - tallest)
+        # Rows below the bottom are empty, so the window can take a few more
+        # to get a size that is fast to transform. Columns past the strip are
+        # padding that is never part of a valid spot
+        columns = self.cells.shape[1]
+        shape = (fast_length(self.bottom + tallest - start), fast_length(columns))
+        self.reserve(start + shape[0])
+        window_fft = np.fft.rfft2(self.cells[start:start + shape[0]].astype(np.float64), s=shape)
+
+        best = None
+        for index, (t, mask, grown) in enumerate(piece.orientations):
+            height, width = grown.shape
+            if width > columns:
+                continue
+            kernel = np.fft.rfft2(grown.astype(np.float64), s=shape)
+            overlap = np.fft.irfft2(window_fft * np.conj(kernel), s=shape)
+            # Only spots where the grown piece is inside of the strip are valid
+            free = overlap[:shape[0] - height + 1, :columns - width + 1] < 0.5
+            rows = np.nonzero(free.any(axis=1))[0]
+            if len(rows) == 0:
+                continue
+            row = rows[0]
+            column = int(np.argmax(free[row]))
+            found = (start + row + height, column, start + row, index)
+            if best is None or found[:2] < best[:2]:
+                best = found
+        return best
+
+    def snapshot(self, rows):
+        """ The state of the strip, without the rows more than rows above the
+        bottom: find never looks at those again. Cells are packed into bits """
+        first = max(0, self.bottom - rows)
+        return first, self.bottom, np.packbits(self.cells[first:self.bottom], axis=1)
+
+    def restore(self, snapshot):
+        first, bottom, packed = snapshot
+        self.reserve(bottom)
+        self.cells[:] = False
+        self.cells[first:bottom] = np.unpackbits(packed, axis=1, count=self.cells.shape[1]).astype(bool)
+        self.bottom = bottom
+
+    def place(self, piece, row, column, index):
+        t, mask, grown = piece.orientations[index]
+        top = row + self.radius
+        left = column + self.radius
+        self.reserve(top + mask.shape[0])
+        self.cells[top:top + mask.shape[0], left:left + mask.shape[1]] |= mask
+        self.bottom = max(self.bottom, top + mask.shape[0])
+
+def nest(pieces, width, rotation='GRAIN', cell_size=5.0, spacing=5.0, time_budget=5.0):
+    """ Nests pieces on a strip of fabric width wide. Every piece is a list of
+    closed polylines in document units.
+
+    Returns (placements, length, stats). A placement is (x, y, turns): the
+    piece is turned a quarter turns times, then moved so the corner of the
+    bounds of its polylines lands at x, y. Pieces wider than the fabric get
+    None. The first layout is always finished, the rest of time_budget
+    seconds is spent on swapping two pieces close in size. The pieces before
+    the swap keep their place, only the ones from the swap on are placed
+    again. stats has the number of attempts and improvements, the length
+    of the first layout and the seconds it all took """
+    start_time = time.perf_counter()
+    columns = int(np.floor(width / cell_size))
+    # The cells of a piece and its neighbors can both be a cell off
+    radius = int(np.ceil(spacing / cell_size)) + 1
+
+    rasters = [NestingPiece(polylines, rotation_turns[rotation], cell_size, radius) for polylines in pieces]
+    lookback = 2 * max((r.orientations[0][1].shape[0] for r in rasters), default=0)
+    # Rows of the strip that a search can still look at
+    window = lookback + max((grown.shape[0] for r in rasters for _, _, grown in r.orientations), default=0)
+
+    def layout(order, limit, first=0, previous=None):
+        """ Places the pieces in order, the ones before first where they are in
+        previous: the (placements, snapshots) of an order that starts the same.
+        Returns (placements, bottom, snapshots), snapshots[k] is the strip
+        before order[k] went in. Orders that get as long as limit are dropped,
+        their placements are None """
+        strip = Strip(columns, radius, lookback)
+        placements = [None] * len(rasters)
+        snapshots = []
+        if first:
+            previous_placements, previous_snapshots = previous
+            strip.restore(previous_snapshots[first])
+            snapshots = previous_snapshots[:first]
+            for i in order[:first]:
+                placements[i] = previous_placements[i]
+
+        for i in order[first:]:
+            snapshots.append(strip.snapshot(window))
+            found = strip.find(rasters[i])
+            if found is None:
+                continue
+            bottom, column, row, index = found
+            strip.place(rasters[i], row, column, index)
+            placements[i] = (column * cell_size, row * cell_size, rasters[i].orientations[index][0])
+            if strip.bottom >= limit:
+                return None, strip.bottom, None
+        return placements, strip.bottom, snapshots
+
+    # Big pieces first, the small ones fill the gaps they leave
+    order = sorted(range(len(rasters)), key=lambda i: -rasters[i].area)
+    best, bottom, snapshots = layout(order, float('inf'))
+    stats = {"attempts": 1, "improvements": 0, "first_length": float((bottom - radius) * cell_size)}
+
+    generator = random.Random(0)
+    while len(order) > 1 and time.perf_counter() - start_time < time_budget:
+        # Swap two pieces that are close in size
+        candidate = list(order)
+        i = generator.randrange(len(candidate) - 1)
+        j = min(len(candidate) - 1, i + 1 + generator.randrange(3))
+        candidate[i], candidate[j] = candidate[j], candidate[i]
+        placements, candidate_bottom, candidate_snapshots = layout(candidate, bottom, i, (best, snapshots))
+        stats["attempts"] += 1
+        if placements is not None and candidate_bottom < bottom:
+            best, bottom, order, snapshots = placements, candidate_bottom, candidate, candidate_snapshots
+            stats["improvements"] += 1
+
+    stats["seconds"] = time.perf_counter() - start_time
+    return best, float((bottom - radius) * cell_size), stats
@@ -0,0 +1,187 @@
+import heapq
+
+def face_islands(faces, delimit_seams=True):
+    """ Splits faces into islands of faces connected through shared edges.
+
+    Matches select_linked in face mode: with delimit_seams, seam edges don't
+    connect faces. Every face and edge is visited once, so this is linear in
+    the size of the mesh. Returns a list of sets of faces. """
+    remaining = set(faces)
+    islands = []
+
+    while remaining:
+        face = remaining.pop()
+        island = {face}
+        stack = [face]
+        while stack:
+            for edge in stack.pop().edges:
+                if delimit_seams and edge.seam:
+                    continue
+                for linked_face in edge.link_faces:
+                    if linked_face in remaining:
+                        remaining.remove(linked_face)
+                        island.add(linked_face)
+                        stack.append(linked_face)
+        islands.append(island)
+
+    return islands
+
+def boundary_edges(island):
+    """ Edges on the border of a set of faces, like region_to_loop """
+    edges = set()
+    for face in island:
+        for edge in face.edges:
+            if edge in edges:
+                continue
+            link_faces = edge.link_faces
+            if len(link_faces) == 1 or any(f not in island for f in link_faces):
+                edges.add(edge)
+    return edges
+
+def chain_loops(loops):
+    """ Chains loops that share a vertex into continuous outlines.
+
+    Loops may run in either direction, every outline starts with the first
+    unused loop and always continues with the first unused loop touching the
+    current end vertex. A vertex -> loops index keeps this linear in the
+    number of loops. Returns a list of lists of loops. """
+    vert_loops = {}
+    for position, loop in enumerate(loops):
+        vert_loops.setdefault(loop.vert, []).append(position)
+        vert_loops.setdefault(loop.link_loop_next.vert, []).append(position)
+
+    used = [False] * len(loops)
+    groups = []
+    start = 0
+
+    while True:
+        while start < len(loops) and used[start]:
+            start += 1
+        if start == len(loops):
+            break
+
+        used[start] = True
+        group = [loops[start]]
+        vertex_to_match = loops[start].link_loop_next.vert
+
+        while True:
+            candidates = vert_loops[vertex_to_match]
+            # Drop the used loops from the front, positions are in list order
+            while candidates and used[candidates[0]]:
+                candidates.pop(0)
+            if not candidates:
+                break
+
+            position = candidates.pop(0)
+            used[position] = True
+            loop = loops[position]
+            group.append(loop)
+            if loop.link_loop_next.vert == vertex_to_match:
+                vertex_to_match = loop.vert
+            else:
+                vertex_to_match = loop.link_loop_next.vert
+
+        groups.append(group)
+
+    return groups
+
+def wire_seam_groups(edges):
+    """ Maps every wire seam edge to the lowest edge index of the wire seams connected to it.
+
+    Edges positioned in a corner touch other wire edges, they all share the
+    same index. One union-find pass over the edges. """
+    parent = {}
+
+    def find(vert):
+        root = vert
+        while parent[root] != root:
+            root = parent[root]
+        while parent[vert] != root:
+            parent[vert], vert = root, parent[vert]
+        return root
+
+    wires = [e for e in edges if e.is_wire and e.seam]
+    for e in wires:
+        for v in e.verts:
+            parent.setdefault(v, v)
+        a = find(e.verts[0])
+        b = find(e.verts[1])
+        if a != b:
+            parent[a] = b
+
+    lowest = {}
+    for e in wires:
+        root = find(e.verts[0])
+        lowest[root] = min(lowest.get(root, e.index), e.index)
+
+    return {e: lowest[find(e.verts[0])] for e in wires}
+
+def collapse_short_edges(edge_verts, min_length):
+    """ Collapses the shortest edge until none is shorter than min_length, or one is left.
+
+    edge_verts is a list of (vert, vert). Collapsing an edge merges the groups of
+    verts at its ends into one group in the middle of them. A heap keeps the
+    edges sorted by length, entries that went stale because a group moved are
+    skipped when they come up. Returns a list of (position, verts) """
+    group_of = {}
+    positions = []
+    members = []
+    group_edges = []
+
+    def group(vert):
+        if vert not in group_of:
+            group_of[vert] = len(positions)
+            positions.append(vert.co.copy())
+            members.append([vert])
+            group_edges.append(set())
+        return group_of[vert]
+
+    ends = []
+    for i, (v1, v2) in enumerate(edge_verts):
+        g1 = group(v1)
+        g2 = group(v2)
+        ends.append((g1, g2))
+        group_edges[g1].add(i)
+        group_edges[g2].add(i)
+
+    version = [0] * len(ends)
+    alive = [True] * len(ends)
+    remaining = len(ends)
+    heap = [((positions[g1] - positions[g2]).length, i, 0) for i, (g1, g2) in enumerate(ends)]
+    heapq.heapify(heap)
+
+    while heap and remaining > 1:
+        length, i, entry_version = heapq.heappop(heap)
+        if not alive[i] or entry_version != version[i]:
+            continue
+        if length >= min_length:
+            break
+
+        g1, g2 = ends[i]
+        alive[i] = False
+        remaining -= 1
+
+        # The smaller group goes into the bigger one, so long runs of
+        # collapses don't copy the same verts and edges over and over
+        if len(members[g1]) < len(members[g2]):
+            g1, g2 = g2, g1
+        positions[g1] = (positions[g1] + positions[g2]) / 2
+        members[g1].extend(members[g2])
+        for j in group_edges[g2]:
+            ends[j] = tuple(g1 if g == g2 else g for g in ends[j])
+        edges = group_edges[g1]
+        edges |= group_edges[g2]
+        edges.discard(i)
+        members[g2] = group_edges[g2] = None
+
+        # The edges around the merged group changed length
+        for j in list(edges):
+            if ends[j][0] == ends[j][1]:
+                alive[j] = False
+                remaining -= 1
+                edges.discard(j)
+                continue
+            version[j] += 1
+            heapq.heappush(heap, ((positions[ends[j][0]] - positions[ends[j][1]]).length, j, version[j]))
+
+    return [(positions[g], members[g]) for g in range(len(positions)) if members[g] is not None]
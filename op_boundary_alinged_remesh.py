@@ -12,129 +12,110 @@
 
 import bpy
 import bmesh
-from mathutils import Vector
-from mathutils.bvhtree import BVHTree
-from mathutils.kdtree import KDTree
+import numpy as np
+from . import remesh_core
+from . import mesh_islands
 
-# Main Remesher class, this stores all the needed data
+# Main Remesher class. The remeshing itself happens in remesh_core, on arrays,
+# bmesh is only used to get the islands out of the mesh and to put them back.
 class BoundaryAlignedRemesher:
     
     def __init__(self, obj):
         self.obj = object
         self.bm = bmesh.new()
         self.bm.from_mesh(obj.data)
-        self.bvh = BVHTree.FromBMesh(self.bm)
-        
-        # Boundary_data is a list of directions and locations of boundaries.
-        # This data will serve as guidance for the alignment
-        self.boundary_data = []
-        
-        # Fill the data using boundary edges as source of directional data.
-        for edge in self.bm.edges:
-            if edge.is_boundary:
-                vec = (edge.verts[0].co - edge.verts[1].co).normalized()
-                center = (edge.verts[0].co + edge.verts[1].co) / 2
-                
-                self.boundary_data.append((center, vec))
-        
-        # Create a Kd Tree to easily locate the nearest boundary point
-        self.boundary_kd_tree = KDTree(len(self.boundary_data))
-        
-        for index, (center, vec) in enumerate(self.boundary_data):
-            self.boundary_kd_tree.insert(center, index)
-        
-        self.boundary_kd_tree.balance()
+        self.iterations_run = 0
     
-    def nearest_boundary_vector(self, location):
-        """ Gets the nearest boundary direction """
-        location, index, dist = self.boundary_kd_tree.find(location)
-        location, vec = self.boundary_data[index]
-        return vec
+    def split_islands(self):
+        """ Triangulates the mesh and splits it into islands of connected faces,
+        as the arrays remesh_core works on """
+        bm = self.bm
+        bmesh.ops.triangulate(bm, faces=bm.faces[:])
+        bm.verts.index_update()
+        bm.faces.index_update()
+        uv_layer = bm.loops.layers.uv.active
+        
+        islands = []
+        for island in mesh_islands.face_islands(bm.faces, delimit_seams=False):
+            faces = sorted(island, key=lambda f: f.index)
+            local = {}
+            for face in faces:
+                for vert in face.verts:
+                    local.setdefault(vert, len(local))
+            verts = list(local)
+            
+            islands.append({
+                "co": np.array([vert.co for vert in verts], dtype=np.float64).reshape(-1, 3),
+                "faces": np.array([[local[vert] for vert in face.verts] for face in faces], dtype=np.int64).reshape(-1, 3),
+                "uv": np.array([[loop[uv_layer].uv for loop in face.loops] for face in faces], dtype=np.float64).reshape(-1, 3, 2) if uv_layer else None,
+                "material": np.array([face.material_index for face in faces], dtype=np.int64),
+                # The edge of a loop runs to the next loop, like the half-edges of the arrays
+                "seam": np.array([[loop.edge.seam for loop in face.loops] for face in faces], dtype=bool).reshape(-1, 3),
+                # Wire edges are the sewing springs, their verts have to stay where they are
+                "pinned": np.array([any(edge.is_wire for edge in vert.link_edges) for vert in verts], dtype=bool),
+                "source": np.array([vert.index for vert in verts], dtype=np.int64),
+            })
+        return islands
     
-    def enforce_edge_length(self, edge_length=0.05, bias=0.333):
-        """ Replicates dyntopo behaviour """
-        upper_length = edge_length + edge_length * bias
-        lower_length = edge_length - edge_length * bias
-        
-        # Subdivide Long edges
-        subdivide = []
-        for edge in self.bm.edges:
-            if edge.calc_length() > upper_length:
-                subdivide.append(edge)
-        
-        bmesh.ops.subdivide_edges(self.bm, edges=subdivide, cuts=1)
-        bmesh.ops.triangulate(self.bm, faces=self.bm.faces)
-        
-        # Remove verts with less than 5 edges, this helps inprove mesh quality
-        dissolve_verts = []
-        for vert in self.bm.verts:
-            if len(vert.link_edges) < 5:
-                if not vert.is_boundary:
-                    dissolve_verts.append(vert)
-        
-        bmesh.ops.dissolve_verts(self.bm, verts=dissolve_verts)
-        bmesh.ops.triangulate(self.bm, faces=self.bm.faces)
-        
-        # Collapse short edges but ignore boundaries and never collapse two chained edges
-        lock_verts = set(vert for vert in self.bm.verts if vert.is_boundary)
-        collapse = []
-        
-        for edge in self.bm.edges:
-            if edge.calc_length() < lower_length and not edge.is_boundary:
-                verts = set(edge.verts)
-                if verts & lock_verts:
+    def join_islands(self, results):
+        """ Replaces the faces with the remeshed islands. Verts that are still
+        there are reused, so the wire edges stay connected """
+        bm = self.bm
+        old_verts = list(bm.verts)
+        bmesh.ops.delete(bm, geom=list(bm.faces), context="FACES")
+        uv_layer = bm.loops.layers.uv.active
+        
+        # Islands touching in a single vert share it
+        new_verts = {}
+        for result in results:
+            verts = []
+            for co, source in zip(result["co"].tolist(), result["source"].tolist()):
+                if source < 0:
+                    vert = bm.verts.new(co)
+                elif source in new_verts:
+                    vert = new_verts[source]
+                else:
+                    vert = old_verts[source] if old_verts[source].is_valid else bm.verts.new(co)
+                    vert.co = co
+                    new_verts[source] = vert
+                verts.append(vert)
+            
+            uvs = result["uv"].tolist() if result["uv"] is not None and uv_layer else None
+            for i, (face_verts, material, seams) in enumerate(zip(result["faces"].tolist(), result["material"].tolist(), result["seam"].tolist())):
+                try:
+                    face = bm.faces.new([verts[v] for v in face_verts])
+                except ValueError:
+                    # Face already exists
                     continue
-                collapse.append(edge)
-                lock_verts |= verts
-        
-        bmesh.ops.collapse(self.bm, edges=collapse, uvs=True)
-        bmesh.ops.beautify_fill(self.bm, faces=self.bm.faces, method="ANGLE")
-    
-    def align_verts(self, rule=(-1, -2, -3, -4)):
-        # Align verts to the nearest boundary by averaging neigbor vert locations selected
-        # by a specific rule,
-        
-        # Rules work by sorting edges by angle relative to the boundary.
-        # Eg1. (0, 1) stands for averagiing the biggest angle and the 2nd biggest angle edges.
-        # Eg2. (-1, -2, -3, -4), averages the four smallest angle edges
-        for vert in self.bm.verts:
-            if not vert.is_boundary:
-                vec = self.nearest_boundary_vector(vert.co)
-                neighbor_locations = [edge.other_vert(vert).co for edge in vert.link_edges]
-                best_locations = sorted(neighbor_locations, 
-                                        key = lambda n_loc: abs((n_loc - vert.co).normalized().dot(vec)))
-                co = vert.co.copy()
-                le = len(vert.link_edges)
-                for i in   rule:
-                    co += best_locations[i % le]
-                co /= len(rule) + 1
-                co -= vert.co
-                co -= co.dot(vert.normal) * vert.normal
-                vert.co += co
+                face.material_index = material
+                for corner, loop in enumerate(face.loops):
+                    if uvs:
+                        loop[uv_layer].uv = uvs[i][corner]
+                    if seams[corner]:
+                        loop.edge.seam = True
+        
+        bm.normal_update()
     
-    def reproject(self):
-        """ Recovers original shape """
-        for vert in self.bm.verts:
-            location, normal, index, dist = self.bvh.find_nearest(vert.co)
-            if location:
-                vert.co = location
-    
-    def remesh(self,edge_length=0.05, iterations=30, quads=True, reproject=True):
+    def remesh(self, edge_length=0.05, iterations=30, quads=True, reproject=True, direction_tolerance=0.1,
+               settle_tolerance=0.01, converge=False, workers=0, reproject_final_only=False, reproject_tolerance=0.0):
+        """ Coordenates remeshing, islands are remeshed in worker processes """
         wm = bpy.context.window_manager
         wm.progress_begin(0, 99)
-
-        """ Coordenates remeshing """
-        if quads:
-            rule = (-1,-2, 0, 1)
-        else:
-            rule = (0, 1, 2, 3)
         
-        for i in range(iterations):
-            wm.progress_update(i/iterations)
-            self.enforce_edge_length(edge_length=edge_length)
-            self.align_verts(rule=rule)
-            if reproject:
-                self.reproject()
+        settings = {
+            "edge_length": edge_length,
+            "iterations": iterations,
+            "quads": quads,
+            "reproject": reproject,
+            "direction_tolerance": direction_tolerance,
+            "settle_tolerance": settle_tolerance,
+            "converge": converge,
+            "reproject_final_only": reproject_final_only,
+            "reproject_tolerance": reproject_tolerance,
+        }
+        results = remesh_core.remesh_islands(self.split_islands(), settings, workers, progress=wm.progress_update)
+        self.join_islands(results)
+        self.iterations_run = max((result["iterations"] for result in results), default=0)
         
         if quads:
             bmesh.ops.join_triangles(self.bm, faces=self.bm.faces,
@@ -169,18 +150,49 @@ class Remesher(bpy.types.Operator):
         default=True
     )
     
+    reproject_final_only: bpy.props.BoolProperty(
+        name="Reproject Last Iteration Only",
+        description="Put the verts back on the original surface once, after the last iteration",
+        default=False
+    )
+    
+    reproject_tolerance: bpy.props.FloatProperty(
+        name="Reproject Tolerance",
+        description="Skip verts that moved less than this fraction of the edge length since they were last reprojected",
+        min=0,
+        default=0.0
+    )
+    
+    workers: bpy.props.IntProperty(
+        name="Workers",
+        description="Number of processes remeshing separate islands at the same time. 0 uses all cores, 1 remeshes them one after the other",
+        default=0,
+        min=0
+    )
+    
+    converge: bpy.props.BoolProperty(
+        name="Stop When Converged",
+        description="Stop before the last iteration once the edits, the vert movement and the edge lengths have settled",
+        default=False
+    )
+    
     def execute(self, context):
         obj = bpy.context.active_object
         print(f"Remeshing {obj.name}")
         
         remesher = BoundaryAlignedRemesher(obj)
         try:
-            bm = remesher.remesh(self.edge_length, self.iterations, self.quads, self.reproject)
+            bm = remesher.remesh(self.edge_length, self.iterations, self.quads, self.reproject,
+                                 converge=self.converge, workers=self.workers,
+                                 reproject_final_only=self.reproject_final_only,
+                                 reproject_tolerance=self.reproject_tolerance)
         except:
             self.report({'ERROR'}, "Remeshing failed, probably because there is a piece that can't be flattened out.\nThat usually means there are seams missing from a piece.")
             return {'CANCELLED'}
         bm.to_mesh(obj.data)
-        context.area.tag_redraw()
+        self.report({'INFO'}, f"Remeshed in at most {remesher.iterations_run} of {self.iterations} iterations per island")
+        if context.area:
+            context.area.tag_redraw()
         return {"FINISHED"}
 
 def draw(self, context):
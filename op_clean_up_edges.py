@@ -11,13 +11,46 @@ from bpy.props import (
     IntProperty,
 )
 
-class FakeEdge:
-  v1 = None
-  v2 = None
-
-class FakeVert:
-  pos = None
-  verts = None
+try:
+    from . import mesh_islands
+except ImportError:
+    # The benchmarks load this file as a top level module, outside of the add-on
+    import mesh_islands
+
+def grow_verts(verts, rings=1):
+    """ Verts reached by stepping over faces from verts, like select_more with face step.
+
+    Every ring only looks at the faces around the verts the previous ring
+    added. Returns a set of verts, including verts themselves """
+    reached = set(verts)
+    frontier = list(reached)
+    for _ in range(rings):
+        next_frontier = []
+        for v in frontier:
+            for f in v.link_faces:
+                for fv in f.verts:
+                    if fv not in reached:
+                        reached.add(fv)
+                        next_frontier.append(fv)
+        if not next_frontier:
+            break
+        frontier = next_frontier
+    return reached
+
+def region_boundary_verts(verts):
+    """ Verts on the outline of the faces that have all their verts in verts, like region_to_loop """
+    region = set()
+    for v in verts:
+        for f in v.link_faces:
+            if f not in region and all(fv in verts for fv in f.verts):
+                region.add(f)
+
+    boundary = set()
+    for f in region:
+        for e in f.edges:
+            if len(e.link_faces) == 1 or any(lf not in region for lf in e.link_faces):
+                boundary.update(e.verts)
+    return boundary
 
 class CleanUpEdges(bpy.types.Operator):
     """Clean up selected edges, for example after using the knife tool"""
@@ -92,22 +125,13 @@ class CleanUpEdges(bpy.types.Operator):
 
 
         if self.remove_poles_beforehand:
-            selection = list(filter(lambda e: e.select, bm.edges))
             #clean up possible non-manifold mesh parts
-            selected_verts = list(filter(lambda v: v.select, bm.verts))
-            bpy.ops.mesh.select_more(use_face_step=True)
-            neighboring_verts = list(filter(lambda v: v.select, bm.verts))
-            bpy.ops.mesh.select_mode(type="VERT")
-            bpy.ops.mesh.region_to_loop()
-            boundary_verts = list(filter(lambda v: v.select, bm.verts))
-            invalid_verts = list((set(neighboring_verts) - set(boundary_verts)) - set(selected_verts))
+            selected_verts = set(v for e in bm.edges if e.select for v in e.verts)
+            neighboring_verts = grow_verts(selected_verts)
+            boundary_verts = region_boundary_verts(neighboring_verts)
+            invalid_verts = list((neighboring_verts - boundary_verts) - selected_verts)
             bmesh.ops.dissolve_verts(bm, verts=invalid_verts)
-            bpy.ops.mesh.select_all(action='DESELECT')
-            bpy.ops.mesh.select_mode(type="EDGE")
-            for e in selection:
-                e.select = True
 
-        max_it = len(list(filter(lambda e: e.select, bm.edges)))
         edges = list(filter(lambda e: e.select, bm.edges))
 
         if self.delimit_intersections:
@@ -122,10 +146,11 @@ class CleanUpEdges(bpy.types.Operator):
                         break
 
         if self.delimit_existing_seams:
+            edge_set = set(edges)
             for e in edges:
                 for v in e.verts:
                     for le in v.link_edges:
-                        if le.seam and not (le in edges):
+                        if le.seam and not (le in edge_set):
                             e.select = False
                             break
 
@@ -139,60 +164,11 @@ class CleanUpEdges(bpy.types.Operator):
 
         edges = list(filter(lambda e: e.select, bm.edges))
 
-        fake_verts = dict()
-        for e in edges:
-            for v in e.verts:
-                fake_vert = FakeVert()
-                fake_vert = FakeVert()
-                fake_vert.verts = []
-                fake_vert.verts.append(v)
-                fake_vert.pos = v.co
-                fake_verts[v] = fake_vert
-
-        fake_vert_list = []
-        fake_vert_list.extend(fake_verts.values())
-
-        fake_edges = []
-        for e in edges:
-            fake_edge = FakeEdge()
-            fake_edge.v1 = fake_verts[e.link_loops[0].vert]
-            fake_edge.v2 = fake_verts[e.link_loops[0]. link_loop_next.vert]
-            fake_edges.append(fake_edge)
-
-        for _ in range(max_it):
-            if (len(fake_edges) <= 1):
-                break;
-            shortest = min(fake_edges, key=lambda e: (e.v1.pos - e.v2.pos).length)
-            if ((shortest.v1.pos - shortest.v2.pos).length < self.min_length):
-                fake_vert_list.remove(shortest.v1)
-                fake_vert_list.remove(shortest.v2)
-                new_fake_vert = FakeVert()
-                new_fake_vert.pos = (shortest.v1.pos + shortest.v2.pos)/2
-                new_fake_vert.verts = []
-                new_fake_vert.verts.extend(shortest.v1.verts)
-                new_fake_vert.verts.extend(shortest.v2.verts)
-                fake_vert_list.append(new_fake_vert)
-                fake_edges.remove(shortest)
-                for fe in fake_edges:
-                    if (fe.v1 is shortest.v1):
-                        fe.v1 = new_fake_vert
-                    if (fe.v2 is shortest.v2):
-                        fe.v2 = new_fake_vert
-                    if (fe.v1 is shortest.v2):
-                        fe.v1 = new_fake_vert
-                    if (fe.v2 is shortest.v1):
-                        fe.v2 = new_fake_vert
-
-        for fv in fake_vert_list:
-            for v in fv.verts:
-                v.co = fv.pos
-
-        fake_vert_list.clear()
-        fake_edges.clear()
-        fake_verts.clear()
-
-        bpy.ops.mesh.remove_doubles(threshold=0.0001)
-        bm = bmesh.from_edit_mesh(bpy.context.active_object.data)
+        for position, verts in mesh_islands.collapse_short_edges([tuple(e.verts) for e in edges], self.min_length):
+            for v in verts:
+                v.co = position
+
+        bmesh.ops.remove_doubles(bm, verts=[v for v in bm.verts if v.select], dist=0.0001)
 
         selection = list(filter(lambda e: e.select, bm.edges))
 
@@ -216,28 +192,31 @@ class CleanUpEdges(bpy.types.Operator):
                     v.co = v.co.lerp(avg_pos, 0.2)
         '''
 
-        for _ in range(self.neighbor_selection_radius):
-            bpy.ops.mesh.select_more(use_face_step=True)
+        # Verts of the cleaned up edges stay where they are
+        selection_verts = set(v for e in selection for v in e.verts)
 
-        if self.delimit_existing_seams:
-            sel = list(filter(lambda e: e.select, bm.edges))
-            for e in sel:
-                if e.seam:
-                    for v in e.verts:
-                        v.select = False
+        # The rings around the cut get selected, like select_more would
+        neighbors = grow_verts(selection_verts, self.neighbor_selection_radius)
+        for v in neighbors:
+            v.select = True
+        bm.select_flush(True)
 
+        if self.delimit_existing_seams:
+            seam_verts = set()
+            for v in neighbors:
+                for e in v.link_edges:
+                    if e.seam and e.other_vert(v) in neighbors:
+                        seam_verts.update(e.verts)
+            for v in seam_verts:
+                v.select = False
+            neighbors -= seam_verts
 
-        selected_verts = list(filter(lambda v: v.select, bm.verts))
         verts_to_smooth = []
 
-        for v in selected_verts:
-            if not(v.is_boundary and self.delimit_boundary):
-                verts_to_smooth.append(v)
-
-        for e in selection:
-            for v in e.verts:
-                while v in verts_to_smooth:
-                    verts_to_smooth.remove(v)
+        for v in neighbors:
+            if v not in selection_verts:
+                if not(v.is_boundary and self.delimit_boundary):
+                    verts_to_smooth.append(v)
 
         smoothing_factor = self.neighbor_smooth_factor
         smoothing_factor = pow(smoothing_factor, 4)
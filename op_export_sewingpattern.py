@@ -1,18 +1,30 @@
 import bpy
 from os.path import join, dirname
 import shutil
+import os
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from xml.sax.saxutils import escape
 from bpy.props import (
     StringProperty,
     EnumProperty,
-    IntProperty
+    IntProperty,
+    BoolProperty,
+    FloatProperty
 )
 import bmesh
 import mathutils
 import tempfile
 import math
+import time
 import xml.etree.ElementTree as ET
+from . import pdf_writer
+from . import pattern_svg
+from . import page_tiling
+from . import page_packing
+from . import marker_nesting
+from . import seam_allowance
+from . import mesh_islands
 
 page_formats = {
     "Letter": (22.0, 28.0),
@@ -70,6 +82,96 @@ class Export_Sewingpattern(bpy.types.Operator):
         min=0,
         subtype="PIXEL"
     )
+    coordinate_precision: IntProperty(
+        name="Coordinate precision",
+        description="Number of decimals written for coordinates, in millimeters",
+        default=3,
+        min=0,
+        max=8,
+    )
+    pdf_backend: EnumProperty(
+        items=(
+            ('VECTOR', "Vector", "Write the pattern outlines straight into the PDF pages. Fast, small and sharp"),
+            ('RASTER', "Raster (ImageMagick)", "Render the pages to images with ImageMagick's convert and identify tools"),
+        ),
+        name="PDF backend",
+        description="How the pages of the PDF file are generated",
+        default='VECTOR',
+    )
+    render_workers: IntProperty(
+        name="Render workers",
+        description="Number of ImageMagick processes the raster backend runs at the same time. 0 uses all cores",
+        default=0,
+        min=0,
+    )
+
+    allowance_width: FloatProperty(
+        name="Seam allowance",
+        description="Width of the seam allowance drawn around every piece, in millimeters. 0 leaves it out",
+        default=0.0,
+        min=0.0,
+    )
+    allowance_join: EnumProperty(
+        items=(
+            ('ROUND', "Round", "Round corners on the outside of the seam allowance"),
+            ('MITER', "Miter", "Sharp corners on the outside of the seam allowance, squared off when they get too long"),
+        ),
+        name="Allowance corners",
+        description="Shape of the corners of the seam allowance",
+        default='MITER',
+    )
+    objects: EnumProperty(
+        items=(
+            ('ACTIVE', "Active object", "Export the sewing pattern of the active object"),
+            ('SELECTED', "Selected objects", "Export the sewing patterns of all selected objects to one file"),
+        ),
+        name="Objects",
+        description="Objects to export",
+        default='ACTIVE',
+    )
+    layout: EnumProperty(
+        items=(
+            ('TILED', "Tiled", "Every piece is spread over the pages it covers"),
+            ('PACKED', "Packed", "Pieces are packed together onto shared pages, pieces bigger than a page are tiled. Always writes vector PDF pages"),
+            ('MARKER', "Fabric marker", "Pieces are nested on a strip of fabric, as short as possible, for cutting. Writes a single vector PDF page"),
+        ),
+        name="Layout",
+        description="How pieces are laid out",
+        default='TILED',
+    )
+    pack_rotation: BoolProperty(
+        name="Rotate pieces",
+        description="Allow turning pieces a quarter to pack them tighter",
+        default=True,
+    )
+    fabric_width: FloatProperty(
+        name="Fabric width",
+        description="Width of the fabric roll the marker is made for, in centimeters",
+        default=150.0,
+        min=1.0,
+    )
+    fabric_rotation: EnumProperty(
+        items=(
+            ('GRAIN', "Keep grain", "Pieces can be turned around, their grain line stays along the fabric"),
+            ('NONE', "None", "Pieces are never turned"),
+            ('ANY', "Quarter turns", "Pieces can be turned in quarter turns, ignoring the grain"),
+        ),
+        name="Fabric rotation",
+        description="How pieces may be turned on the fabric. The grain line of a piece is up in its UV layout",
+        default='GRAIN',
+    )
+    nesting_resolution: FloatProperty(
+        name="Nesting resolution",
+        description="Size of the grid cells pieces are nested on, in millimeters. Smaller is tighter but slower",
+        default=5.0,
+        min=0.5,
+    )
+    nesting_time: FloatProperty(
+        name="Nesting time",
+        description="Seconds spent on nesting. The first layout is always finished, the time left goes to swapping pieces to make the marker shorter",
+        default=5.0,
+        min=0.0,
+    )
 
     @classmethod
     def poll(cls, context):
@@ -101,37 +203,369 @@ class Export_Sewingpattern(bpy.types.Operator):
 
         filepath = self.filepath
         filepath = bpy.path.ensure_ext(filepath, "." + self.file_format.lower())
-        
-        if (self.alignment_markers == 'AUTO'):
-            self.auto_detect_markers()
+
+        objects = self.gather_objects(context)
+        if not objects:
+            self.report({'ERROR'}, "None of the selected objects is a sewing pattern")
+            return {'CANCELLED'}
+        selected = list(context.selected_objects)
 
         try:
             working_directory = tempfile.TemporaryDirectory() 
             svg_ouput_filepath = join(working_directory.name, "output.svg")
 
-            self.export(svg_ouput_filepath)
+            if len(objects) == 1 and self.layout == 'TILED':
+                # The export works on the selection, only the pattern the
+                # selection was narrowed down to may be in it
+                if self.objects == 'SELECTED':
+                    self.select_only(context, objects)
+                self.export_pattern(svg_ouput_filepath)
+                pdf_groups = None
+            else:
+                groups = []
+                # Marker numbers go on across the objects, so labels of
+                # different patterns in one document never clash
+                marker_indexes = {}
+                for index, pattern_obj in enumerate(objects):
+                    object_filepath = join(working_directory.name, f"object_{index + 1}.svg")
+                    self.select_only(context, [pattern_obj])
+                    self.export_pattern(object_filepath, marker_indexes)
+                    groups += pattern_svg.read_groups(object_filepath)[1]
+                if self.layout == 'MARKER':
+                    pdf_groups = self.write_marker_svg(groups, svg_ouput_filepath)
+                else:
+                    pdf_groups = self.write_merged_svg(groups, svg_ouput_filepath)
 
             if self.file_format == "SVG":
                 shutil.move(svg_ouput_filepath, filepath)
 
             if self.file_format == "PDF":
-                pdf_output_filepath = self.convert_svg_to_pdf(svg_ouput_filepath)
+                if self.layout == 'PACKED':
+                    pdf_output_filepath = self.write_packed_pdf(svg_ouput_filepath, *pdf_groups)
+                elif self.layout == 'MARKER':
+                    pdf_output_filepath = self.write_marker_pdf(svg_ouput_filepath, *pdf_groups)
+                else:
+                    pdf_output_filepath = self.convert_svg_to_pdf(svg_ouput_filepath)
                 shutil.move(pdf_output_filepath, filepath)
 
         finally:
             shutil.rmtree(working_directory.name)
+            if self.objects == 'SELECTED' or self.layout != 'TILED':
+                self.select_only(context, selected)
+                context.view_layer.objects.active = obj
 
         if is_editmode:
             bpy.ops.object.mode_set(mode='EDIT', toggle=False)
 
         return {'FINISHED'}
 
+    def gather_objects(self, context):
+        if self.objects == 'ACTIVE':
+            return [context.active_object]
+        # Only objects made by Seams to Sewing Pattern know their pattern scale
+        objects = [
+            obj for obj in context.selected_objects
+            if obj.type == 'MESH' and obj.data.uv_layers and "S2S_UVtoWORLDscale" in obj
+        ]
+        # The active object goes first, the rest in a stable order
+        return sorted(objects, key=lambda obj: (obj != context.active_object, obj.name))
+
+    def select_only(self, context, objects):
+        """ Edit mode and the operators work on every selected object """
+        for obj in context.selected_objects:
+            obj.select_set(False)
+        for obj in objects:
+            obj.select_set(True)
+        if objects:
+            context.view_layer.objects.active = objects[0]
+
+    def export_pattern(self, filepath, marker_indexes=None):
+        """ Exports the active object to an SVG file. Markers are numbered
+        on from the ones already in marker_indexes """
+        if (self.alignment_markers == 'AUTO'):
+            self.auto_detect_markers()
+
+        self.export(filepath, {} if marker_indexes is None else marker_indexes)
+
+    def page_size(self, dpi = 96):
+        """ Page size, page border and page overlap in millimeters """
+        page_width = page_formats[self.page_format][0] * 10.0
+        page_height = page_formats[self.page_format][1] * 10.0
+        return page_width, page_height, 50 / dpi * 25.4, self.page_overlap / dpi * 25.4
+
+    def write_merged_svg(self, groups, filepath):
+        """ Writes the groups of several objects to one SVG. With the packed layout
+        the pieces are packed first, every page is laid out next to the
+        previous one and pieces bigger than a page go below them.
+        Returns (pages, oversized): the groups on every page and the groups
+        that didn't fit on one """
+        groups = [group for group in groups if group.bounds() is not None]
+        pages = []
+        oversized = groups
+
+        if self.layout == 'PACKED':
+            page_width, page_height, border, overlap = self.page_size()
+            sizes = []
+            for group in groups:
+                min_x, min_y, max_x, max_y = group.bounds()
+                sizes.append((max_x - min_x, max_y - min_y))
+
+            start = time.perf_counter()
+            placements, page_count = page_packing.pack(
+                sizes, page_width - 2 * border, page_height - 2 * border, self.pack_rotation
+            )
+            if bpy.app.debug:
+                packed = sum(placement is not None for placement in placements)
+                print(f"Packed {packed} of {len(groups)} pieces onto {page_count} pages in {time.perf_counter() - start:.3f}s")
+
+            pages = [[] for _ in range(page_count)]
+            oversized = []
+            for group, placement in zip(groups, placements):
+                if placement is None:
+                    oversized.append(group)
+                    continue
+                page, x, y, rotated = placement
+                pages[page].append(group.placed(
+                    page * (page_width + page_packing.PIECE_SPACING) + border + x, border + y, 1 if rotated else 0
+                ))
+
+            # Pieces that need more than one page go in a row below the pages
+            x = 0.0
+            y = page_height + page_packing.PIECE_SPACING if pages else 0.0
+            for index, group in enumerate(oversized):
+                min_x, min_y, max_x, max_y = group.bounds()
+                oversized[index] = group.placed(x, y)
+                x += max_x - min_x + page_packing.PIECE_SPACING
+
+        else:
+            # Objects have their own UV space, they go next to each other
+            x = 0.0
+            for index, group in enumerate(oversized):
+                min_x, min_y, max_x, max_y = group.bounds()
+                oversized[index] = group.placed(x, min_y)
+                x += max_x - min_x + page_packing.PIECE_SPACING
+
+        placed = [group for page in pages for group in page] + oversized
+        width = max((group.bounds()[2] for group in placed), default=1.0)
+        height = max((group.bounds()[3] for group in placed), default=1.0)
+
+        with open(filepath, "w", buffering=1 << 20) as file:
+            svg = pattern_svg.SvgWriter(file, self.coordinate_precision)
+            svg.begin_document(width, height)
+            for group in placed:
+                svg.group(group)
+            svg.end_document()
+
+        return pages, oversized
+
     def convert_svg_to_pdf(self, svg_output_filepath, dpi = 96):
+        if self.pdf_backend == 'VECTOR':
+            return self.write_vector_pdf(svg_output_filepath, dpi)
+        return self.render_raster_pdf(svg_output_filepath, dpi)
+
+    def write_marker_svg(self, groups, filepath):
+        """ Nests the groups on a strip of fabric and writes the marker to an SVG.
+        Returns (width, length, groups) of the marker, pieces wider than the
+        fabric are left out """
+        groups = [group for group in groups if group.outlines]
+        width = self.fabric_width * 10.0
+        # Pieces are cut along their seam allowance when they have one
+        shapes = [group.allowances or group.outlines for group in groups]
+        placements, length, stats = marker_nesting.nest(
+            shapes, width, self.fabric_rotation,
+            self.nesting_resolution, page_packing.PIECE_SPACING, self.nesting_time
+        )
+        if bpy.app.debug:
+            print(f"Nested {len(shapes)} pieces on {length:.0f} of fabric ({stats['first_length']:.0f} at first)"
+                  f" in {stats['attempts']} attempts, {stats['seconds']:.3f}s")
+
+        placed = []
+        for group, shape, placement in zip(groups, shapes, placements):
+            if placement is None:
+                continue
+            x, y, turns = placement
+            # Nesting places the shapes, the rest of the group goes along
+            placed.append(group.placed(x, y, turns, marker_nesting.polyline_bounds(shape)))
+
+        if len(placed) < len(groups):
+            self.report({'WARNING'}, f"{len(groups) - len(placed)} pieces are wider than the fabric and were left out of the marker")
+
+        with open(filepath, "w", buffering=1 << 20) as file:
+            svg = pattern_svg.SvgWriter(file, self.coordinate_precision)
+            svg.begin_document(width, max(length, 1.0))
+            for group in placed:
+                svg.group(group)
+            svg.end_document()
+
+        return width, length, placed
+
+    def write_marker_pdf(self, svg_output_filepath, width, length, groups):
+        """ The whole marker on a single page, for plotters """
+        working_directory = dirname(svg_output_filepath)
+        scale = pdf_writer.POINTS_PER_MM
+
+        canvas = pdf_writer.PdfCanvas()
+        canvas.save_state()
+        canvas.transform(scale, 0, 0, -scale, 0, length * scale)
+        self.draw_pattern(
+            canvas,
+            [points for group in groups for points in group.outlines],
+            [guide for group in groups for guide in group.guides],
+            [label for group in groups for label in group.labels],
+            [points for group in groups for points in group.allowances],
+        )
+        canvas.restore_state()
+
+        pdf = pdf_writer.PdfDocument()
+        pdf.add_page(width * scale, max(length, 1.0) * scale, canvas)
+
+        pdf_output_filepath = join(working_directory, "output.pdf")
+        pdf.save(pdf_output_filepath)
+
+        return pdf_output_filepath
+
+    def write_vector_pdf(self, svg_output_filepath, dpi = 96):
+        working_directory = dirname(svg_output_filepath)
+
+        _, groups = pattern_svg.read_groups(svg_output_filepath)
+        pdf = pdf_writer.PdfDocument()
+        self.add_tiled_pages(pdf, groups, dpi)
+
+        pdf_output_filepath = join(working_directory, "output.pdf")
+        pdf.save(pdf_output_filepath)
+
+        return pdf_output_filepath
+
+    def add_tiled_pages(self, pdf, groups, dpi = 96, first_index = 0):
+        # The SVG document unit is the millimeter, so we tile in millimeters too.
+        # Overlap and border are given in pixels, like in the raster pipeline.
+        page_width, page_height, border, overlap = self.page_size(dpi)
+
+        scale = pdf_writer.POINTS_PER_MM
+        page_width_pt = page_width * scale
+        page_height_pt = page_height * scale
+
+        for group_index, group in enumerate(groups, start=first_index):
+            bounds = group.bounds()
+            if bounds is None:
+                continue
+
+            grid = page_tiling.TileGrid(bounds, page_width, page_height, overlap, border)
+
+            # Empty pages are never planned, to save on paper
+            for page in page_tiling.plan_pages(group, grid):
+                x, y, _, _ = grid.tile_rect(page.column, page.row)
+
+                canvas = pdf_writer.PdfCanvas()
+                canvas.save_state()
+                # Map the millimeter, y-down tile to the page, clipping everything outside of it
+                canvas.transform(scale, 0, 0, -scale, -x * scale, (y + page_height) * scale)
+                canvas.clip_rect(x, y, page_width, page_height)
+                self.draw_pattern(canvas, page.outlines, page.guides, page.labels, page.allowances)
+                canvas.restore_state()
+
+                self.draw_page_decorations(
+                    canvas, page_width_pt, page_height_pt,
+                    grid.step_x * scale, grid.step_y * scale,
+                    f" {group_index + 1} - {page.column + 1} X {page.row + 1}"
+                )
+
+                pdf.add_page(page_width_pt, page_height_pt, canvas)
+
+    def write_packed_pdf(self, svg_output_filepath, pages, oversized, dpi = 96):
+        """ One PDF page for every packed page, then the tiled pages of the
+        pieces that didn't fit on one """
+        working_directory = dirname(svg_output_filepath)
+        page_width, page_height, border, overlap = self.page_size(dpi)
+
+        scale = pdf_writer.POINTS_PER_MM
+        page_width_pt = page_width * scale
+        page_height_pt = page_height * scale
+
+        pdf = pdf_writer.PdfDocument()
+        for page_index, groups in enumerate(pages):
+            x = page_index * (page_width + page_packing.PIECE_SPACING)
+
+            canvas = pdf_writer.PdfCanvas()
+            canvas.save_state()
+            canvas.transform(scale, 0, 0, -scale, -x * scale, page_height * scale)
+            self.draw_pattern(
+                canvas,
+                [points for group in groups for points in group.outlines],
+                [guide for group in groups for guide in group.guides],
+                [label for group in groups for label in group.labels],
+                [points for group in groups for points in group.allowances],
+            )
+            canvas.restore_state()
+
+            # Caption in the bottom border, away from the pieces
+            caption = f"{page_index + 1}"
+            canvas.set_fill_color((0, 0, 0))
+            canvas.text((page_width_pt - pdf_writer.text_width(caption, 10)) / 2, border * scale / 3, caption, 10)
+
+            pdf.add_page(page_width_pt, page_height_pt, canvas)
+
+        self.add_tiled_pages(pdf, oversized, dpi, len(pages))
+
+        pdf_output_filepath = join(working_directory, "output.pdf")
+        pdf.save(pdf_output_filepath)
+
+        return pdf_output_filepath
+
+    def draw_pattern(self, canvas, outlines, guides, labels, allowances=()):
+        # Same styling as the SVG: .seam{stroke: #000; stroke-width:1px; fill:white} .allowance{stroke: #000; stroke-width:1px; fill:none} .sewinguide{stroke-width:1px;}
+        canvas.set_line_width(1)
+        if allowances:
+            canvas.set_stroke_color((0, 0, 0))
+            for points in allowances:
+                canvas.polyline(points, close=True)
+            canvas.stroke()
+
+        if outlines:
+            canvas.set_stroke_color((0, 0, 0))
+            canvas.set_fill_color((1, 1, 1))
+            for points in outlines:
+                canvas.polyline(points, close=True)
+            canvas.fill_stroke()
+
+        for color, points in guides:
+            canvas.set_stroke_color(pdf_writer.hex_to_rgb(color))
+            canvas.polyline(points)
+            canvas.stroke()
+
+        canvas.set_fill_color((0, 0, 0))
+        for label in labels:
+            x = label.x
+            y = label.y
+            if label.anchor == 'end':
+                x -= pdf_writer.text_width(label.text, label.size)
+            if label.baseline == 'hanging':
+                y += label.size * 0.72
+            canvas.text(x, y, label.text, label.size, flip=True)
+
+    def draw_page_decorations(self, canvas, page_width, page_height, overlap_x, overlap_y, caption):
+        # Overlap marker
+        canvas.set_line_width(0.75)
+        canvas.set_stroke_color((0, 0, 0))
+        canvas.line(overlap_x, page_height, overlap_x, page_height - overlap_y)
+        canvas.line(0, page_height - overlap_y, overlap_x, page_height - overlap_y)
+
+        # Caption to make the pages easier to sort
+        canvas.set_fill_color((0, 0, 0))
+        canvas.text((page_width - pdf_writer.text_width(caption, 18)) / 2, page_height / 2, caption, 18)
+
+    def render_raster_pdf(self, svg_output_filepath, dpi = 96):
         working_directory = dirname(svg_output_filepath)
 
         page_width = math.ceil(page_formats[self.page_format][0] / 2.54 * dpi)
         page_height = math.ceil(page_formats[self.page_format][1] / 2.54 * dpi)
 
+        page_width_with_overlap = page_width - self.page_overlap
+        page_height_with_overlap = page_height - self.page_overlap
+
+        # Pages are planned in document units (millimeters), then mapped to pixels
+        pixels_per_mm = dpi / 25.4
+
         # We split the SVG files into several parts, it will make things a lot easier
         # when we have to stich all the pages together
         svgs_filepaths = []
@@ -153,89 +587,109 @@ class Export_Sewingpattern(bpy.types.Operator):
 
             svgs_filepaths.append(svg_filepath)
 
-        pages_filepaths = []
-
-        for svg_index, svg_filepath in enumerate(svgs_filepaths):
-            # Convert the image to PNG, trim it and add a small border
-            png_output_filepath = join(working_directory, f"group_{svg_index + 1}.png")
-
-            self.run_convert([
-                svg_filepath,
-                "-trim", "+repage",
-                "-bordercolor", "white",
-                "-border", f"50x50",
-                png_output_filepath
-            ])
-
-            # Get the resulting image dimensions
-            pixel_width, pixel_height = self.run_identify(["-ping", "-format", "%w:%h", png_output_filepath]).split(':')
-
-            page_width_with_overlap = page_width - self.page_overlap
-            page_height_with_overlap = page_height - self.page_overlap
-
-            pages_horizontal_count = math.ceil(float(pixel_width) / page_width_with_overlap)
-            pages_vertical_count = math.ceil(float(pixel_height) / page_height_with_overlap)
-
-            # Resize the image with enough room on both sides
-            extended_width = (pages_horizontal_count + 1) * page_width_with_overlap
-            extended_height = (pages_vertical_count + 1) * page_height_with_overlap
-
-            self.run_convert([
-                png_output_filepath,
-                "-background", "white",
-                "-compose", "Copy",
-                "-extent", f'{extended_width}x{extended_height}',
-                png_output_filepath
-            ])
-
-            # Crop and generate all the pages
-            for page_y in range(0, pages_vertical_count):
-                for page_x in range(0, pages_horizontal_count):
-                    page_filepath = join(working_directory, f'page_{svg_index + 1}_{page_x + 1}_{page_y + 1}.png')
-
-                    x = page_x * page_width_with_overlap
-                    y = page_y * page_height_with_overlap
-
-                    # Crop the right part of the image, with the right overlap
-                    self.run_convert([
-                        png_output_filepath,
-                        "-crop", f'{page_width}x{page_height}+{x}+{y}',
-                        "+repage",
-                        page_filepath
-                    ])
-
-                    # Skip the page if it's all white, to save on paper
-                    if self.run_identify(["-format", "%[fx:100*mean]", page_filepath]) == "100":
-                        continue
+        _, pattern_groups = pattern_svg.read_groups(svg_output_filepath)
 
-                    # Add overlap marker
-                    self.run_convert([
-                        page_filepath,
-                        "-stroke", "black",
-                        "-draw", f"line {page_width_with_overlap},0 {page_width_with_overlap},{page_height_with_overlap}",
-                        "-draw", f"line 0,{page_height_with_overlap} {page_width_with_overlap},{page_height_with_overlap}",
-                        page_filepath
-                    ])
-
-                    # Add caption to the image to make them easier to sort
-                    self.run_convert([
-                        page_filepath,
-                        "-size", "140x",
-                        "-pointsize", "18",
-                        "-fill", "black",
-                        f"caption: {svg_index + 1} - {page_x + 1} X {page_y + 1}",
-                        "-gravity", "center",
-                        "-composite",
-                        page_filepath
-                    ])
+        # Plan every group first, this is cheap and decides which pages exist at all
+        group_jobs = []
 
-                    pages_filepaths.append(page_filepath)
+        for svg_index, svg_filepath in enumerate(svgs_filepaths):
+            pattern_group = pattern_groups[svg_index]
+            bounds = pattern_group.bounds()
+            if bounds is None:
+                continue
+
+            grid = page_tiling.TileGrid(
+                bounds,
+                page_width / pixels_per_mm, page_height / pixels_per_mm,
+                self.page_overlap / pixels_per_mm, 50 / pixels_per_mm
+            )
+
+            # Decide which pages have something on them before rendering anything,
+            # blank pages are skipped to save on paper
+            pages = page_tiling.plan_pages(pattern_group, grid)
+            if not pages:
+                continue
+
+            origin_x = round(grid.origin_x * pixels_per_mm)
+            origin_y = round(grid.origin_y * pixels_per_mm)
+            extended_width = (grid.columns - 1) * page_width_with_overlap + page_width
+            extended_height = (grid.rows - 1) * page_height_with_overlap + page_height
+
+            page_crops = []
+            for page in pages:
+                page_crops.append((
+                    join(working_directory, f'page_{svg_index + 1}_{page.column + 1}_{page.row + 1}.png'),
+                    page.column * page_width_with_overlap,
+                    page.row * page_height_with_overlap,
+                    f"caption: {svg_index + 1} - {page.column + 1} X {page.row + 1}"
+                ))
+
+            group_jobs.append((
+                svg_filepath, dpi,
+                f'{extended_width}x{extended_height}{origin_x:+d}{origin_y:+d}',
+                page_width, page_height,
+                page_width_with_overlap, page_height_with_overlap,
+                page_crops
+            ))
+
+        # Groups are independent of each other. Results come back in submission order,
+        # so the page order stays deterministic.
+        workers = self.render_workers or os.cpu_count() or 1
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            group_pages = list(executor.map(lambda job: self.render_group(*job), group_jobs))
+
+        pages_filepaths = [page_filepath for pages in group_pages for page_filepath in pages]
 
         pdf_output_filepath = join(working_directory, "output.pdf")
 
         self.run_convert(pages_filepaths + [ "-quality", "100", "-page", self.page_format, pdf_output_filepath ])
 
         return pdf_output_filepath
+
+    def render_group(self, svg_filepath, dpi, extent, page_width, page_height,
+                     page_width_with_overlap, page_height_with_overlap, page_crops):
+        # A single convert run renders the group once, keeps it in memory
+        # and cuts every page out of it
+        args = [
+            "-respect-parentheses",
+            # Convert the image, cropped to the page grid with enough room on both sides
+            "-density", str(dpi),
+            "-background", "white",
+            svg_filepath,
+            "-flatten",
+            "-compose", "Copy",
+            "-extent", extent,
+            "+repage",
+            "-write", "mpr:group",
+            "+delete",
+        ]
+
+        for page_filepath, x, y, caption in page_crops:
+            args += [
+                "(",
+                "mpr:group",
+                # Crop the right part of the image, with the right overlap
+                "-crop", f'{page_width}x{page_height}+{x}+{y}',
+                "+repage",
+                # Add overlap marker
+                "-stroke", "black",
+                "-draw", f"line {page_width_with_overlap},0 {page_width_with_overlap},{page_height_with_overlap}",
+                "-draw", f"line 0,{page_height_with_overlap} {page_width_with_overlap},{page_height_with_overlap}",
+                "+stroke",
+                # Add caption to the image to make them easier to sort
+                "(", "-size", "140x", "-pointsize", "18", "-fill", "black", caption, ")",
+                "-gravity", "center",
+                "-compose", "Over",
+                "-composite",
+                "-write", page_filepath,
+                "+delete",
+                ")",
+            ]
+
+        args.append("null:")
+        self.run_convert(args)
+
+        return [page_filepath for page_filepath, x, y, caption in page_crops]
     
     def run_convert(self, args):
         print(args)
@@ -243,15 +697,7 @@ class Export_Sewingpattern(bpy.types.Operator):
         completed = subprocess.run(["convert"] + args)
         print(completed)
 
-    def run_identify(self, args):
-        print(args)
-
-        completed = subprocess.run(["identify"] + args, stdout=subprocess.PIPE)
-        print(completed)
-
-        return completed.stdout.decode("ascii")
-
-    def export(self, filepath):
+    def export(self, filepath, marker_indexes):
         #get loops:
         bpy.ops.object.mode_set(mode='EDIT')
         bpy.ops.mesh.select_mode(type="FACE")
@@ -263,110 +709,75 @@ class Export_Sewingpattern(bpy.types.Operator):
         document_scale = 1000.0 #millimeter
         document_scale *= obj["S2S_UVtoWORLDscale"]
 
-        svgstring = '<svg xmlns="http://www.w3.org/2000/svg"\n viewBox="0 0 ' + str(document_scale) + ' ' + str(document_scale) +'"\n'
-        svgstring += 'width="' + str(document_scale) + 'mm" height="' + str(document_scale) + 'mm">'
-        #svgstring += '<!-- Exported using the Seams to Sewing pattern for Blender  -->'
-        svgstring += '\n<defs><style>.seam{stroke: #000; stroke-width:1px; fill:white} .sewinguide{stroke-width:1px;}</style></defs>'
-
-        face_groups = []
-        faces = set(bm.faces[:])
-        while faces:
-            bpy.ops.mesh.select_all(action='DESELECT')
-            face = faces.pop()
-            face.select = True
-            bpy.ops.mesh.select_linked()
-            selected_faces = {f for f in faces if f.select}
-            selected_faces.add(face) # this or bm.faces above?
-            face_groups.append(selected_faces)
-            faces -= selected_faces
+        face_groups = mesh_islands.face_islands(bm.faces)
 
         print('Loop groups for sewing pattern export: ' + str(len(face_groups)))
 
-        marker_indexes = {}
+        # Edges positioned in a corner touch another wire edge, they all share
+        # the minimal index of the edges in this corner
+        marker_edge_groups = {}
+        if (self.alignment_markers != 'OFF'):
+            marker_edge_groups = mesh_islands.wire_seam_groups(bm.edges)
 
-        for fg in face_groups:
+        uv_layer = bm.loops.layers.uv.active
 
-            bpy.ops.mesh.select_all(action='DESELECT')
-            for f in fg:
-                f.select = True
+        # Every island is written as soon as it's processed, through a buffered file
+        with open(filepath, "w", buffering=1 << 20) as file:
+            svg = pattern_svg.SvgWriter(file, self.coordinate_precision)
+            svg.begin_document(document_scale)
 
-            bpy.ops.mesh.region_to_loop()
+            for fg in face_groups:
 
-            boundary_loop = [e for e in bm.edges if e.select]
-    
-            relevant_loops=[]
+                # Same order as walking bm.edges, so the output stays stable
+                boundary_loop = sorted(mesh_islands.boundary_edges(fg), key=lambda e: e.index)
 
-            for e in boundary_loop:
-                relevant_loops.append(e.link_loops[0])
-        
-            loop_groups = [[]]
-
-            while (len(relevant_loops) > 0):
-                temp_group = [relevant_loops[0]]
-                vertex_to_match = relevant_loops[0].link_loop_next.vert
-                relevant_loops.remove(relevant_loops[0])
-                match = True
-                while(match == True):
-                    match = False
-                    for x in range(0, len(relevant_loops)):
-                        if (relevant_loops[x].link_loop_next.vert == vertex_to_match):
-                            temp_group.append(relevant_loops[x])
-                            vertex_to_match = relevant_loops[x].vert
-                            relevant_loops.remove(relevant_loops[x])
-                            match = True
-                            break
-                        if (relevant_loops[x].vert == vertex_to_match):
-                            temp_group.append(relevant_loops[x])
-                            vertex_to_match = relevant_loops[x].link_loop_next.vert
-                            relevant_loops.remove(relevant_loops[x])
-                            match = True
-                            break
-                loop_groups.append(temp_group)
-
-            uv_layer = bm.loops.layers.uv.active
-            
-            #print border
-
-            svgstring += '\n<g>'
-            svgstring += '<path class="seam" d="'
-
-            for lg in loop_groups:
-                if (len(lg) == 0):
-                    continue
-                lg.append(lg[0])
-
-                svgstring += 'M '
-
-                for l in lg:
-                    uv = l[uv_layer].uv.copy()
-                    svgstring += str(uv.x*document_scale)
-                    svgstring += ','
-                    svgstring += str((1-uv.y)*document_scale)
-                    svgstring += ' '
-
-            svgstring += '"/>'
-            
-            #print markers
-            for lg in loop_groups:
-                #markers
-                if (self.alignment_markers != 'OFF'):
-                    for l in lg:
-                        has_wire = False
-                        for w in l.vert.link_edges:
-                            if w.is_wire and w.seam:
-                                has_wire = True
-                                svgstring += self.add_alignment_marker(l, w, uv_layer, document_scale, marker_indexes)
-
-            svgstring += '</g>'
-
-        svgstring += '\n</svg>'
-        
-        with open(filepath, "w") as file:
-            file.write(svgstring)
+                relevant_loops=[]
+
+                for e in boundary_loop:
+                    relevant_loops.append(e.link_loops[0])
+
+                loop_groups = mesh_islands.chain_loops(relevant_loops)
+
+                #print border
+
+                svg.begin_group()
+
+                outlines = []
+                for lg in loop_groups:
+                    if (len(lg) == 0):
+                        continue
+                    lg.append(lg[0])
+
+                    outlines.append([
+                        (l[uv_layer].uv.x * document_scale, (1 - l[uv_layer].uv.y) * document_scale)
+                        for l in lg
+                    ])
+
+                if self.allowance_width > 0:
+                    svg.allowance(seam_allowance.offset_outlines(
+                        outlines, self.allowance_width, self.allowance_join
+                    ))
+
+                svg.seam(outlines)
+
+                #print markers
+                for lg in loop_groups:
+                    #markers
+                    if (self.alignment_markers != 'OFF'):
+                        for l in lg:
+                            has_wire = False
+                            for w in l.vert.link_edges:
+                                if w.is_wire and w.seam:
+                                    has_wire = True
+                                    self.add_alignment_marker(svg, obj, l, w, uv_layer, document_scale, marker_indexes, marker_edge_groups)
+
+                svg.end_group()
+
+            svg.end_document()
 
         bpy.ops.object.mode_set(mode='OBJECT')
         
-    def add_alignment_marker(self, loop, wire, uv_layer, document_scale, marker_indexes):
+    def add_alignment_marker(self, svg, obj, loop, wire, uv_layer, document_scale, marker_indexes, marker_edge_groups):
         wire_dir = mathutils.Vector((0,0));
         for l in loop.vert.link_edges:
             if (len(l.link_loops) > 0 and len(l.link_faces) == 1):
@@ -389,22 +800,16 @@ class Export_Sewingpattern(bpy.types.Operator):
         sew_color.hsv = color_hash, 1, 1
         sew_color_hex = "#%.2x%.2x%.2x" % (int(sew_color.r * 255), int(sew_color.g * 255), int(sew_color.b * 255))
         
-        returnstring = '<path class="sewinguide" stroke="' + sew_color_hex + '" d="M '
         uv1 = loop[uv_layer].uv.copy();
         uv1.y = 1-uv1.y;
-        returnstring += str((uv1.x + wire_dir.x) * document_scale)
-        returnstring += ','
-        returnstring += str((uv1.y + wire_dir.y) * document_scale)
-        returnstring += ' '
-    
-        returnstring += str((uv1.x) * document_scale)
-        returnstring += ','
-        returnstring += str((uv1.y) * document_scale)
-        returnstring += ' '
-        returnstring += '"/>\n'  
+        svg.sewing_guide(sew_color_hex, [
+            ((uv1.x + wire_dir.x) * document_scale, (uv1.y + wire_dir.y) * document_scale),
+            ((uv1.x) * document_scale, (uv1.y) * document_scale),
+        ])
 
         # Add here wire index text
-        edge_index = self.get_edge_index(wire)
+        # Edge indexes are only unique within an object
+        edge_index = (obj.name, marker_edge_groups[wire])
         if(edge_index in marker_indexes):
             wire_index = marker_indexes[edge_index]
         else:
@@ -417,42 +822,12 @@ class Export_Sewingpattern(bpy.types.Operator):
         baseline = ''
         if(uv1.y + wire_dir.y > uv1.y - wire_dir.y):
             baseline = 'dominant-baseline="hanging"'
-        returnstring += '<text x="'
-        returnstring += str((uv1.x + wire_dir.x) * document_scale)
-        returnstring += '" y="'
-        returnstring += str((uv1.y + wire_dir.y) * document_scale)
-        returnstring += '" class="sewinguidetext" ' + anchor + ' ' + baseline
-        returnstring += ' font-size="' + str(int(0.008 * document_scale))+ 'px">'
-        returnstring += str(wire_index)
-        returnstring += '</text>\n'
-        
-        return returnstring
+        svg.label(
+            (uv1.x + wire_dir.x) * document_scale,
+            (uv1.y + wire_dir.y) * document_scale,
+            str(wire_index), int(0.008 * document_scale), anchor, baseline
+        )
 
-    # Get edge index. Edge positionned in a corned touch another wire edge.
-    # So we get the minimal index of all edges in this corner.
-    def get_edge_index(self, wire):
-
-        def get_vert_wires(v):
-            return [e for e in v.link_edges if e.is_wire and e.seam]
-
-        def get_linked_edges(e):
-            return get_vert_wires(e.verts[0]) + get_vert_wires(e.verts[1])
-
-        def get_all_linked_edges(e, linked_edges):
-            for e in get_linked_edges(e):
-                if not e in linked_edges:
-                    linked_edges.append(e)
-                    get_all_linked_edges(e, linked_edges)
-
-        min_index = wire.index
-        all_linked_edges = []
-        get_all_linked_edges(wire, all_linked_edges)
-        for e in all_linked_edges:
-            if(e.index < min_index):
-                min_index = e.index
-
-        return min_index
-        
     def auto_detect_markers(self):
         bpy.ops.object.mode_set(mode='EDIT')
         bpy.ops.mesh.select_mode(type="EDGE")
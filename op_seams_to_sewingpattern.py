@@ -4,6 +4,8 @@ from bpy.types import Operator
 import bmesh
 import mathutils
 import math
+import time
+import numpy as np
 from bpy.props import (
     BoolProperty,
     IntProperty,
@@ -17,6 +19,14 @@ elif bpy.app.version >= (2, 90, 0):
 else:
     from . import function_wrapper_2_8 as function_wrapper
 
+from . import mesh_islands
+
+
+def has_seams(me):
+    seams = np.zeros(len(me.edges), dtype=bool)
+    me.edges.foreach_get("use_seam", seams)
+    return bool(seams.any())
+
 
 class Seams_To_SewingPattern(Operator):
     bl_idname = "object.seams_to_sewingpattern"
@@ -57,11 +67,30 @@ class Seams_To_SewingPattern(Operator):
         description="Applies all modifiers before operating.",
         default=True,
     )
+    objects: EnumProperty(
+        name="Objects",
+        description="Objects to convert in one go",
+        items=(
+            ('ACTIVE', "Active object", ""),
+            ('SELECTED', "Selected objects", ""),
+            ('COLLECTION', "Active collection", ""),
+        ),
+        default='ACTIVE',
+    )
     target_tris: IntProperty(
         name="Target number of triangles",
         description="Actual number of triangle migh be a bit off",
         default=5000,
     )
+    workers: IntProperty(
+        name="Remesh workers",
+        description=(
+            "Number of processes remeshing separate islands at the same time."
+            " 0 uses all cores"
+        ),
+        default=0,
+        min=0,
+    )
 
     def invoke(self, context, event):
         wm = context.window_manager
@@ -87,6 +116,8 @@ class Seams_To_SewingPattern(Operator):
 
         layout.row()
         row = layout.row()
+        row.prop(self, "objects")
+        row = layout.row()
         row.prop(self, "keep_original")
         row = layout.row()
         row.prop(self, "apply_modifiers")
@@ -98,61 +129,24 @@ class Seams_To_SewingPattern(Operator):
         layout.row()
 
     def execute(self, context):
-        if self.keep_original:
-            # Duplicate selection to keep original.
-            src_obj = bpy.context.active_object
-            obj = src_obj.copy()
-            obj.data = src_obj.data.copy()
-            obj.animation_data_clear()
-            bpy.context.collection.objects.link(obj)
-
-            obj.select_set(True)
-            src_obj.select_set(False)
-            bpy.context.view_layer.objects.active = obj
-
-        if self.apply_modifiers:
-            bpy.ops.object.convert(target='MESH')
-            obj = bpy.context.active_object
-
         wm = bpy.context.window_manager
-        bpy.ops.object.mode_set(mode='EDIT')
-
-        obj = bpy.context.edit_object
-        me = obj.data
-
-        bpy.ops.mesh.select_mode(type="EDGE")
-
-        bpy.ops.mesh.select_all(action='SELECT')
-        if (self.do_unwrap != 'KEEP'):
-            bpy.ops.uv.unwrap(method=self.do_unwrap, margin=0.02)
-        bpy.ops.mesh.select_all(action='DESELECT')
-
-        bm = bmesh.from_edit_mesh(me)
-
-        obj["S2S_InitialVolume"] = bm.calc_volume()
-
-        function_wrapper.do_update_edit_mesh(me)
+        timings = [('start', time.perf_counter())]
 
-        # Calculate edge length based on a surface of equilateral triangles.
+        # Objects that fail are left out of the following steps
+        errors = {}
 
-        if (self.use_remesh):
-            current_area = sum(f.calc_area() for f in bm.faces)
-            target_triangle_count = self.target_tris
-            area_per_triangle = current_area / target_triangle_count
+        objects = self.gather_objects(context, errors)
 
-            max_edge_length = math.sqrt(area_per_triangle/(math.sqrt(3)/4))
+        # Objects without seams can't be cut, so they are left out right away
+        for obj in objects:
+            if not has_seams(obj.data):
+                errors[obj.name] = "no seams"
+        objects = [obj for obj in objects if obj.name not in errors]
 
-            # A bias to compensate for stretching.
-            self.ensure_edgelength(max_edge_length * 0.8, bm, wm)
-
-        warn_any_seam = False
-
-        for e in bm.edges:
-            if e.seam:
-                e.select = True
-                warn_any_seam = True
-
-        if not warn_any_seam:
+        if not objects:
+            if errors and "no seams" not in errors.values():
+                self.report({'ERROR'}, "The meshes to convert are hidden or not in the view layer")
+                return {'CANCELLED'}
             self.report(
                 {'ERROR'},
                 (
@@ -162,184 +156,473 @@ class Seams_To_SewingPattern(Operator):
             )
             return {'CANCELLED'}
 
-        function_wrapper.do_bevel()
-
-        #####
-        '''
-        error now because I need to fix the fact that fanning edges dont exist
-        anymore maybe by finding ngons instead?
-        or removing doubled afer
-        '''
-        #####
-
-        # fix fanning seams
-        degenerate_edges = list()
-        for f in list(filter(lambda f: (f.select), bm.faces)):
-            is_degenerate = False
-            for v in f.verts:
-                vert_degenerate = True
-                for e in v.link_edges:
-                    if e.seam:
-                        vert_degenerate = False
-                if vert_degenerate:
-                    is_degenerate = True
+        # Everything happens on duplicates. Without keep_original the
+        # converted meshes go back into the originals at the end, so an
+        # object that fails halfway is left as it was
+        originals = objects
+        objects = self.duplicate_objects(context, objects)
+        labels = {obj.name: original.name for obj, original in zip(objects, originals)}
+
+        self.select_objects(context, objects)
+
+        # Work done on a single object is timed per object
+        object_times = {obj.name: 0.0 for obj in objects}
+
+        def each_object(stage, step):
+            # Runs step for every object that is still going, returns
+            # whether any is left
+            failed = False
+            for obj in objects:
+                if obj.name in errors:
+                    continue
+                start = time.perf_counter()
+                try:
+                    step(obj)
+                except Exception as e:
+                    errors[obj.name] = f"{stage} failed: {e}"
+                    failed = True
+                object_times[obj.name] += time.perf_counter() - start
+
+            remaining = [obj for obj in objects if obj.name not in errors]
+            if failed and context.mode == 'EDIT_MESH':
+                # Failed objects leave the multi-object edit session, so
+                # the shared operators don't touch them anymore
+                bpy.ops.object.mode_set(mode='OBJECT')
+                if remaining:
+                    self.select_objects(context, remaining)
+                    bpy.ops.object.mode_set(mode='EDIT')
+            return bool(remaining)
 
-            for e in f.edges:
-                if e.is_boundary:
-                    is_degenerate = False
+        wm.progress_begin(0, 99)
 
-            if is_degenerate:
-                for e in f.edges:
-                    degenerate_edges.append(e)
+        def convert():
+            if self.apply_modifiers:
+                bpy.ops.object.convert(target='MESH')
+
+            # Unwrapping packs the islands of all objects in edit mode into one
+            # UV space, so every object is unwrapped in an edit session of its own
+            if (self.do_unwrap != 'KEEP'):
+                def unwrap(obj):
+                    self.select_objects(context, [obj])
+                    try:
+                        bpy.ops.object.mode_set(mode='EDIT')
+                        bpy.ops.mesh.select_all(action='SELECT')
+                        bpy.ops.uv.unwrap(method=self.do_unwrap, margin=0.02)
+                    finally:
+                        bpy.ops.object.mode_set(mode='OBJECT')
+
+                going = each_object('unwrap', unwrap)
+                if not going:
+                    return
+                self.select_objects(context, [obj for obj in objects if obj.name not in errors])
+            timings.append(('unwrap', time.perf_counter()))
+
+            # All objects are edited at once, the mesh operators below work on
+            # all of them in a single call
+            bpy.ops.object.mode_set(mode='EDIT')
+
+            bpy.ops.mesh.select_mode(type="EDGE")
+            bpy.ops.mesh.select_all(action='DESELECT')
 
-        bmesh.ops.collapse(bm, edges=degenerate_edges, uvs=True)
+            max_edge_length = {}
 
-        bpy.ops.mesh.delete(type='ONLY_FACE')
+            def prepare(obj):
+                me = obj.data
+                bm = bmesh.from_edit_mesh(me)
 
-        bpy.ops.mesh.select_mode(type="FACE")
-        faceGroups = []
+                obj["S2S_InitialVolume"] = bm.calc_volume()
 
-        # isolate all face islands, and UV unwrap each island
+                function_wrapper.do_update_edit_mesh(me)
 
-        faces = set(bm.faces[:])
-        wm.progress_begin(0, 99)
-        progress_max = len(faces)
-        progress = 0
-        while faces:
-            bpy.ops.mesh.select_all(action='DESELECT')
-            face = faces.pop()
-            face.select = True
-            bpy.ops.mesh.select_linked()
-            selected_faces = {f for f in faces if f.select}
-            selected_faces.add(face)  # this or bm.faces above?
-            faceGroups.append(selected_faces)
-            faces -= selected_faces
+                # Calculate edge length based on a surface of equilateral triangles.
 
-            progress += len(selected_faces)
-            wm.progress_update((progress / progress_max))
+                if (self.use_remesh):
+                    current_area = sum(f.calc_area() for f in bm.faces)
+                    target_triangle_count = self.target_tris
+                    area_per_triangle = current_area / target_triangle_count
 
-        uv_layer = bm.loops.layers.uv.active
+                    max_edge_length[obj.name] = math.sqrt(area_per_triangle/(math.sqrt(3)/4))
 
-        progress = 0
+                    # A bias to compensate for stretching.
+                    self.ensure_edgelength(max_edge_length[obj.name] * 0.8, bm, wm)
 
-        area_before = 0
-        area_after = 0
+                for e in bm.edges:
+                    if e.seam:
+                        e.select = True
+
+            going = each_object('edge length', prepare)
+            timings.append(('edge length', time.perf_counter()))
+            if not going:
+                return
+
+            function_wrapper.do_bevel()
+
+            #####
+            '''
+            error now because I need to fix the fact that fanning edges dont exist
+            anymore maybe by finding ngons instead?
+            or removing doubled afer
+            '''
+            #####
+
+            # fix fanning seams
+            def fix_fanning_seams(obj):
+                bm = bmesh.from_edit_mesh(obj.data)
+                degenerate_edges = list()
+                for f in list(filter(lambda f: (f.select), bm.faces)):
+                    is_degenerate = False
+                    for v in f.verts:
+                        vert_degenerate = True
+                        for e in v.link_edges:
+                            if e.seam:
+                                vert_degenerate = False
+                        if vert_degenerate:
+                            is_degenerate = True
 
-        for g in faceGroups:
-            progress += 1
-            wm.progress_update((progress / len(faceGroups)))
-            bpy.ops.mesh.select_mode(type='FACE')
-            bpy.ops.mesh.select_all(action='DESELECT')
-            average_position = mathutils.Vector((0, 0, 0))
-            facenum = 0
-
-            # calculate the area, average position
-
-            for f in g:
-                f.select = True
-                area_before += f.calc_area()
-                average_position += f.calc_center_median()
-                facenum += 1
-
-            average_position /= facenum
-
-            average_tangent = mathutils.Vector((0, 0, 0))
-            average_bitangent = mathutils.Vector((0, 0, 0))
-
-            # calculate a rough tangent and a bitangent
-
-            average_uv_position = mathutils.Vector((0, 0))
-            uv_position_samples = 0
-
-            for face in g:
-                for loop in face.loops:
-                    uv = loop[uv_layer].uv
-                    uv_position_samples += 1
-                    average_uv_position += uv
-                    delta = loop.vert.co - average_position
-                    average_tangent += delta * (uv.x - 0.5)
-                    average_bitangent += delta * (uv.y - 0.5)
-
-            # reorient the tangent and bitangent
-
-            average_uv_position /= uv_position_samples
-            average_tangent = average_tangent.normalized()
-            average_bitangent = average_bitangent.normalized()
-            average_normal = average_tangent.cross(
-                average_bitangent
-            ).normalized()
-            halfvector = average_bitangent + average_tangent
-            halfvector /= 2
-            halfvector.normalize()
-            # straighten out half vector
-            halfvector = average_normal.cross(halfvector)
-            halfvector = average_normal.cross(halfvector)
-            cw = mathutils.Matrix.Rotation(
-                math.radians(45.0), 4, average_normal
-            )
-            ccw = mathutils.Matrix.Rotation(
-                math.radians(-45.0), 4, average_normal
-            )
+                    for e in f.edges:
+                        if e.is_boundary:
+                            is_degenerate = False
 
-            average_tangent = mathutils.Vector(halfvector)
-            average_tangent.rotate(ccw)
+                    if is_degenerate:
+                        for e in f.edges:
+                            degenerate_edges.append(e)
 
-            average_bitangent = mathutils.Vector(halfvector)
-            average_bitangent.rotate(cw)
+                bmesh.ops.collapse(bm, edges=degenerate_edges, uvs=True)
 
-            # offset each face island by their UV value, using the tangent and
-            # bitangent
+            if not each_object('cut seams', fix_fanning_seams):
+                return
 
-            for face in g:
-                for loop in face.loops:
-                    uv = loop[uv_layer].uv
-                    vert = loop.vert
-                    pos = mathutils.Vector((0, 0, 0))
-                    pos += average_position
-                    pos += average_tangent * -(uv.x - average_uv_position.x)
-                    pos += average_bitangent * -(uv.y - average_uv_position.y)
-                    # arbitrary - should probably depend on object scale?
-                    pos += average_normal * 0.3
-                    vert.co = pos
+            bpy.ops.mesh.delete(type='ONLY_FACE')
+            timings.append(('cut seams', time.perf_counter()))
 
-            function_wrapper.do_update_edit_mesh(me)
-            area_after += sum(f.calc_area() for f in g)
+            bpy.ops.mesh.select_mode(type="FACE")
 
-        # done
+            # isolate all face islands, and UV unwrap each island
 
-        area_ratio = math.sqrt(area_before / area_after)
-        bpy.ops.mesh.select_all(action='SELECT')
-        previous_pivot = bpy.context.scene.tool_settings.transform_pivot_point
-        bpy.context.scene.tool_settings.transform_pivot_point = (
-            'INDIVIDUAL_ORIGINS'
-        )
-        bpy.ops.transform.resize(value=(area_ratio, area_ratio, area_ratio))
-        bpy.context.scene.tool_settings.transform_pivot_point = previous_pivot
+            islands = {}
 
-        obj["S2S_UVtoWORLDscale"] = area_ratio
+            def find_islands(obj):
+                bm = bmesh.from_edit_mesh(obj.data)
+                faceGroups = mesh_islands.face_islands(bm.faces)
 
-        function_wrapper.do_update_edit_mesh(me)
-        bpy.ops.mesh.select_all(action='SELECT')
+                # remember the island of every face by index, the mesh arrays
+                # below follow the same face order as the bmesh
+                bm.faces.index_update()
+                face_island = np.empty(len(bm.faces), dtype=np.int32)
+                for island_index, g in enumerate(faceGroups):
+                    face_island[[f.index for f in g]] = island_index
+                islands[obj.name] = (face_island, len(faceGroups))
 
-        bpy.ops.mesh.remove_doubles(threshold=0.0004, use_unselected=False)
+            going = each_object('islands', find_islands)
+            timings.append(('islands', time.perf_counter()))
+            if not going:
+                return
 
-        if (self.use_remesh):
-            bpy.ops.mesh.dissolve_limited(angle_limit=0.01)
+            # Unfolding and scaling write all coordinates in one go, the edit
+            # meshes of all objects are synced once by switching modes
             bpy.ops.object.mode_set(mode='OBJECT', toggle=False)
-            bpy.ops.remesh.boundary_aligned_remesh(
-                edge_length=max_edge_length, iterations=10, reproject=False
-            )
 
-        bpy.ops.object.mode_set(mode='OBJECT', toggle=False)
+            def unfold(obj):
+                face_island, island_count = islands[obj.name]
+                area_ratio = self.unfold_islands(obj.data, face_island, island_count)
+                obj["S2S_UVtoWORLDscale"] = area_ratio
+
+            if not each_object('unfold', unfold):
+                return
+            self.select_objects(context, [obj for obj in objects if obj.name not in errors])
+            bpy.ops.object.mode_set(mode='EDIT', toggle=False)
+            timings.append(('unfold', time.perf_counter()))
+
+            # done
+
+            bpy.ops.mesh.select_all(action='SELECT')
+
+            bpy.ops.mesh.remove_doubles(threshold=0.0004, use_unselected=False)
+            timings.append(('merge', time.perf_counter()))
+
+            if (self.use_remesh):
+                bpy.ops.mesh.dissolve_limited(angle_limit=0.01)
+                bpy.ops.object.mode_set(mode='OBJECT', toggle=False)
+
+                # The remesher works on the active object
+                def remesh(obj):
+                    context.view_layer.objects.active = obj
+                    result = bpy.ops.remesh.boundary_aligned_remesh(
+                        edge_length=max_edge_length[obj.name], iterations=10, reproject=False,
+                        workers=self.workers
+                    )
+                    if 'FINISHED' not in result:
+                        raise RuntimeError("the remesher cancelled")
+
+                each_object('remesh', remesh)
+                timings.append(('remesh', time.perf_counter()))
+
+        try:
+            convert()
+        except Exception as e:
+            # The shared operators work on all objects at once, there is no
+            # telling which one they failed on, so all that are left fail
+            done = {name for name, _ in timings}
+            stages = ('unwrap', 'edge length', 'cut seams', 'islands', 'unfold', 'merge', 'remesh')
+            stage = next((name for name in stages if name not in done), 'convert')
+            for obj in objects:
+                if obj.name not in errors:
+                    errors[obj.name] = f"{stage} failed: {e}"
+
+        # Leaves edit mode and removes the duplicates that failed, also after an error
+        return self.finish(context, originals, objects, labels, timings, object_times, errors)
+
+    def finish(self, context, originals, objects, labels, timings, object_times, errors):
+        """ Leaves edit mode, drops the duplicates of the objects that failed
+        and reports how it went """
+        wm = context.window_manager
+        if context.mode != 'OBJECT':
+            bpy.ops.object.mode_set(mode='OBJECT', toggle=False)
 
         wm.progress_end()
 
-        # fix 2.9 wm.progress problem
-        bpy.context.window.cursor_set('NONE')
-        bpy.context.window.cursor_set('DEFAULT')
+        # fix 2.9 wm.progress problem, there is no window in background mode
+        if bpy.context.window:
+            bpy.context.window.cursor_set('NONE')
+            bpy.context.window.cursor_set('DEFAULT')
+
+        # Timings are only printed when Blender runs with --debug
+        if bpy.app.debug:
+            self.print_timings(objects, labels, timings, object_times)
+        self.print_errors(labels, errors)
+
+        failed = [obj for obj in objects if obj.name in errors]
+        converted = [obj for obj in objects if obj.name not in errors]
+        converted_originals = [original for obj, original in zip(objects, originals) if obj.name not in errors]
+        self.remove_objects(failed)
+        if not self.keep_original:
+            self.replace_originals(converted_originals, converted)
+            converted = converted_originals
+
+        # Only what was converted stays selected
+        if converted:
+            self.select_objects(context, converted)
+
+        if errors:
+            self.report(
+                {'WARNING'},
+                f"Converted {len(converted)} of {len(converted) + len(errors)} objects,"
+                " see the console for what went wrong"
+            )
+        if not converted:
+            return {'CANCELLED'}
 
         return{'FINISHED'}
 
+    def gather_objects(self, context, errors):
+        if self.objects == 'SELECTED':
+            objects = list(context.selected_objects)
+        elif self.objects == 'COLLECTION':
+            objects = list(context.collection.all_objects)
+        else:
+            objects = [context.active_object]
+        objects = [obj for obj in objects if obj is not None and obj.type == 'MESH']
+
+        # Hidden objects and objects outside of the view layer can't be
+        # selected or edited
+        view_layer_objects = context.view_layer.objects
+        for obj in objects:
+            if obj.name not in view_layer_objects or not obj.visible_get():
+                errors[obj.name] = "hidden or not in the view layer"
+        return [obj for obj in objects if obj.name not in errors]
+
+    def duplicate_objects(self, context, objects):
+        copies = []
+        for src_obj in objects:
+            obj = src_obj.copy()
+            obj.data = src_obj.data.copy()
+            obj.animation_data_clear()
+            # The copy goes where the original is, so it is in the view layer too
+            for collection in src_obj.users_collection:
+                collection.objects.link(obj)
+            copies.append(obj)
+        return copies
+
+    def select_objects(self, context, objects):
+        """ Selects only the objects, edit mode and the operators work on the selection """
+        for obj in context.selected_objects:
+            obj.select_set(False)
+        for obj in objects:
+            obj.select_set(True)
+        context.view_layer.objects.active = objects[0]
+
+    def remove_objects(self, objects):
+        for obj in objects:
+            mesh = obj.data
+            bpy.data.objects.remove(obj)
+            if mesh.users == 0:
+                bpy.data.meshes.remove(mesh)
+
+    def replace_originals(self, originals, objects):
+        """ Moves the converted meshes into the objects they were copied
+        from, and removes the copies """
+        for original, obj in zip(originals, objects):
+            old_mesh = original.data
+            original.data = obj.data
+            for key in ("S2S_InitialVolume", "S2S_UVtoWORLDscale"):
+                original[key] = obj[key]
+            if self.apply_modifiers:
+                original.modifiers.clear()
+            bpy.data.objects.remove(obj)
+            if old_mesh.users == 0:
+                name = old_mesh.name
+                bpy.data.meshes.remove(old_mesh)
+                original.data.name = name
+
+    def print_timings(self, objects, labels, timings, object_times):
+        print(f"Seams to Sewing Pattern: {', '.join(labels[obj.name] for obj in objects)}")
+        for (_, previous), (stage, current) in zip(timings, timings[1:]):
+            print(f"  {stage}: {current - previous:.3f}s")
+        print(f"  total: {timings[-1][1] - timings[0][1]:.3f}s")
+
+        # Time spent on every object by itself, on top of the shared operators
+        for name, seconds in object_times.items():
+            print(f"  {labels[name]}: {seconds:.3f}s")
+
+    def print_errors(self, labels, errors):
+        """ What went wrong with every object that wasn't converted, the
+        report only points to the console """
+        for name, error in errors.items():
+            if name in labels:
+                print(f"Seams to Sewing Pattern: {labels[name]} failed, {error}")
+            else:
+                print(f"Seams to Sewing Pattern: {name} skipped, {error}")
+
+    def unfold_islands(self, me, face_island, island_count):
+        """ Lays every island flat according to its UVs, all islands at once.
+
+        Works on the mesh arrays in object mode. Islands are scaled to keep
+        their total area, the coordinates are written back once. Returns the
+        scale from UV to world space. """
+        vertex_count = len(me.vertices)
+        loop_count = len(me.loops)
+        face_count = len(me.polygons)
+
+        co = np.empty(vertex_count * 3, dtype=np.float32)
+        me.vertices.foreach_get("co", co)
+        co = co.reshape(-1, 3).astype(np.float64)
+
+        loop_vert = np.empty(loop_count, dtype=np.int32)
+        me.loops.foreach_get("vertex_index", loop_vert)
+
+        uv = np.empty(loop_count * 2, dtype=np.float32)
+        me.uv_layers.active.data.foreach_get("uv", uv)
+        uv = uv.reshape(-1, 2).astype(np.float64)
+
+        loop_start = np.empty(face_count, dtype=np.int32)
+        loop_total = np.empty(face_count, dtype=np.int32)
+        me.polygons.foreach_get("loop_start", loop_start)
+        me.polygons.foreach_get("loop_total", loop_total)
+
+        centers = np.empty(face_count * 3, dtype=np.float32)
+        me.polygons.foreach_get("center", centers)
+        centers = centers.reshape(-1, 3)
+
+        # island of every face loop
+        loop_face = np.repeat(np.arange(face_count), loop_total)
+        loop_index = (
+            np.repeat(loop_start - np.cumsum(loop_total) + loop_total, loop_total)
+            + np.arange(len(loop_face))
+        )
+        loop_vert = loop_vert[loop_index]
+        uv = uv[loop_index]
+        loop_island = face_island[loop_face]
+
+        # next loop of every loop, wrapping around within its face
+        face_first = np.cumsum(loop_total) - loop_total
+        loop_next = np.arange(len(loop_face)) + 1
+        face_last = face_first + loop_total - 1
+        loop_next[face_last] = face_first
+
+        def total_area(positions):
+            # Newell's formula, like Blender's polygon area
+            if face_count == 0:
+                return 0.0
+            p = positions[loop_vert]
+            cross = np.cross(p, p[loop_next])
+            face_normals = np.add.reduceat(cross, face_first, axis=0)
+            return 0.5 * float(np.linalg.norm(face_normals, axis=1).sum())
+
+        area_before = total_area(co)
+
+        def island_sum(ids, values):
+            return np.stack([
+                np.bincount(ids, weights=values[:, k], minlength=island_count)
+                for k in range(values.shape[1])
+            ], axis=1)
+
+        def normalized(vectors):
+            length = np.linalg.norm(vectors, axis=1)[:, None]
+            return vectors / np.where(length > 0, length, 1)
+
+        # calculate the average position
+
+        faces_per_island = np.bincount(face_island, minlength=island_count)
+        average_position = island_sum(face_island, centers)
+        average_position /= np.maximum(faces_per_island, 1)[:, None]
+
+        # calculate a rough tangent and a bitangent
+
+        loops_per_island = np.bincount(loop_island, minlength=island_count)
+        average_uv_position = island_sum(loop_island, uv)
+        average_uv_position /= np.maximum(loops_per_island, 1)[:, None]
+
+        delta = co[loop_vert] - average_position[loop_island]
+        average_tangent = island_sum(loop_island, delta * (uv[:, 0:1] - 0.5))
+        average_bitangent = island_sum(loop_island, delta * (uv[:, 1:2] - 0.5))
+
+        # reorient the tangent and bitangent
+
+        average_tangent = normalized(average_tangent)
+        average_bitangent = normalized(average_bitangent)
+        average_normal = normalized(
+            np.cross(average_tangent, average_bitangent)
+        )
+        halfvector = normalized((average_bitangent + average_tangent) / 2)
+        # straighten out half vector
+        halfvector = np.cross(average_normal, halfvector)
+        halfvector = np.cross(average_normal, halfvector)
+
+        # rotate the half vector by -45 and 45 degrees around the normal,
+        # it's perpendicular to the normal so Rodrigues' formula simplifies
+        rotated = np.cross(average_normal, halfvector)
+        c = math.cos(math.radians(45.0))
+        average_tangent = halfvector * c - rotated * c
+        average_bitangent = halfvector * c + rotated * c
+
+        # offset each face island by their UV value, using the tangent and
+        # bitangent
+
+        uv_offset = uv - average_uv_position[loop_island]
+        pos = (
+            average_position[loop_island]
+            - average_tangent[loop_island] * uv_offset[:, 0:1]
+            - average_bitangent[loop_island] * uv_offset[:, 1:2]
+            # arbitrary - should probably depend on object scale?
+            + average_normal[loop_island] * 0.3
+        )
+        co[loop_vert] = pos
+
+        # scale every island around its own center, so the total area
+        # matches the original mesh
+        area_after = total_area(co)
+        area_ratio = math.sqrt(area_before / area_after) if area_after > 0 else 1.0
+
+        island_center = island_sum(loop_island, pos)
+        island_center /= np.maximum(loops_per_island, 1)[:, None]
+        center = island_center[loop_island]
+        co[loop_vert] = center + (pos - center) * area_ratio
+
+        me.vertices.foreach_set("co", co.astype(np.float32).ravel())
+        me.update()
+
+        return area_ratio
+
     def ensure_edgelength(self, max_length, mesh, wm):
         seam_edges = list(filter(lambda e: e.seam, mesh.edges))
         edge_groups = defaultdict(list)
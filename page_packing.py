@@ -0,0 +1,102 @@
+# Packs sewing pattern pieces onto as few pages as possible. Pieces are packed
+# by their bounding box with the MaxRects algorithm: every page keeps a list of
+# the biggest empty rectangles left on it, and a piece goes into the empty
+# rectangle, on any page, that it fills best (best short side fit).
+
+# Room left between pieces, in document units (millimeters)
+PIECE_SPACING = 5.0
+
+def contains(outer, inner):
+    return (inner[0] >= outer[0] and inner[1] >= outer[1]
+            and inner[0] + inner[2] <= outer[0] + outer[2]
+            and inner[1] + inner[3] <= outer[1] + outer[3])
+
+class MaxRectsPage:
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.free = [(0.0, 0.0, width, height)]  # (x, y, width, height)
+
+    def find(self, width, height, rotate=False):
+        """ Best spot for a width x height rectangle, as (score, x, y, rotated),
+        or None when it doesn't fit. Lower scores fit better """
+        sizes = ((width, height, False), (height, width, True)) if rotate else ((width, height, False),)
+        best = None
+        for x, y, free_width, free_height in self.free:
+            for w, h, rotated in sizes:
+                if w <= free_width and h <= free_height:
+                    left_x = free_width - w
+                    left_y = free_height - h
+                    score = (min(left_x, left_y), max(left_x, left_y))
+                    if best is None or score < best[0]:
+                        best = (score, x, y, rotated)
+        return best
+
+    def place(self, x, y, width, height):
+        # Every empty rectangle that overlaps the piece is split in up to four
+        # rectangles around it
+        free = []
+        for rect in self.free:
+            fx, fy, fw, fh = rect
+            if x >= fx + fw or x + width <= fx or y >= fy + fh or y + height <= fy:
+                free.append(rect)
+                continue
+            if x > fx:
+                free.append((fx, fy, x - fx, fh))
+            if x + width < fx + fw:
+                free.append((x + width, fy, fx + fw - x - width, fh))
+            if y > fy:
+                free.append((fx, fy, fw, y - fy))
+            if y + height < fy + fh:
+                free.append((fx, y + height, fw, fy + fh - y - height))
+
+        # Rectangles inside of other ones never fit anything better
+        self.free = [
+            a for i, a in enumerate(free)
+            if not any(j != i and contains(b, a) and (a != b or j < i) for j, b in enumerate(free))
+        ]
+
+def pack(sizes, page_width, page_height, rotate=True, spacing=PIECE_SPACING):
+    """ Packs rectangles, given as (width, height), onto pages of page_width x page_height.
+
+    Returns (placements, page_count). Every placement is (page, x, y, rotated),
+    or None when the rectangle is bigger than a page. Rotated rectangles are
+    turned a quarter, so they take height x width. """
+    placements = [None] * len(sizes)
+    pages = []
+
+    # Every piece takes the spacing on two sides, the page gets it once more
+    # so pieces can still touch its far edges
+    width = page_width + spacing
+    height = page_height + spacing
+
+    # Big pieces first, the small ones fill the gaps they leave
+    order = sorted(range(len(sizes)), key=lambda i: (-max(sizes[i]), -sizes[i][0] * sizes[i][1]))
+
+    for i in order:
+        w = sizes[i][0] + spacing
+        h = sizes[i][1] + spacing
+
+        best = None
+        for index, page in enumerate(pages):
+            found = page.find(w, h, rotate)
+            if found is not None and (best is None or found[0] < best[1][0]):
+                best = (index, found)
+
+        if best is None:
+            page = MaxRectsPage(width, height)
+            found = page.find(w, h, rotate)
+            if found is None:
+                continue
+            pages.append(page)
+            best = (len(pages) - 1, found)
+
+        index, (score, x, y, rotated) = best
+        if rotated:
+            pages[index].place(x, y, h, w)
+        else:
+            pages[index].place(x, y, w, h)
+        placements[i] = (index, x, y, rotated)
+
+    return placements, len(pages)
@@ -0,0 +1,126 @@
+import math
+
+# Stroke width of the exported paths, in document units
+STROKE_WIDTH = 1.0
+
+def segment_intersects_rect(p0, p1, rect):
+    """ Liang-Barsky test of segment p0-p1 against rect (min_x, min_y, max_x, max_y) """
+    x0, y0 = p0
+    dx = p1[0] - x0
+    dy = p1[1] - y0
+    t0 = 0.0
+    t1 = 1.0
+    for p, q in ((-dx, x0 - rect[0]), (dx, rect[2] - x0), (-dy, y0 - rect[1]), (dy, rect[3] - y0)):
+        if p == 0:
+            if q < 0:
+                return False
+            continue
+        t = q / p
+        if p < 0:
+            if t > t1:
+                return False
+            t0 = max(t0, t)
+        else:
+            if t < t0:
+                return False
+            t1 = min(t1, t)
+    return True
+
+# Grid of overlapping pages laid over one sewing pattern group.
+# Page (column, row) covers origin + (column, row) * step, extended by the page size.
+class TileGrid:
+
+    def __init__(self, bounds, page_width, page_height, overlap, border):
+        self.page_width = page_width
+        self.page_height = page_height
+        self.step_x = page_width - overlap
+        self.step_y = page_height - overlap
+
+        # Trim to the content and add a small border
+        self.origin_x = bounds[0] - border
+        self.origin_y = bounds[1] - border
+        width = bounds[2] - bounds[0] + 2 * border
+        height = bounds[3] - bounds[1] + 2 * border
+
+        self.columns = max(1, math.ceil(width / self.step_x))
+        self.rows = max(1, math.ceil(height / self.step_y))
+
+    def tile_rect(self, column, row):
+        x = self.origin_x + column * self.step_x
+        y = self.origin_y + row * self.step_y
+        return (x, y, x + self.page_width, y + self.page_height)
+
+    def _span(self, low, high, origin, step, size, count):
+        # All tiles i for which [origin + i * step, origin + i * step + size] touches [low, high]
+        first = max(0, math.ceil((low - origin - size) / step))
+        last = min(count - 1, math.floor((high - origin) / step))
+        return range(first, last + 1)
+
+    def tiles_for_rect(self, rect):
+        columns = self._span(rect[0], rect[2], self.origin_x, self.step_x, self.page_width, self.columns)
+        rows = self._span(rect[1], rect[3], self.origin_y, self.step_y, self.page_height, self.rows)
+        return {(c, r) for c in columns for r in rows}
+
+    def tiles_for_segment(self, p0, p1, pad=0.0):
+        """ Tiles that segment p0-p1, drawn with a pen of radius pad, shows up on """
+        rect = (
+            min(p0[0], p1[0]) - pad, min(p0[1], p1[1]) - pad,
+            max(p0[0], p1[0]) + pad, max(p0[1], p1[1]) + pad,
+        )
+        candidates = self.tiles_for_rect(rect)
+        if len(candidates) <= 1:
+            return candidates
+
+        tiles = set()
+        for column, row in candidates:
+            x0, y0, x1, y1 = self.tile_rect(column, row)
+            if segment_intersects_rect(p0, p1, (x0 - pad, y0 - pad, x1 + pad, y1 + pad)):
+                tiles.add((column, row))
+        return tiles
+
+    def tiles_for_polyline(self, points, pad=0.0):
+        tiles = set()
+        for p0, p1 in zip(points, points[1:]):
+            tiles |= self.tiles_for_segment(p0, p1, pad)
+        return tiles
+
+# Everything that ends up on one page
+class PagePlan:
+
+    def __init__(self, column, row):
+        self.column = column
+        self.row = row
+        self.outlines = []
+        self.allowances = []
+        self.guides = []
+        self.labels = []
+
+def plan_pages(group, grid):
+    """ Assigns the outlines, allowances, guides and labels of a group to the pages they show up on.
+    Pages with nothing on them are left out, the rest is sorted in reading order """
+    pages = {}
+
+    def page(tile):
+        if tile not in pages:
+            pages[tile] = PagePlan(*tile)
+        return pages[tile]
+
+    pad = STROKE_WIDTH / 2
+
+    for points in group.outlines:
+        for tile in grid.tiles_for_polyline(points, pad):
+            page(tile).outlines.append(points)
+
+    for points in group.allowances:
+        for tile in grid.tiles_for_polyline(points, pad):
+            page(tile).allowances.append(points)
+
+    for color, points in group.guides:
+        for tile in grid.tiles_for_polyline(points, pad):
+            page(tile).guides.append((color, points))
+
+    for label in group.labels:
+        for tile in grid.tiles_for_rect(label.bounds()):
+            page(tile).labels.append(label)
+
+    return [pages[tile] for tile in sorted(pages, key=lambda t: (t[1], t[0]))]
@@ -0,0 +1,210 @@
+import re
+import xml.etree.ElementTree as ET
+
+SVG_NAMESPACE = "http://www.w3.org/2000/svg"
+
+_path_token = re.compile(r'[MLZmlz]|-?[0-9]*\.?[0-9]+(?:[eE][-+]?[0-9]+)?')
+
+# Plain geometry of one exported sewing pattern group (one <g> in the SVG).
+# Coordinates are in document units, which are millimeters.
+class PatternGroup:
+
+    def __init__(self):
+        self.outlines = []  # list of closed polylines [(x, y), ...]
+        self.allowances = []  # seam allowance outlines, closed polylines
+        self.guides = []    # list of (color, [(x, y), ...])
+        self.labels = []    # list of PatternLabel
+
+    def bounds(self):
+        """ Returns (min_x, min_y, max_x, max_y) of everything drawn in this group """
+        xs = []
+        ys = []
+        for points in self.outlines + self.allowances:
+            xs.extend(p[0] for p in points)
+            ys.extend(p[1] for p in points)
+        for color, points in self.guides:
+            xs.extend(p[0] for p in points)
+            ys.extend(p[1] for p in points)
+        for label in self.labels:
+            x0, y0, x1, y1 = label.bounds()
+            xs.extend((x0, x1))
+            ys.extend((y0, y1))
+        if not xs:
+            return None
+        return min(xs), min(ys), max(xs), max(ys)
+
+    def placed(self, x, y, turns=0, bounds=None):
+        """ Copy of this group, turned a quarter turns times and moved so the
+        corner of bounds lands at x, y. Labels stay upright """
+        min_x, min_y, max_x, max_y = bounds or self.bounds()
+
+        def turn(p):
+            px, py = p
+            for _ in range(turns % 4):
+                px, py = py, -px
+            return px, py
+
+        corners = (turn((min_x, min_y)), turn((max_x, max_y)))
+        origin_x = min(c[0] for c in corners)
+        origin_y = min(c[1] for c in corners)
+
+        def move(p):
+            px, py = turn(p)
+            return (x + px - origin_x, y + py - origin_y)
+
+        group = PatternGroup()
+        group.outlines = [[move(p) for p in points] for points in self.outlines]
+        group.allowances = [[move(p) for p in points] for points in self.allowances]
+        group.guides = [(color, [move(p) for p in points]) for color, points in self.guides]
+        for label in self.labels:
+            label_x, label_y = move((label.x, label.y))
+            group.labels.append(PatternLabel(label_x, label_y, label.text, label.size, label.anchor, label.baseline))
+        return group
+
+class PatternLabel:
+
+    def __init__(self, x, y, text, size, anchor='start', baseline='auto'):
+        self.x = x
+        self.y = y
+        self.text = text
+        self.size = size
+        self.anchor = anchor
+        self.baseline = baseline
+
+    def bounds(self):
+        """ Rough extent of the text, assuming an average glyph width """
+        width = len(self.text) * 0.556 * self.size
+        x = self.x - width if self.anchor == 'end' else self.x
+        y = self.y if self.baseline == 'hanging' else self.y - self.size
+        return x, y, x + width, y + self.size
+
+def parse_path(d):
+    """ Parses the subset of SVG path data written by the exporter into polylines """
+    polylines = []
+    current = None
+    for token in _path_token.findall(d):
+        if token in 'Mm':
+            current = []
+            polylines.append(current)
+        elif token in 'LlZz':
+            continue
+        elif current is not None:
+            current.append(float(token))
+
+    # Pair up the coordinates
+    return [list(zip(p[0::2], p[1::2])) for p in polylines if len(p) >= 4]
+
+def _strip_unit(value, default=0.0):
+    if value is None:
+        return default
+    return float(re.sub(r'[a-z%]+$', '', value.strip()))
+
+def read_groups(filepath):
+    """ Reads an exported sewing pattern SVG, returns (document_size, groups) """
+    tree = ET.parse(filepath)
+    root = tree.getroot()
+
+    view_box = root.get('viewBox', '0 0 1000 1000').split()
+    document_size = (float(view_box[2]), float(view_box[3]))
+
+    groups = []
+    for g in root.findall('svg:g', {'svg': SVG_NAMESPACE}):
+        group = PatternGroup()
+        for element in g:
+            tag = element.tag.split('}')[-1]
+            if tag == 'path':
+                polylines = parse_path(element.get('d', ''))
+                if element.get('class') == 'seam':
+                    group.outlines.extend(polylines)
+                elif element.get('class') == 'allowance':
+                    group.allowances.extend(polylines)
+                else:
+                    color = element.get('stroke', '#000000')
+                    for points in polylines:
+                        group.guides.append((color, points))
+            elif tag == 'text':
+                group.labels.append(PatternLabel(
+                    _strip_unit(element.get('x')),
+                    _strip_unit(element.get('y')),
+                    element.text or '',
+                    _strip_unit(element.get('font-size'), 8.0),
+                    element.get('text-anchor', 'start'),
+                    element.get('dominant-baseline', 'auto'),
+                ))
+        groups.append(group)
+
+    return document_size, groups
+
+# Streams a sewing pattern SVG to an open text file, one element at a time.
+# Coordinates are rounded to the given number of decimals (millimeters).
+class SvgWriter:
+
+    def __init__(self, file, precision=3):
+        self.file = file
+        self.precision = precision
+
+    def number(self, value):
+        text = '%.*f' % (self.precision, value)
+        if '.' in text:
+            text = text.rstrip('0').rstrip('.')
+        if text == '-0':
+            return '0'
+        return text
+
+    def points(self, points):
+        return ' '.join(self.number(x) + ',' + self.number(y) for x, y in points)
+
+    def begin_document(self, document_scale, document_height=None):
+        width = self.number(document_scale)
+        height = self.number(document_scale if document_height is None else document_height)
+        self.file.write('<svg xmlns="http://www.w3.org/2000/svg"\n viewBox="0 0 ' + width + ' ' + height + '"\n')
+        self.file.write('width="' + width + 'mm" height="' + height + 'mm">')
+        self.file.write('\n<defs><style>.seam{stroke: #000; stroke-width:1px; fill:white} .allowance{stroke: #000; stroke-width:1px; fill:none} .sewinguide{stroke-width:1px;}</style></defs>')
+
+    def end_document(self):
+        self.file.write('\n</svg>')
+
+    def begin_group(self):
+        self.file.write('\n<g>')
+
+    def end_group(self):
+        self.file.write('</g>')
+
+    def seam(self, polylines):
+        """ Writes the outline of a piece, one closed polyline per border """
+        self.file.write('<path class="seam" d="')
+        for points in polylines:
+            self.file.write('M ' + self.points(points) + ' ')
+        self.file.write('"/>')
+
+    def allowance(self, polylines):
+        """ Writes the seam allowance of a piece, the line it is cut along """
+        self.file.write('<path class="allowance" d="')
+        for points in polylines:
+            self.file.write('M ' + self.points(points) + ' ')
+        self.file.write('"/>')
+
+    def sewing_guide(self, color, points):
+        self.file.write('<path class="sewinguide" stroke="' + color + '" d="M ' + self.points(points) + ' "/>\n')
+
+    def label(self, x, y, text, size, anchor='', baseline=''):
+        self.file.write(
+            '<text x="' + self.number(x) + '" y="' + self.number(y) + '" class="sewinguidetext" '
+            + anchor + ' ' + baseline + ' font-size="' + str(size) + 'px">' + text + '</text>\n'
+        )
+
+    def group(self, group):
+        """ Writes a PatternGroup read back from another document """
+        self.begin_group()
+        if group.allowances:
+            self.allowance(group.allowances)
+        self.seam(group.outlines)
+        for color, points in group.guides:
+            self.sewing_guide(color, points)
+        for label in group.labels:
+            self.label(
+                label.x, label.y, label.text, self.number(label.size),
+                'text-anchor="end"' if label.anchor == 'end' else '',
+                'dominant-baseline="hanging"' if label.baseline == 'hanging' else '',
+            )
+        self.end_group()
@@ -0,0 +1,171 @@
+import math
+import zlib
+
+POINTS_PER_MM = 72.0 / 25.4
+
+# Largest page side readers accept, in user units, about 5 m at 1 pt per unit
+MAX_PAGE_SIZE = 14400
+
+def format_number(value):
+    """ Compact number formatting for content streams """
+    text = '%.3f' % value
+    text = text.rstrip('0').rstrip('.')
+    if text in ('-0', ''):
+        return '0'
+    return text
+
+def escape_text(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+def hex_to_rgb(color):
+    color = color.lstrip('#')
+    if len(color) == 3:
+        color = ''.join(c * 2 for c in color)
+    try:
+        return tuple(int(color[i:i + 2], 16) / 255.0 for i in (0, 2, 4))
+    except ValueError:
+        return (0.0, 0.0, 0.0)
+
+# Helvetica glyph widths (per 1000 units) for the characters we print.
+# Anything else falls back to an average width.
+_helvetica_widths = {
+    ' ': 278, '-': 333, '.': 278, ',': 278, ':': 278,
+    '0': 556, '1': 556, '2': 556, '3': 556, '4': 556,
+    '5': 556, '6': 556, '7': 556, '8': 556, '9': 556,
+    'X': 667, 'x': 500,
+}
+
+def text_width(text, size):
+    return sum(_helvetica_widths.get(c, 556) for c in text) * size / 1000.0
+
+# Builds a single page content stream
+class PdfCanvas:
+
+    def __init__(self):
+        self.operations = []
+
+    def add(self, *operands):
+        self.operations.append(' '.join(
+            format_number(o) if isinstance(o, (int, float)) else o for o in operands
+        ))
+
+    def save_state(self):
+        self.add('q')
+
+    def restore_state(self):
+        self.add('Q')
+
+    def transform(self, a, b, c, d, e, f):
+        self.add(a, b, c, d, e, f, 'cm')
+
+    def set_line_width(self, width):
+        self.add(width, 'w')
+
+    def set_stroke_color(self, rgb):
+        self.add(rgb[0], rgb[1], rgb[2], 'RG')
+
+    def set_fill_color(self, rgb):
+        self.add(rgb[0], rgb[1], rgb[2], 'rg')
+
+    def clip_rect(self, x, y, width, height):
+        self.add(x, y, width, height, 're W n')
+
+    def polyline(self, points, close=False):
+        if not points:
+            return
+        self.add(points[0][0], points[0][1], 'm')
+        for x, y in points[1:]:
+            self.add(x, y, 'l')
+        if close:
+            self.add('h')
+
+    def line(self, x1, y1, x2, y2):
+        self.add(x1, y1, 'm')
+        self.add(x2, y2, 'l')
+        self.add('S')
+
+    def stroke(self):
+        self.add('S')
+
+    def fill_stroke(self):
+        self.add('B')
+
+    def text(self, x, y, text, size, flip=False):
+        """ Draws text with its baseline starting at x, y """
+        self.add('BT')
+        self.add('/F1', size, 'Tf')
+        # In a y-down coordinate system the glyphs have to be flipped back up
+        self.add(1, 0, 0, -1 if flip else 1, x, y, 'Tm')
+        self.add('(' + escape_text(text) + ')', 'Tj')
+        self.add('ET')
+
+    def getvalue(self):
+        return '\n'.join(self.operations).encode('latin-1', 'replace')
+
+# Minimal PDF 1.4 document writer: pages of vector content and one base font.
+# Pages too large for PDF 1.4, like long markers, get a larger /UserUnit and
+# make the document PDF 1.6
+class PdfDocument:
+
+    def __init__(self, compress=True):
+        self.pages = []
+        self.compress = compress
+
+    def add_page(self, width, height, canvas):
+        """ Adds a page of width x height points, drawn by canvas """
+        self.pages.append((width, height, canvas.getvalue()))
+
+    @staticmethod
+    def user_unit(width, height):
+        """ Points per user unit that bring both sides under MAX_PAGE_SIZE """
+        return max(1, math.ceil(max(width, height) / MAX_PAGE_SIZE))
+
+    def save(self, filepath):
+        objects = []
+
+        # Object numbers: 1 catalog, 2 page tree, 3 font, then page / content pairs
+        page_ids = [4 + 2 * i for i in range(len(self.pages))]
+
+        objects.append(b'<< /Type /Catalog /Pages 2 0 R >>')
+        kids = ' '.join('%d 0 R' % i for i in page_ids)
+        objects.append(('<< /Type /Pages /Kids [%s] /Count %d >>' % (kids, len(page_ids))).encode('ascii'))
+        objects.append(b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>')
+
+        version = b'1.4'
+        for page_id, (width, height, content) in zip(page_ids, self.pages):
+            unit = self.user_unit(width, height)
+            user_unit = ''
+            if unit > 1:
+                # The content is drawn in points, scale it down to the user unit
+                version = b'1.6'
+                user_unit = '/UserUnit %d ' % unit
+                content = ('%.6g 0 0 %.6g 0 0 cm\n' % (1 / unit, 1 / unit)).encode('ascii') + content
+            objects.append((
+                '<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %s %s] %s'
+                '/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>'
+                % (format_number(width / unit), format_number(height / unit), user_unit, page_id + 1)
+            ).encode('ascii'))
+
+            if self.compress:
+                content = zlib.compress(content)
+                header = '<< /Length %d /Filter /FlateDecode >>' % len(content)
+            else:
+                header = '<< /Length %d >>' % len(content)
+            objects.append(header.encode('ascii') + b'\nstream\n' + content + b'\nendstream')
+
+        with open(filepath, 'wb') as file:
+            file.write(b'%PDF-' + version + b'\n%\xe2\xe3\xcf\xd3\n')
+            offsets = []
+            for number, body in enumerate(objects, start=1):
+                offsets.append(file.tell())
+                file.write(b'%d 0 obj\n' % number)
+                file.write(body)
+                file.write(b'\nendobj\n')
+
+            xref_offset = file.tell()
+            file.write(b'xref\n0 %d\n' % (len(objects) + 1))
+            file.write(b'0000000000 65535 f \n')
+            for offset in offsets:
+                file.write(b'%010d 00000 n \n' % offset)
+            file.write(b'trailer\n<< /Size %d /Root 1 0 R >>\n' % (len(objects) + 1))
+            file.write(b'startxref\n%d\n%%%%EOF\n' % xref_offset)
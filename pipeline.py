@@ -0,0 +1,207 @@
+import bpy
+import os
+import sys
+import json
+import copy
+import time
+import argparse
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+# Runs Seams to Sewing Pattern, the remesher and the exporter without any UI,
+# with the options coming from a JSON config. From a shell:
+#
+#   blender -b shirt.blend --python-expr "import importlib; importlib.import_module('seams_to_sewing_pattern.pipeline').main()" -- --config farm.json
+#
+# converts the objects of shirt.blend. seams_to_sewing_pattern is the name of
+# the add-on folder, as a string it may have dashes in it. With a "files" list
+# in the config, Blender can be started without a file and converts every
+# listed file in a separate background Blender, several at the same time:
+#
+#   blender -b --python-expr "import importlib; importlib.import_module('seams_to_sewing_pattern.pipeline').main()" -- --config farm.json
+#
+# Scripts can call run(config) on the open file and run_files(config) instead.
+
+default_config = {
+    # Names of the objects to convert, when empty all meshes of "collection"
+    # are converted, or all meshes of the scene without a collection
+    "objects": [],
+    "collection": "",
+    # Options of Seams to Sewing Pattern, like {"target_tris": 8000}
+    "pattern": {},
+    # Options of Boundary Aligned Remesh. When given, every converted object
+    # is remeshed with them, set "use_remesh" to false in "pattern" to only
+    # remesh once
+    "remesh": None,
+    # Options of Export Sewing Pattern, like {"file_format": "SVG"}. Set to
+    # null to skip exporting
+    "export": {},
+    # Where exported files go, "//" is the folder of the .blend file
+    "output_directory": "//",
+    # Saves the .blend file after converting, to "save_as" when that is given
+    "save": False,
+    "save_as": "",
+    # Other .blend files to convert, and how many at the same time.
+    # 0 uses all cores. The files share the cores for remeshing, unless
+    # "workers" is given in "pattern" or "remesh"
+    "files": [],
+    "workers": 0,
+}
+
+def load_config(path):
+    with open(path) as f:
+        config = json.load(f)
+    unknown = set(config) - set(default_config)
+    if unknown:
+        raise ValueError(f"Unknown config keys: {', '.join(sorted(unknown))}")
+    return {**copy.deepcopy(default_config), **config}
+
+def gather_objects(config):
+    scene = bpy.context.scene
+    if config["objects"]:
+        missing = [name for name in config["objects"] if name not in scene.objects]
+        if missing:
+            raise ValueError(f"Objects not found: {', '.join(missing)}")
+        objects = [scene.objects[name] for name in config["objects"]]
+    elif config["collection"]:
+        objects = list(bpy.data.collections[config["collection"]].all_objects)
+    else:
+        objects = list(scene.objects)
+    return [obj for obj in objects if obj.type == 'MESH']
+
+def select_only(objects):
+    """ The operators work on the selection and the active object """
+    view_layer = bpy.context.view_layer
+    for obj in view_layer.objects:
+        obj.select_set(False)
+    for obj in objects:
+        obj.select_set(True)
+    view_layer.objects.active = objects[0] if objects else None
+
+def run(config):
+    """ Converts and exports the objects of the open file, returns a summary
+    with the result of every object """
+    config = {**copy.deepcopy(default_config), **config}
+    summary = {}
+    start = time.perf_counter()
+
+    if bpy.context.object and bpy.context.object.mode != 'OBJECT':
+        bpy.ops.object.mode_set(mode='OBJECT')
+
+    objects = gather_objects(config)
+    if not objects:
+        print("Seams to Sewing Pattern pipeline: nothing to convert")
+        return summary
+
+    # Seams to Sewing Pattern leaves what it converted selected, those are
+    # the duplicates when it works on a copy
+    select_only(objects)
+    pattern = {**config["pattern"], "objects": 'SELECTED'}
+    result = bpy.ops.object.seams_to_sewingpattern(**pattern)
+    converted = list(bpy.context.selected_objects) if 'FINISHED' in result else []
+    print(f"Seams to Sewing Pattern pipeline: converted {len(converted)} of {len(objects)} objects")
+    if len(converted) < len(objects):
+        summary["not converted"] = len(objects) - len(converted)
+
+    for obj in converted:
+        summary[obj.name] = "converted"
+        try:
+            if config["remesh"] is not None:
+                select_only([obj])
+                if 'FINISHED' not in bpy.ops.remesh.boundary_aligned_remesh(**config["remesh"]):
+                    raise RuntimeError("the remesher cancelled")
+            if config["export"] is not None:
+                summary[obj.name] = export(obj, config)
+        except Exception as e:
+            summary[obj.name] = f"failed: {e}"
+
+    if config["save"] or config["save_as"]:
+        if config["save_as"]:
+            bpy.ops.wm.save_as_mainfile(filepath=bpy.path.abspath(config["save_as"]))
+        else:
+            bpy.ops.wm.save_mainfile()
+
+    print(f"Seams to Sewing Pattern pipeline: {time.perf_counter() - start:.3f}s")
+    for name, status in summary.items():
+        print(f"  {name}: {status}")
+    return summary
+
+def export(obj, config):
+    options = dict(config["export"])
+    extension = options.get("file_format", 'PDF').lower()
+    directory = bpy.path.abspath(config["output_directory"])
+    os.makedirs(directory, exist_ok=True)
+    filepath = os.path.join(directory, bpy.path.clean_name(obj.name) + "." + extension)
+
+    select_only([obj])
+    if 'FINISHED' not in bpy.ops.object.export_sewingpattern(filepath=filepath, **options):
+        raise RuntimeError("the export cancelled")
+    return f"exported to {filepath}"
+
+def run_files(config):
+    """ Converts every file of config["files"] in its own background Blender.
+    Returns the exit code of every file """
+    files = [os.path.abspath(bpy.path.abspath(path)) for path in config["files"]]
+    workers = config["workers"] or os.cpu_count() or 1
+
+    # The files themselves get the same config, without the file list
+    single = {key: value for key, value in config.items() if key not in ("files", "workers")}
+
+    # Every file remeshes its islands in worker processes too, all of them
+    # using every core would start cores * cores processes
+    share = max(1, (os.cpu_count() or 1) // min(workers, max(len(files), 1)))
+    single["pattern"] = {"workers": share, **single["pattern"]}
+    if single["remesh"] is not None:
+        single["remesh"] = {"workers": share, **single["remesh"]}
+    working_directory = tempfile.TemporaryDirectory()
+    single_path = os.path.join(working_directory.name, "config.json")
+    with open(single_path, "w") as f:
+        json.dump(single, f)
+
+    # The folder of the add-on may have a name that can't be written in an import
+    expression = f"import importlib; importlib.import_module({__package__ + '.pipeline'!r}).main()"
+
+    def convert(path):
+        command = [bpy.app.binary_path, "-b", path, "--python-expr", expression, "--", "--config", single_path]
+        process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        return process.returncode, process.stdout
+
+    results = {}
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for path, (code, output) in zip(files, executor.map(convert, files)):
+                print(f"=== {path}")
+                print(output)
+                results[path] = code
+    finally:
+        working_directory.cleanup()
+
+    for path, code in results.items():
+        print(f"  {path}: {'done' if code == 0 else f'failed with exit code {code}'}")
+    return results
+
+def main(argv=None):
+    """ Entry point for blender --python-expr, reads the arguments after -- """
+    if argv is None:
+        argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(prog="seams_to_sewing_pattern.pipeline")
+    parser.add_argument("--config", required=True, help="JSON file with the pipeline options")
+    parser.add_argument("files", nargs="*", help=".blend files to convert, on top of the ones in the config")
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config)
+    config["files"] = config["files"] + args.files
+
+    # The add-on isn't enabled when Blender runs with factory settings
+    import addon_utils
+    if not addon_utils.check(__package__)[1]:
+        addon_utils.enable(__package__)
+
+    if config["files"]:
+        failed = any(code != 0 for code in run_files(config).values())
+    else:
+        failed = any(not str(status).startswith(("converted", "exported")) for status in run(config).values())
+
+    if bpy.app.background:
+        sys.exit(1 if failed else 0)
@@ -0,0 +1,837 @@
+import os
+import sys
+import site
+import importlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+try:
+    from . import remesh_kernels
+except ImportError:
+    # Worker processes load this file as a top level module, outside of the add-on
+    import remesh_kernels
+
+# The Boundary Aligned Remesher on plain arrays. Nothing in here depends on
+# bmesh, so islands can be remeshed in worker processes, and the remesher can
+# be run and benchmarked outside of Blender (benchmarks/remesh_island.py).
+
+NEXT = np.array([1, 2, 0])
+PREV = np.array([2, 0, 1])
+
+def grow(array, size, fill):
+    """ Extends a per vertex array to size entries, new entries get fill """
+    if len(array) >= size:
+        return array
+    extra = np.empty((size - len(array),) + array.shape[1:], dtype=array.dtype)
+    extra[...] = fill
+    return np.concatenate((array, extra))
+
+# Triangle mesh stored in compact arrays. Half-edge h = 3 * face + corner goes
+# from faces[face, corner] to the next corner of the face, twin[h] is the
+# half-edge going the other way, -1 on boundaries. Twins are rebuilt after
+# every batch of edits. Vertex ids never change while remeshing, verts that
+# get merged away are only dropped by compact().
+class TriangleMesh:
+
+    def __init__(self, co, faces, uv=None, material=None, seam=None, pinned=None, source=None):
+        # Edits happen in place, so the arrays are copied
+        self.co = np.array(co, dtype=np.float64).reshape(-1, 3)
+        self.faces = np.array(faces, dtype=np.int64).reshape(-1, 3)
+        face_count = len(self.faces)
+        vertex_count = len(self.co)
+
+        # Per corner UVs, per face materials and per half-edge seam flags
+        self.uv = None if uv is None else np.array(uv, dtype=np.float64).reshape(-1, 3, 2)
+        self.material = np.zeros(face_count, dtype=np.int64) if material is None else np.array(material, dtype=np.int64)
+        self.seam = np.zeros((face_count, 3), dtype=bool) if seam is None else np.array(seam, dtype=bool).reshape(-1, 3)
+
+        # Pinned verts behave like boundary verts, source is the vertex they came from
+        self.pinned = np.zeros(vertex_count, dtype=bool) if pinned is None else np.array(pinned, dtype=bool)
+        self.source = np.arange(vertex_count) if source is None else np.array(source, dtype=np.int64)
+
+        self.update()
+
+    def update(self):
+        """ Rebuilds twins and boundary flags after the faces changed """
+        vertex_count = len(self.co)
+        self.pinned = grow(self.pinned, vertex_count, False)
+        self.source = grow(self.source, vertex_count, -1)
+
+        origin = self.faces.ravel()
+        target = self.faces[:, NEXT].ravel()
+        key = origin * vertex_count + target
+        twin_key = target * vertex_count + origin
+
+        order = np.argsort(key, kind='stable')
+        sorted_key = key[order]
+        position = np.minimum(np.searchsorted(sorted_key, twin_key), max(len(key) - 1, 0))
+        found = sorted_key[position] == twin_key if len(key) else np.zeros(0, dtype=bool)
+        self.twin = np.where(found, order[position], -1)
+
+        border = self.twin < 0
+        self.boundary = np.zeros(vertex_count, dtype=bool)
+        self.boundary[origin[border]] = True
+        self.boundary[target[border]] = True
+
+        self.used = np.bincount(origin, minlength=vertex_count) > 0
+        self.locked = self.boundary | self.pinned
+
+    def half_edge(self, h):
+        """ Returns (face, origin, target, opposite) of the half-edges h """
+        face = h // 3
+        corner = h % 3
+        return (
+            face,
+            self.faces[face, corner],
+            self.faces[face, NEXT[corner]],
+            self.faces[face, PREV[corner]],
+        )
+
+    def edges(self):
+        """ One half-edge for every edge """
+        h = np.arange(len(self.twin))
+        return h[(self.twin < 0) | (h < self.twin)]
+
+    def edge_pairs(self):
+        h = self.edges()
+        face, origin, target, opposite = self.half_edge(h)
+        return np.stack((origin, target), axis=1)
+
+    def edge_lengths(self, h):
+        face, origin, target, opposite = self.half_edge(h)
+        return np.linalg.norm(self.co[target] - self.co[origin], axis=1)
+
+    def face_normals(self, faces=None):
+        """ Area weighted normals """
+        faces = self.faces if faces is None else faces
+        p = self.co[faces]
+        return np.cross(p[:, 1] - p[:, 0], p[:, 2] - p[:, 0])
+
+    def vertex_normals(self):
+        normals = np.zeros_like(self.co)
+        face_normals = self.face_normals()
+        for corner in range(3):
+            np.add.at(normals, self.faces[:, corner], face_normals)
+        length = np.linalg.norm(normals, axis=1)
+        return normals / np.where(length > 0, length, 1)[:, None]
+
+    def vertex_faces(self):
+        """ CSR lists of the faces around every vertex, as (offsets, faces) """
+        flat = self.faces.ravel()
+        order = np.argsort(flat, kind='stable')
+        offsets = np.zeros(len(self.co) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(flat, minlength=len(self.co)), out=offsets[1:])
+        return offsets, order // 3
+
+    def valence(self):
+        pairs = self.edge_pairs()
+        return np.bincount(pairs.ravel(), minlength=len(self.co))
+
+    def independent(self, h, priority):
+        """ Picks the half-edges h that have the highest priority in both of their faces,
+        so no two of the picked ones share a face """
+        face = h // 3
+        twin = self.twin[h]
+        twin_face = np.where(twin >= 0, twin // 3, face)
+
+        # Unique ranks, so ties can't pick two edges of one face
+        rank = np.empty(len(h), dtype=np.int64)
+        rank[np.argsort(priority, kind='stable')] = np.arange(len(h))
+        best = np.full(len(self.faces), -1, dtype=np.int64)
+        np.maximum.at(best, face, rank)
+        np.maximum.at(best, twin_face, rank)
+        return h[(best[face] == rank) & (best[twin_face] == rank)]
+
+    def split_edges(self, h):
+        """ Splits the half-edges h at their middle, none of them may share a face.
+        Returns the verts around the splits """
+        face, a, b, c = self.half_edge(h)
+        corner = h % 3
+        m = len(self.co) + np.arange(len(h))
+        self.co = np.concatenate((self.co, (self.co[a] + self.co[b]) / 2))
+
+        new_faces = [np.stack((m, b, c), axis=1)]
+        new_material = [self.material[face]]
+        seam_ab = self.seam[face, corner]
+        new_seam = [np.stack((seam_ab, self.seam[face, NEXT[corner]], np.zeros_like(seam_ab)), axis=1)]
+        if self.uv is not None:
+            uv = self.uv[face]
+            index = np.arange(len(h))
+            uv_a = uv[index, corner]
+            uv_b = uv[index, NEXT[corner]]
+            uv_c = uv[index, PREV[corner]]
+            uv_m = (uv_a + uv_b) / 2
+            new_uv = [np.stack((uv_m, uv_b, uv_c), axis=1)]
+            self.uv[face] = np.stack((uv_a, uv_m, uv_c), axis=1)
+
+        self.faces[face] = np.stack((a, m, c), axis=1)
+        self.seam[face] = np.stack((seam_ab, np.zeros_like(seam_ab), self.seam[face, PREV[corner]]), axis=1)
+
+        # The face on the other side, (b, a, d) becomes (b, m, d) and (m, a, d)
+        twin = self.twin[h]
+        has_twin = twin >= 0
+        t = twin[has_twin]
+        t_face, t_b, t_a, d = self.half_edge(t)
+        t_corner = t % 3
+        t_m = m[has_twin]
+
+        new_faces.append(np.stack((t_m, t_a, d), axis=1))
+        new_material.append(self.material[t_face])
+        seam_ba = self.seam[t_face, t_corner]
+        new_seam.append(np.stack((seam_ba, self.seam[t_face, NEXT[t_corner]], np.zeros_like(seam_ba)), axis=1))
+        if self.uv is not None:
+            uv = self.uv[t_face]
+            index = np.arange(len(t))
+            uv_b = uv[index, t_corner]
+            uv_a = uv[index, NEXT[t_corner]]
+            uv_d = uv[index, PREV[t_corner]]
+            uv_m = (uv_a + uv_b) / 2
+            new_uv.append(np.stack((uv_m, uv_a, uv_d), axis=1))
+            self.uv[t_face] = np.stack((uv_b, uv_m, uv_d), axis=1)
+
+        self.faces[t_face] = np.stack((t_b, t_m, d), axis=1)
+        self.seam[t_face] = np.stack((seam_ba, np.zeros_like(seam_ba), self.seam[t_face, PREV[t_corner]]), axis=1)
+
+        self.faces = np.concatenate([self.faces] + new_faces)
+        self.material = np.concatenate([self.material] + new_material)
+        self.seam = np.concatenate([self.seam] + new_seam)
+        if self.uv is not None:
+            self.uv = np.concatenate([self.uv] + new_uv)
+        self.update()
+
+        return np.unique(np.concatenate((a, b, c, m, d)))
+
+    def collapse_edges(self, h, fraction=0.5):
+        """ Merges the origin of every half-edge into its target, placed at fraction along the edge.
+
+        Half-edges are tried in order. Collapses that touch a boundary, a seam
+        or the ring of an earlier collapse are skipped, and so are the ones
+        that would pinch or fold the mesh. Returns the verts around the collapses. """
+        offsets, vertex_faces = self.vertex_faces()
+        face_count = np.diff(offsets)
+        rows = self.faces.tolist()
+        twins = self.twin.tolist()
+        locked = self.locked.copy()
+        removed = np.zeros(len(self.faces), dtype=bool)
+        changed = []
+
+        for edge in np.asarray(h).tolist():
+            f, corner = divmod(edge, 3)
+            a = rows[f][corner]
+            b = rows[f][(corner + 1) % 3]
+            twin = twins[edge]
+            if locked[a] or locked[b] or twin < 0:
+                continue
+            g, twin_corner = divmod(twin, 3)
+            c = rows[f][(corner + 2) % 3]
+            d = rows[g][(twin_corner + 2) % 3]
+            if self.seam[f].any() or self.seam[g].any():
+                continue
+
+            # c and d lose an edge, don't let them end up with less than 3
+            if face_count[c] <= 3 or face_count[d] <= 3:
+                continue
+
+            faces_a = vertex_faces[offsets[a]:offsets[a + 1]].tolist()
+            faces_b = vertex_faces[offsets[b]:offsets[b + 1]].tolist()
+            ring_a = {v for face in faces_a for v in rows[face]} - {a}
+            ring_b = {v for face in faces_b for v in rows[face]} - {b}
+            if ring_a & ring_b != {c, d}:
+                continue
+
+            # The remaining faces must not flip over
+            keep = [face for face in set(faces_a) | set(faces_b) if face != f and face != g]
+            position = self.co[a] + (self.co[b] - self.co[a]) * fraction
+            kept_faces = self.faces[keep]
+            points = self.co[kept_faces]
+            before = triangle_normals(points)
+            points[(kept_faces == a) | (kept_faces == b)] = position
+            after = triangle_normals(points)
+            if np.any((before * after).sum(axis=1) <= 0):
+                continue
+
+            if self.uv is not None:
+                # Moves the UVs along with the verts, taken from the collapsed face
+                uv = self.uv[f]
+                delta = uv[(corner + 1) % 3] - uv[corner]
+                for face in keep:
+                    for i in range(3):
+                        if rows[face][i] == a:
+                            self.uv[face, i] += delta * fraction
+                        elif rows[face][i] == b:
+                            self.uv[face, i] -= delta * (1 - fraction)
+
+            for face in faces_a:
+                if face != f and face != g:
+                    rows[face] = [b if v == a else v for v in rows[face]]
+                    self.faces[face] = rows[face]
+                    face_count[b] += 1
+            removed[f] = removed[g] = True
+            for v in (a, b, c):
+                face_count[v] -= 1
+            for v in (a, b, d):
+                face_count[v] -= 1
+            self.co[b] = position
+
+            ring = ring_a | ring_b | {a, b}
+            locked[list(ring)] = True
+            changed.extend(ring)
+
+        if removed.any():
+            keep_faces = ~removed
+            self.faces = self.faces[keep_faces]
+            self.material = self.material[keep_faces]
+            self.seam = self.seam[keep_faces]
+            if self.uv is not None:
+                self.uv = self.uv[keep_faces]
+            self.update()
+
+        return np.unique(np.array(changed, dtype=np.int64))
+
+    def flip_edges(self, h):
+        """ Flips the shared edge of the two faces of every half-edge, none of them may share a face.
+        Face (a, b, c) and its twin (b, a, d) become (c, a, d) and (d, b, c) """
+        face, a, b, c = self.half_edge(h)
+        corner = h % 3
+        twin = self.twin[h]
+        t_face, t_b, t_a, d = self.half_edge(twin)
+        t_corner = twin % 3
+
+        seam_bc = self.seam[face, NEXT[corner]]
+        seam_ca = self.seam[face, PREV[corner]]
+        seam_ad = self.seam[t_face, NEXT[t_corner]]
+        seam_db = self.seam[t_face, PREV[t_corner]]
+        no_seam = np.zeros_like(seam_bc)
+
+        if self.uv is not None:
+            index = np.arange(len(h))
+            uv = self.uv[face]
+            t_uv = self.uv[t_face]
+            uv_a = uv[index, corner]
+            uv_b = uv[index, NEXT[corner]]
+            uv_c = uv[index, PREV[corner]]
+            uv_d = t_uv[index, PREV[t_corner]]
+            self.uv[face] = np.stack((uv_c, uv_a, uv_d), axis=1)
+            self.uv[t_face] = np.stack((uv_d, uv_b, uv_c), axis=1)
+
+        self.faces[face] = np.stack((c, a, d), axis=1)
+        self.faces[t_face] = np.stack((d, b, c), axis=1)
+        self.seam[face] = np.stack((seam_ca, seam_ad, no_seam), axis=1)
+        self.seam[t_face] = np.stack((seam_db, seam_bc, no_seam), axis=1)
+        self.update()
+
+        return np.unique(np.concatenate((a, b, c, d)))
+
+    def flip_candidates(self, region=None):
+        """ Interior edges whose flip makes the triangles closer to Delaunay, like
+        beautify_fill with the angle method. Returns (half-edges, priority) """
+        h = self.edges()
+        h = h[self.twin[h] >= 0]
+        face, a, b, c = self.half_edge(h)
+        t_face, t_b, t_a, d = self.half_edge(self.twin[h])
+        if region is not None:
+            keep = region[a] | region[b]
+            h, face, t_face, a, b, c, d = (x[keep] for x in (h, face, t_face, a, b, c, d))
+
+        co = self.co
+        def angle(apex, p, q):
+            u = co[p] - co[apex]
+            v = co[q] - co[apex]
+            return np.arctan2(np.linalg.norm(np.cross(u, v), axis=1), (u * v).sum(axis=1))
+
+        excess = angle(c, a, b) + angle(d, b, a) - np.pi
+        ok = (excess > 1e-6) & (c != d) & ~self.seam[face, h % 3]
+
+        # The new triangles have to face the same way as the old ones
+        normal = self.face_normals(self.faces[face]) + self.face_normals(self.faces[t_face])
+        first = np.cross(co[a] - co[c], co[d] - co[c])
+        second = np.cross(co[b] - co[d], co[c] - co[d])
+        ok &= ((first * normal).sum(axis=1) > 0) & ((second * normal).sum(axis=1) > 0)
+
+        # a and b lose an edge
+        valence = self.valence()
+        ok &= (valence[a] > 3) & (valence[b] > 3)
+
+        # Only when the UVs are continuous across the edge
+        if self.uv is not None:
+            corner = h % 3
+            t_corner = self.twin[h] % 3
+            same_a = np.all(np.isclose(self.uv[face, corner], self.uv[t_face, NEXT[t_corner]]), axis=1)
+            same_b = np.all(np.isclose(self.uv[face, NEXT[corner]], self.uv[t_face, t_corner]), axis=1)
+            ok &= same_a & same_b
+
+        # The new edge must not exist yet
+        vertex_count = len(co)
+        pairs = self.edge_pairs()
+        existing = np.minimum(pairs[:, 0], pairs[:, 1]) * vertex_count + np.maximum(pairs[:, 0], pairs[:, 1])
+        new = np.minimum(c, d) * vertex_count + np.maximum(c, d)
+        ok &= ~np.isin(new, existing)
+
+        h, excess, new = h[ok], excess[ok], new[ok]
+        # Two flips may not create the same edge
+        unique = np.unique(new, return_index=True)[1]
+        return h[unique], excess[unique]
+
+    def smooth(self, directions, movable, rule):
+        """ Moves the movable verts towards the neighbors picked by rule, ranked by their
+        angle to directions, see remesh_kernels.align_positions """
+        offsets, neighbors = remesh_kernels.build_adjacency(self.edge_pairs(), len(self.co))
+        self.co = remesh_kernels.align_positions(
+            self.co, self.vertex_normals(), offsets, neighbors, directions, movable, rule
+        )
+
+    def compact(self):
+        """ Drops the verts that no face uses anymore """
+        remap = np.cumsum(self.used) - 1
+        self.co = self.co[self.used]
+        self.pinned = self.pinned[self.used]
+        self.source = self.source[self.used]
+        self.faces = remap[self.faces]
+        self.update()
+
+def triangle_normals(points):
+    """ Area weighted normals of an (N, 3, 3) array of triangles.
+    Spelled out, np.cross is slow on the handful of faces around one vertex """
+    u = points[:, 1] - points[:, 0]
+    v = points[:, 2] - points[:, 0]
+    return np.stack((
+        u[:, 1] * v[:, 2] - u[:, 2] * v[:, 1],
+        u[:, 2] * v[:, 0] - u[:, 0] * v[:, 2],
+        u[:, 0] * v[:, 1] - u[:, 1] * v[:, 0],
+    ), axis=1)
+
+# Finds the closest point on a fixed triangle mesh, for reprojection.
+# Triangles are binned by their bounding box, see remesh_kernels.CellGrid.
+class SurfaceProjector:
+
+    def __init__(self, co, faces):
+        self.co = np.array(co, dtype=np.float64).reshape(-1, 3)
+        self.faces = np.array(faces, dtype=np.int64).reshape(-1, 3)
+        corners = self.co[self.faces]
+        self.low = corners.min(axis=1)
+        self.high = corners.max(axis=1)
+        self.centers = corners.mean(axis=1)
+        bounds_min = self.low.min(axis=0) if len(corners) else np.zeros(3)
+        bounds_max = self.high.max(axis=0) if len(corners) else np.zeros(3)
+
+        # Cells about the size of a triangle. On a curved piece, cells filling
+        # its bounding box would each hold a lot of them
+        cell_size = float(np.median((self.high - self.low).max(axis=1))) if len(corners) else 0.0
+        self.grid = remesh_kernels.CellGrid(self.low, self.high, bounds_min, bounds_max,
+                                            cell_count=max(64, 32 * len(self.faces)), cell_size=cell_size)
+
+    def closest_points(self, queries, faces):
+        corners = self.co[self.faces[faces]]
+        return closest_point_on_triangles(queries, corners[:, 0], corners[:, 1], corners[:, 2])
+
+    def project(self, queries):
+        queries = np.asarray(queries, dtype=np.float64).reshape(-1, 3)
+        if len(self.faces) == 0 or len(queries) == 0:
+            return queries.copy()
+
+        def distance(q, faces):
+            # The center of a triangle is on it, so no triangle whose box is further
+            # away than some center can be the closest one, those aren't measured
+            p = queries[q]
+            gap = np.maximum(np.maximum(self.low[faces] - p, p - self.high[faces]), 0)
+            lower = (gap ** 2).sum(axis=1)
+            upper = np.full(len(queries), np.inf)
+            np.minimum.at(upper, q, ((self.centers[faces] - p) ** 2).sum(axis=1))
+            result = np.full(len(q), np.inf)
+            keep = lower <= upper[q]
+            result[keep] = ((self.closest_points(p[keep], faces[keep]) - p[keep]) ** 2).sum(axis=1)
+            return result
+
+        nearest = self.grid.search(queries, distance)
+        return self.closest_points(queries, nearest)
+
+def closest_point_on_triangles(p, a, b, c):
+    """ Closest point on every triangle (a, b, c) to p, from Real-Time Collision Detection """
+    ab = b - a
+    ac = c - a
+    ap = p - a
+    d1 = (ab * ap).sum(axis=1)
+    d2 = (ac * ap).sum(axis=1)
+    bp = p - b
+    d3 = (ab * bp).sum(axis=1)
+    d4 = (ac * bp).sum(axis=1)
+    cp = p - c
+    d5 = (ab * cp).sum(axis=1)
+    d6 = (ac * cp).sum(axis=1)
+
+    va = d3 * d6 - d5 * d4
+    vb = d5 * d2 - d1 * d6
+    vc = d1 * d4 - d3 * d2
+    denominator = va + vb + vc
+    denominator = np.where(np.abs(denominator) > 1e-300, denominator, 1e-300)
+    v = vb / denominator
+    w = vc / denominator
+    result = a + ab * v[:, None] + ac * w[:, None]
+
+    def safe_divide(x, y):
+        return x / np.where(np.abs(y) > 1e-300, y, 1e-300)
+
+    # Regions are checked from the last to the first, so the first match wins
+    t = safe_divide(d4 - d3, (d4 - d3) + (d5 - d6))
+    region = (va <= 0) & (d4 - d3 >= 0) & (d5 - d6 >= 0)
+    result = np.where(region[:, None], b + (c - b) * t[:, None], result)
+
+    t = safe_divide(d2, d2 - d6)
+    region = (vb <= 0) & (d2 >= 0) & (d6 <= 0)
+    result = np.where(region[:, None], a + ac * t[:, None], result)
+
+    region = (d6 >= 0) & (d5 <= d6)
+    result = np.where(region[:, None], c, result)
+
+    t = safe_divide(d1, d1 - d3)
+    region = (vc <= 0) & (d1 >= 0) & (d3 <= 0)
+    result = np.where(region[:, None], a + ab * t[:, None], result)
+
+    region = (d3 >= 0) & (d4 <= d3)
+    result = np.where(region[:, None], b, result)
+
+    region = (d1 <= 0) & (d2 <= 0)
+    result = np.where(region[:, None], a, result)
+    return result
+
+# Remeshes one TriangleMesh: every iteration enforces the edge length, aligns the
+# verts to the nearest boundary and reprojects them on the original surface
+class ArrayRemesher:
+
+    def __init__(self, mesh):
+        self.mesh = mesh
+
+        # Boundary edges are the source of directional data
+        h = np.nonzero(mesh.twin < 0)[0]
+        face, origin, target, opposite = mesh.half_edge(h)
+        vectors = mesh.co[origin] - mesh.co[target]
+        length = np.linalg.norm(vectors, axis=1)
+        self.boundary_vectors = vectors / np.where(length > 0, length, 1)[:, None]
+        self.boundary_centers = (mesh.co[origin] + mesh.co[target]) / 2
+
+        # Two cells per boundary point keeps the candidate lists of the cells short
+        co = mesh.co if len(mesh.co) else np.zeros((1, 3))
+        self.boundary_grid = remesh_kernels.NearestPointGrid(
+            self.boundary_centers, co.min(axis=0), co.max(axis=0),
+            cell_count=max(16, 2 * len(h))
+        )
+        # The surface to reproject on is only built when it is needed
+        self.surface = (mesh.co.copy(), mesh.faces.copy())
+        self.projector = None
+        self.projected_co = np.full((0, 3), np.inf)
+
+        # Nearest boundary of every vert, with the location it was looked up at
+        self.direction_co = np.full((0, 3), np.inf)
+        self.direction_index = np.zeros(0, dtype=np.int64)
+        self.direction_tolerance = 0.0
+
+        # Location of every vert the last time its region was enforced
+        self.settled_co = np.full((0, 3), np.inf)
+        self.edits = 0
+        self.iterations_run = 0
+
+    def enforce_edge_length(self, edge_length=0.05, bias=0.333, region=None, max_passes=8):
+        """ Splits long edges, dissolves low valence verts, collapses short edges and flips
+        edges towards Delaunay, like dyntopo. Only edges around region are
+        revisited, all of them when region is None. Returns a mask of the
+        verts that changed """
+        mesh = self.mesh
+        upper_length = edge_length + edge_length * bias
+        lower_length = edge_length - edge_length * bias
+
+        vertex_count = len(mesh.co)
+        region = np.ones(vertex_count, dtype=bool) if region is None else grow(region, vertex_count, True)
+        changed = np.zeros(vertex_count, dtype=bool)
+        # Number of splits, collapses and flips, every collapse removes two faces
+        self.edits = 0
+
+        def mark(verts):
+            nonlocal region, changed
+            region = grow(region, len(mesh.co), True)
+            changed = grow(changed, len(mesh.co), True)
+            changed[verts] = True
+
+        def in_region(h):
+            face, origin, target, opposite = mesh.half_edge(h)
+            return region[origin] | region[target] | changed[origin] | changed[target]
+
+        # Subdivide long edges, a few passes so edges much longer than the target get split again
+        for _ in range(max_passes):
+            h = mesh.edges()
+            h = h[in_region(h)]
+            length = mesh.edge_lengths(h)
+            long_edges = length > upper_length
+            if not long_edges.any():
+                break
+            h = mesh.independent(h[long_edges], length[long_edges])
+            self.edits += len(h)
+            mark(mesh.split_edges(h))
+
+        # Remove verts with less than 5 edges, by merging them into a neighbor
+        valence = mesh.valence()
+        dissolve = np.nonzero((region | changed) & mesh.used & ~mesh.locked & (valence < 5))[0]
+        if len(dissolve):
+            offsets, vertex_faces = mesh.vertex_faces()
+            h = []
+            for vert in dissolve.tolist():
+                for face in vertex_faces[offsets[vert]:offsets[vert + 1]].tolist():
+                    corner = mesh.faces[face].tolist().index(vert)
+                    h.append(3 * face + corner)
+            face_count = len(mesh.faces)
+            mark(mesh.collapse_edges(np.array(h, dtype=np.int64), fraction=1.0))
+            self.edits += (face_count - len(mesh.faces)) // 2
+
+        # Collapse short edges but ignore boundaries and never collapse two chained edges
+        h = mesh.edges()
+        h = h[in_region(h) & (mesh.twin[h] >= 0)]
+        length = mesh.edge_lengths(h)
+        short_edges = length < lower_length
+        h = h[short_edges][np.argsort(length[short_edges], kind='stable')]
+        if len(h):
+            face_count = len(mesh.faces)
+            mark(mesh.collapse_edges(h, fraction=0.5))
+            self.edits += (face_count - len(mesh.faces)) // 2
+
+        # Beautify
+        for _ in range(max_passes):
+            h, excess = mesh.flip_candidates(region | changed)
+            if len(h) == 0:
+                break
+            h = mesh.independent(h, excess)
+            self.edits += len(h)
+            mark(mesh.flip_edges(h))
+
+        return changed
+
+    def nearest_boundary_vectors(self, verts):
+        """ Gets the nearest boundary direction of verts in one query, verts that moved less
+        than direction_tolerance since their direction was looked up keep it """
+        co = self.mesh.co[verts]
+        self.direction_co = grow(self.direction_co, len(self.mesh.co), np.inf)
+        self.direction_index = grow(self.direction_index, len(self.mesh.co), -1)
+
+        moved = ((co - self.direction_co[verts]) ** 2).sum(axis=1) > self.direction_tolerance ** 2
+        moved |= self.direction_index[verts] < 0
+        stale = verts[moved]
+        if len(stale):
+            self.direction_index[stale] = self.boundary_grid.find(self.mesh.co[stale])
+            self.direction_co[stale] = self.mesh.co[stale]
+
+        if len(self.boundary_vectors) == 0:
+            return np.zeros_like(co)
+        return self.boundary_vectors[self.direction_index[verts]]
+
+    def align_verts(self, rule=(-1, -2, -3, -4)):
+        # Align verts to the nearest boundary by averaging neigbor vert locations selected
+        # by a specific rule,
+
+        # Rules work by sorting edges by angle relative to the boundary.
+        # Eg1. (0, 1) stands for averagiing the biggest angle and the 2nd biggest angle edges.
+        # Eg2. (-1, -2, -3, -4), averages the four smallest angle edges
+        mesh = self.mesh
+        movable = mesh.used & ~mesh.locked
+        directions = np.zeros_like(mesh.co)
+        directions[movable] = self.nearest_boundary_vectors(np.nonzero(movable)[0])
+        mesh.smooth(directions, movable, rule)
+
+    def reproject(self, tolerance=0.0):
+        """ Recovers original shape. Verts that moved less than tolerance since
+        they were last reprojected are left where they are """
+        mesh = self.mesh
+        if self.projector is None:
+            self.projector = SurfaceProjector(*self.surface)
+
+        self.projected_co = grow(self.projected_co, len(mesh.co), np.inf)
+        movable = mesh.used & ~mesh.locked
+        if tolerance > 0:
+            movable &= ~(((mesh.co - self.projected_co) ** 2).sum(axis=1) <= tolerance ** 2)
+
+        verts = np.nonzero(movable)[0]
+        mesh.co[verts] = self.projector.project(mesh.co[verts])
+        self.projected_co[verts] = mesh.co[verts]
+
+    def moved_verts(self, tolerance):
+        """ Mask of the verts that moved more than tolerance since they were last looked at """
+        co = self.mesh.co
+        self.settled_co = grow(self.settled_co, len(co), np.inf)
+        moved = ~(((co - self.settled_co) ** 2).sum(axis=1) <= tolerance ** 2)
+        moved &= self.mesh.used
+        self.settled_co[moved] = co[moved]
+        return moved
+
+    def edge_length_deviation(self, edge_length):
+        """ Root mean square of the edge length error, relative to edge_length """
+        length = self.mesh.edge_lengths(self.mesh.edges())
+        if len(length) == 0:
+            return 0.0
+        return float(np.sqrt(np.mean((length / edge_length - 1) ** 2)))
+
+    def remesh(self, edge_length=0.05, iterations=30, quads=True, reproject=True, direction_tolerance=0.1, settle_tolerance=0.01,
+               converge=False, convergence_window=4, edit_tolerance=0.01, displacement_tolerance=0.005,
+               deviation_tolerance=0.005, settle_ratio=0.8, reproject_final_only=False, reproject_tolerance=0.0):
+        """ Coordenates remeshing, joining triangles into quads is left to the caller.
+
+        With converge, stops once the mesh has settled, see converged(). With
+        reproject_final_only, verts are only put back on the surface after
+        the last iteration. Otherwise every iteration reprojects the verts that
+        moved more than reproject_tolerance * edge_length since their last
+        reprojection. """
+        self.direction_tolerance = edge_length * direction_tolerance
+        if quads:
+            rule = (-1,-2, 0, 1)
+        else:
+            rule = (0, 1, 2, 3)
+
+        region = None
+        self.history = []
+        self.iterations_run = 0
+
+        for i in range(iterations):
+            self.iterations_run = i + 1
+            changed = self.enforce_edge_length(edge_length=edge_length, region=region)
+
+            before = self.mesh.co.copy()
+            self.align_verts(rule=rule)
+            if reproject and not reproject_final_only:
+                self.reproject(edge_length * reproject_tolerance)
+
+            moved = self.moved_verts(edge_length * settle_tolerance)
+            region = grow(changed, len(moved), True) | moved
+
+            # One stopping rule: nothing is left to revisit, or the mesh has settled
+            if converge:
+                if not region.any():
+                    break
+                used = self.mesh.used
+                displacement = np.linalg.norm(self.mesh.co[used] - before[used], axis=1).mean() / edge_length if used.any() else 0.0
+                edit_fraction = self.edits / max(len(self.mesh.edges()), 1)
+                self.history.append((edit_fraction, displacement, self.edge_length_deviation(edge_length)))
+                if converged(self.history, convergence_window, edit_tolerance, displacement_tolerance,
+                             deviation_tolerance, settle_ratio):
+                    break
+
+        if reproject and reproject_final_only:
+            self.reproject()
+
+        self.mesh.compact()
+        return self.mesh
+
+def converged(history, window=4, edit_tolerance=0.01, displacement_tolerance=0.005, deviation_tolerance=0.005, settle_ratio=0.8):
+    """ Whether the remesher can stop, given the (edit fraction, displacement, deviation) of every
+    iteration so far. Edit fraction is the number of splits, collapses and flips per edge,
+    displacement and deviation are relative to the edge length.
+
+    Remeshing never comes to a complete rest: aligning the verts pushes a few edges out of
+    the length band every iteration, and enforcing the length pushes them back. So the
+    means over the last window iterations are compared with the window before. The mesh
+    has settled when it is quiet, below edit_tolerance and displacement_tolerance, or
+    when the edits and the displacement dropped to no less than settle_ratio of the
+    window before while the deviation improved by less than deviation_tolerance. """
+    if len(history) < window:
+        return False
+    last = np.mean(history[-window:], axis=0)
+    if last[0] < edit_tolerance and last[1] < displacement_tolerance:
+        return True
+    if len(history) < 2 * window:
+        return False
+    previous = np.mean(history[-2 * window:-window], axis=0)
+    return bool(last[0] >= settle_ratio * previous[0]
+                and last[1] >= settle_ratio * previous[1]
+                and last[2] > previous[2] - deviation_tolerance)
+
+def remesh_island(island, settings):
+    """ Remeshes one island given as a dict of arrays, returns the remeshed arrays.
+    This is what runs in the worker processes """
+    mesh = TriangleMesh(
+        island["co"], island["faces"], island.get("uv"), island.get("material"),
+        island.get("seam"), island.get("pinned"), island.get("source"),
+    )
+    remesher = ArrayRemesher(mesh)
+    remesher.remesh(**settings)
+    return {
+        "co": mesh.co,
+        "faces": mesh.faces,
+        "uv": mesh.uv,
+        "material": mesh.material,
+        "seam": mesh.seam,
+        "source": mesh.source,
+        "iterations": remesher.iterations_run,
+    }
+
+class WorkerReference:
+    """ A function of this file, pickled so that worker processes import the
+    file as a top level module. Through the add-on package they would import
+    bpy, which only exists in Blender itself. Without a name, this file """
+
+    def __init__(self, name=None):
+        self.name = name
+
+    def __reduce__(self):
+        if self.name is None:
+            return (importlib.import_module, ("remesh_core",))
+        return (getattr, (WorkerReference(), self.name))
+
+def spawn_problem():
+    """ Why worker processes can't be spawned from here, None when they can """
+    # Spawned workers run the __main__ file of their parent again
+    main_file = getattr(sys.modules.get("__main__"), "__file__", None)
+    if main_file and not os.path.isfile(main_file):
+        return f"__main__ is {main_file}, workers can't load it"
+
+    bpy = sys.modules.get("bpy")
+    if bpy is None:
+        return None
+    # Spawned workers run sys.executable, older Blender builds point it at Blender itself
+    if os.path.realpath(sys.executable) == os.path.realpath(bpy.app.binary_path):
+        return "sys.executable is Blender, not Python"
+    # In Blender the __main__ file is the script Blender was started with,
+    # every worker would run it again
+    if main_file:
+        return "Blender runs a script file as __main__"
+    return None
+
+def remesh_islands(islands, settings, workers=0, progress=None):
+    """ Remeshes every island, in worker processes when there are several of them.
+    workers=1 remeshes them one after the other in this process, so does a pool
+    that can't be started or whose workers die. Errors of an island are raised
+    as they are. progress is called with the fraction of islands done """
+    workers = min(workers or os.cpu_count() or 1, len(islands))
+    progress = progress or (lambda fraction: None)
+
+    problem = spawn_problem() if workers > 1 else None
+    if problem:
+        print(f"Can't start worker processes ({problem}), remeshing islands one by one")
+    elif workers > 1:
+        context = multiprocessing.get_context("spawn")
+        # Only the workers get the folder of this file on their path
+        directory = os.path.dirname(os.path.abspath(__file__))
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                       initializer=site.addsitedir, initargs=(directory,))
+        with executor:
+            try:
+                # Processes are started as the islands are submitted
+                task = WorkerReference("remesh_island")
+                futures = [executor.submit(task, island, settings) for island in islands]
+            except OSError as e:
+                print(f"Can't start worker processes ({e}), remeshing islands one by one")
+            else:
+                try:
+                    for done, future in enumerate(as_completed(futures)):
+                        future.result()
+                        progress((done + 1) / len(islands))
+                    return [future.result() for future in futures]
+                except BrokenProcessPool as e:
+                    print(f"Worker processes died ({e}), remeshing islands one by one")
+                except BaseException:
+                    # The islands that are left aren't waited for
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    raise
+
+    results = []
+    for island in islands:
+        results.append(remesh_island(island, settings))
+        progress(len(results) / len(islands))
+    return results
@@ -0,0 +1,302 @@
+import numpy as np
+
+# Array kernels for the Boundary Aligned Remesher. Everything in here works on
+# plain NumPy arrays, so it doesn't depend on bmesh.
+
+def build_adjacency(edges, vertex_count):
+    """ Builds a CSR style vertex adjacency out of an (E, 2) edge array.
+
+    Returns (offsets, neighbors): the neighbors of vertex v are
+    neighbors[offsets[v]:offsets[v + 1]]. """
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    source = np.concatenate((edges[:, 0], edges[:, 1]))
+    target = np.concatenate((edges[:, 1], edges[:, 0]))
+
+    order = np.argsort(source, kind='stable')
+    neighbors = target[order]
+
+    offsets = np.zeros(vertex_count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(source, minlength=vertex_count), out=offsets[1:])
+    return offsets, neighbors
+
+def align_positions(co, normals, offsets, neighbors, directions, movable, rule):
+    """ Moves every movable vertex towards the average of the neighbors picked by rule.
+
+    Neighbors are ranked by the angle between the edge and the direction of the
+    vertex, from the biggest angle (0) to the smallest (-1). The movement is
+    projected onto the tangent plane given by the normal. All vertices move at
+    once, based on the positions they had before. Returns the new positions. """
+    vertex_count = len(co)
+    valence = np.diff(offsets)
+    owner = np.repeat(np.arange(vertex_count), valence)
+
+    delta = co[neighbors] - co[owner]
+    length = np.linalg.norm(delta, axis=1)
+    unit = delta / np.where(length > 0, length, 1)[:, None]
+    key = np.abs((unit * directions[owner]).sum(axis=1))
+
+    # Sorts the neighbors of every vertex by key, keeping the CSR layout
+    ranked = neighbors[np.lexsort((key, owner))]
+
+    index = np.nonzero(movable & (valence > 0))[0]
+    start = offsets[index]
+    count = valence[index]
+
+    total = co[index].copy()
+    for i in rule:
+        total += co[ranked[start + i % count]]
+    total /= len(rule) + 1
+
+    offset = total - co[index]
+    normal = normals[index]
+    offset -= (offset * normal).sum(axis=1)[:, None] * normal
+
+    new_co = co.copy()
+    new_co[index] += offset
+    return new_co
+
+# Nearest item lookups against a fixed set of items, answered for many queries
+# at once. Space is divided in a grid of cubes and every cell lists the items
+# whose bounding box overlaps it. A query looks at the cells around its own one
+# ring by ring, and stops once no cell further out can hold a closer item.
+class CellGrid:
+
+    def __init__(self, low, high, bounds_min, bounds_max, cell_count=4096, cell_size=0.0):
+        low = np.asarray(low, dtype=np.float64).reshape(-1, 3)
+        high = np.asarray(high, dtype=np.float64).reshape(-1, 3)
+        self.count = len(low)
+
+        # Cells are cubes, flat dimensions only get a single layer of cells.
+        # Without cell_size they fill the bounds with cell_count cells, a
+        # cell_size only applies as long as it doesn't need more cells than that
+        self.origin = np.asarray(bounds_min, dtype=np.float64)
+        extent = np.asarray(bounds_max, dtype=np.float64) - self.origin
+        size = max(float(extent.max()), 1e-9)
+        used = extent > size * 1e-6
+        volume = np.prod(extent[used]) if used.any() else size
+        self.cell_size = max((volume / max(cell_count, 1)) ** (1.0 / max(used.sum(), 1)), 1e-9)
+        if cell_size > 0:
+            self.cell_size = max(cell_size, self.cell_size)
+        self.dims = np.maximum(np.ceil(extent / self.cell_size).astype(np.int64), 1)
+
+        # Every item goes in all the cells its box overlaps, as CSR lists
+        first = self.cell_of(low)
+        last = self.cell_of(high)
+        span = last - first + 1
+        per_item = np.prod(span, axis=1)
+        item = np.repeat(np.arange(self.count), per_item)
+        rank = np.arange(len(item)) - np.repeat(np.cumsum(per_item) - per_item, per_item)
+        cell = first[item] + np.stack((
+            rank // (span[item, 1] * span[item, 2]),
+            rank // span[item, 2] % span[item, 1],
+            rank % span[item, 2],
+        ), axis=1)
+        flat = self.flat(cell)
+        self.spread = bool(np.any(per_item > 1))
+        order = np.argsort(flat, kind='stable')
+        self.items = item[order]
+        self.offsets = np.zeros(int(np.prod(self.dims)) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(flat, minlength=len(self.offsets) - 1), out=self.offsets[1:])
+
+        # The first ring around every grid corner that has items in it, the
+        # rings inside of it are empty and are skipped by the search
+        occupied = np.pad((np.diff(self.offsets) > 0).reshape(self.dims), 1)
+        reached = np.zeros(self.dims + 1, dtype=bool)
+        for shift in np.ndindex(*(2 if dim > 1 else 1 for dim in self.dims)):
+            # Corner g touches cells g - 1 and g, flat dimensions only cell 0
+            window = tuple(slice(s, s + dim + 1) if dim > 1 else slice(1, 2) for s, dim in zip(shift, self.dims))
+            reached |= occupied[window]
+        self.first_ring = np.full(self.dims + 1, -1, dtype=np.int64)
+        radius = 0
+        while self.count and not reached.all():
+            self.first_ring[reached & (self.first_ring < 0)] = radius
+            # Ring radius + 1 around a corner is ring radius around its neighbors,
+            # diagonal ones too, so the steps along every axis add up
+            for axis in np.nonzero(self.dims > 1)[0]:
+                ahead = [slice(None)] * 3
+                behind = [slice(None)] * 3
+                ahead[axis] = slice(1, None)
+                behind[axis] = slice(None, -1)
+                grown = reached.copy()
+                grown[tuple(ahead)] |= reached[tuple(behind)]
+                grown[tuple(behind)] |= reached[tuple(ahead)]
+                reached = grown
+            radius += 1
+        self.first_ring[self.first_ring < 0] = radius
+
+    def cell_of(self, co):
+        """ Cell of every location, locations outside the grid get the closest cell """
+        cell = np.floor((co - self.origin) / self.cell_size).astype(np.int64)
+        return np.clip(cell, 0, self.dims - 1)
+
+    def flat(self, cell):
+        return (cell[..., 0] * self.dims[1] + cell[..., 1]) * self.dims[2] + cell[..., 2]
+
+    def ring(self, radius):
+        """ Offsets from a grid corner of the cells in ring radius around it: the
+        block from -radius - 1 to radius without the block inside of it. Flat
+        dimensions stay at 0 """
+        steps = [np.arange(-radius - 1, radius + 1) if dim > 1 else np.zeros(1, dtype=np.int64) for dim in self.dims]
+        offsets = np.stack(np.meshgrid(*steps, indexing='ij'), axis=-1).reshape(-1, 3)
+        flat = self.dims == 1
+        outer = ((offsets == -radius - 1) | (offsets == radius)) & ~flat
+        return offsets[outer.any(axis=1) | (radius == 0)]
+
+    def corners(self, queries):
+        """ The grid corner closest to every query, flat dimensions at 0 """
+        corners = np.clip(np.round((queries - self.origin) / self.cell_size).astype(np.int64), 0, self.dims)
+        corners[:, self.dims == 1] = 0
+        return corners
+
+    def ring_pairs(self, corners, queries, radius):
+        """ (query, item) pairs of the items in ring radius around the corners of the queries """
+        cell = corners[queries][:, None, :] + self.ring(radius)[None, :, :]
+        inside = np.all((cell >= 0) & (cell < self.dims), axis=2)
+        row, column = np.nonzero(inside)
+        flat = self.flat(cell[row, column])
+        start = self.offsets[flat]
+        count = self.offsets[flat + 1] - start
+        owner = np.repeat(queries[row], count)
+        item = self.items[np.repeat(start, count) + np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)]
+
+        # Items overlapping several cells of the ring only need to be measured once.
+        # Pairs stay grouped by query
+        if self.spread:
+            pair = np.sort(owner * self.count + item)
+            pair = pair[np.concatenate(([True], pair[1:] != pair[:-1]))]
+            owner, item = pair // self.count, pair % self.count
+        return owner, item
+
+    def reach(self, queries, corners, radius):
+        """ How far the queries can see after searching ring radius: items that weren't
+        seen yet are outside of the block searched so far, sides at the end of the
+        grid have nothing behind them """
+        low = corners - radius - 1
+        high = corners + radius + 1
+        below = np.where(low > 0, queries - (self.origin + low * self.cell_size), np.inf)
+        above = np.where(high < self.dims, self.origin + high * self.cell_size - queries, np.inf)
+        return np.minimum(below, above).min(axis=1)
+
+    def search(self, queries, distance):
+        """ Index of the closest item for every query, -1 when there are no items.
+
+        distance(query_index, item_index) returns the squared distances of
+        the pairs. The search starts at the cells around the grid corner
+        closest to the query, and a query is done once its closest item so
+        far is closer than the walls of the block of cells it searched.
+        Queries outside of the grid start at the closest corner. """
+        queries = np.asarray(queries, dtype=np.float64).reshape(-1, 3)
+        best = np.full(len(queries), -1, dtype=np.int64)
+        best_distance = np.full(len(queries), np.inf)
+        if self.count == 0:
+            return best
+
+        corners = self.corners(queries)
+        first_ring = self.first_ring[corners[:, 0], corners[:, 1], corners[:, 2]]
+        active = np.arange(len(queries))
+        radius = 0
+        while len(active):
+            owner, item = self.ring_pairs(corners, active[first_ring[active] <= radius], radius)
+            if len(item):
+                d = distance(owner, item)
+                # The closest item of every query in this ring
+                head = np.flatnonzero(np.concatenate(([True], owner[1:] != owner[:-1])))
+                group = np.repeat(np.arange(len(head)), np.diff(np.append(head, len(owner))))
+                hit = np.flatnonzero(d == np.minimum.reduceat(d, head)[group])
+                hit = hit[np.concatenate(([True], group[hit][1:] != group[hit][:-1]))]
+                owner, item, d = owner[hit], item[hit], d[hit]
+                closer = d < best_distance[owner]
+                best[owner[closer]] = item[closer]
+                best_distance[owner[closer]] = d[closer]
+
+            reach = self.reach(queries[active], corners[active], radius)
+            active = active[best_distance[active] > reach ** 2]
+            radius += 1
+        return best
+
+    def within(self, queries, limit, distance):
+        """ All (query, item) pairs with the item at most limit away from the query,
+        grouped by query. distance works like in search """
+        queries = np.asarray(queries, dtype=np.float64).reshape(-1, 3)
+        owners = []
+        items = []
+        corners = self.corners(queries)
+        active = np.arange(len(queries)) if self.count else np.zeros(0, dtype=np.int64)
+        radius = 0
+        while len(active):
+            owner, item = self.ring_pairs(corners, active, radius)
+            close = distance(owner, item) <= limit[owner] ** 2
+            owners.append(owner[close])
+            items.append(item[close])
+
+            reach = self.reach(queries[active], corners[active], radius)
+            active = active[limit[active] > reach]
+            radius += 1
+
+        owner = np.concatenate(owners) if owners else np.zeros(0, dtype=np.int64)
+        item = np.concatenate(items) if items else np.zeros(0, dtype=np.int64)
+        order = np.argsort(owner, kind='stable')
+        return owner[order], item[order]
+
+# The nearest of a fixed set of points. Every cell lists the points that can be
+# the nearest one for some location inside of it, so a query only measures those.
+class NearestPointGrid(CellGrid):
+
+    def __init__(self, points, bounds_min, bounds_max, cell_count=4096):
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        super().__init__(self.points, self.points, bounds_min, bounds_max, cell_count)
+
+        # A location in a cell is at most half a diagonal from the center, so its
+        # nearest point is within bound of it, and within bound + half a diagonal
+        # of the center
+        cells = np.stack(np.meshgrid(*(np.arange(dim) for dim in self.dims), indexing='ij'), axis=-1).reshape(-1, 3)
+        centers = self.origin + (cells + 0.5) * self.cell_size
+        half_diagonal = 0.5 * np.sqrt(3) * self.cell_size
+        def distance(q, p):
+            return ((self.points[p] - centers[q]) ** 2).sum(axis=1)
+        bound = np.sqrt(distance(np.arange(len(cells)), self.search(centers, distance))) + half_diagonal if self.count else np.zeros(len(cells))
+        owner, point = self.within(centers, bound + half_diagonal, distance)
+
+        # Only the points that are within bound of the cell itself
+        low = self.origin + cells[owner] * self.cell_size
+        gap = np.maximum(np.maximum(low - self.points[point], self.points[point] - low - self.cell_size), 0)
+        keep = (gap ** 2).sum(axis=1) <= bound[owner] ** 2
+        self.candidates = point[keep]
+        self.candidate_offsets = np.zeros(len(cells) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(owner[keep], minlength=len(cells)), out=self.candidate_offsets[1:])
+
+    def find(self, queries):
+        """ Returns the index of the nearest point for every query """
+        queries = np.asarray(queries, dtype=np.float64).reshape(-1, 3)
+        result = np.full(len(queries), -1, dtype=np.int64)
+        if self.count == 0:
+            return result
+
+        cell = np.floor((queries - self.origin) / self.cell_size).astype(np.int64)
+        inside = np.all((cell >= 0) & (cell < self.dims), axis=1)
+
+        # Locations outside of the grid are rare, those search ring by ring
+        outside = np.nonzero(~inside)[0]
+        if len(outside):
+            far = queries[outside]
+            result[outside] = self.search(far, lambda q, p: ((self.points[p] - far[q]) ** 2).sum(axis=1))
+
+        index = np.nonzero(inside)[0]
+        if len(index) == 0:
+            return result
+
+        flat = self.flat(cell[index])
+        start = self.candidate_offsets[flat]
+        count = self.candidate_offsets[flat + 1] - start
+
+        owner = np.repeat(np.arange(len(index)), count)
+        first = np.cumsum(count) - count
+        slot = np.arange(len(owner)) - np.repeat(first, count)
+        candidate = self.candidates[np.repeat(start, count) + slot]
+        distance = ((self.points[candidate] - queries[index][owner]) ** 2).sum(axis=1)
+
+        # Pad the candidates of every query into a row and take the closest one
+        dense = np.full((len(index), int(count.max())), np.inf)
+        dense[owner, slot] = distance
+        result[index] = candidate[first + dense.argmin(axis=1)]
+        return result
@@ -0,0 +1,342 @@
+import math
+import numpy as np
+
+# Seam allowance outlines: the outlines of a piece grown by a distance.
+#
+# Every border is first offset on its own, corners get a round or a miter
+# join and inner corners are simply connected through the original corner.
+# Those raw curves cross themselves and each other wherever the allowance
+# would overlap, so they are cleaned up like a union of everything they go
+# around: crossings are found on a grid, a single walk along every curve
+# tracks the winding number on its outer side, and only the parts with
+# nothing around them are kept and chained back into closed outlines.
+
+def signed_area(points):
+    x = points[:, 0]
+    y = points[:, 1]
+    return 0.5 * float(np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y))
+
+def clean(points, epsilon):
+    """ Open polyline without repeated points, the closing point included """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    keep = np.linalg.norm(points - np.roll(points, 1, axis=0), axis=1) > epsilon
+    if not keep.any():
+        return points[:1]
+    return points[keep]
+
+def simplify(points, tolerance, span=0.0):
+    """ Douglas-Peucker simplification of a loop with the piece on its left.
+    Points aren't moved and sharp corners are kept.
+
+    Bumps to the outside change the outline by at most tolerance. Notches
+    into the inside are filled whatever their depth when they are at most
+    span wide: the allowance closes them anyway """
+    closed = np.vstack((points, points[:1]))
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = True
+    # The loop is split at the point farthest from the first one
+    far = int(np.argmax(np.linalg.norm(points - points[0], axis=1)))
+    keep[far] = True
+
+    stack = [(0, far), (far, len(points))]
+    while stack:
+        i, j = stack.pop()
+        if j - i < 2:
+            continue
+        a = closed[i]
+        b = closed[j]
+        between = closed[i + 1:j]
+        ab = b - a
+        length = float(np.sqrt(ab @ ab))
+        t = np.clip(((between - a) @ ab) / max(length * length, 1e-300), 0, 1)
+        distance = np.linalg.norm(between - (a + t[:, None] * ab), axis=1)
+        # Which side of the line through a and b the points are on
+        side = ab[0] * (between[:, 1] - a[1]) - ab[1] * (between[:, 0] - a[0])
+        outside = np.where(side > 0, 0.0, distance)
+        inside = np.where(side > 0, distance, 0.0)
+
+        k = int(np.argmax(outside))
+        if outside[k] <= tolerance:
+            k = int(np.argmax(inside))
+            if inside[k] <= tolerance or length <= span:
+                continue
+        keep[i + 1 + k] = True
+        stack.append((i, i + 1 + k))
+        stack.append((i + 1 + k, j))
+    return points[keep]
+
+def offset_loop(points, distance, join, miter_limit, tolerance):
+    """ Raw offset of a loop that goes around its inside counter-clockwise,
+    so the offset is to the right of it """
+    following = np.roll(points, -1, axis=0)
+    direction = following - points
+    direction /= np.linalg.norm(direction, axis=1)[:, None]
+    normal = np.stack((direction[:, 1], -direction[:, 0]), axis=1)
+
+    # Angle between the points of a round join
+    step = 2 * math.acos(max(-1.0, 1 - tolerance / distance)) if tolerance < distance else math.pi / 2
+    step = max(step, math.pi / 64)
+
+    lengths = np.linalg.norm(following - points, axis=1)
+
+    result = []
+    count = len(points)
+    for i in range(count):
+        p = points[i]
+        n1 = normal[i - 1]
+        n2 = normal[i]
+        d1 = direction[i - 1]
+        d2 = direction[i]
+        cross = d1[0] * d2[1] - d1[1] * d2[0]
+        dot = float(np.dot(n1, n2))
+
+        if cross > 1e-12 or (cross >= -1e-12 and dot < 0):
+            # Outer corner, or turning back on itself
+            if join == 'MITER' and 1 + dot > 2 / (miter_limit * miter_limit):
+                result.append(p + distance * (n1 + n2) / (1 + dot))
+            elif join == 'MITER':
+                # Too sharp for a miter, it is squared off at the miter limit
+                bisector = n1 + n2
+                bisector_length = float(np.linalg.norm(bisector))
+                bisector = bisector / bisector_length if bisector_length > 1e-12 else d1
+                along = (miter_limit - float(np.dot(n1, bisector))) * distance / float(np.dot(d1, bisector))
+                result.append(p + distance * n1 + along * d1)
+                result.append(p + distance * n2 - along * d2)
+            else:
+                start = math.atan2(n1[1], n1[0])
+                angle = math.acos(max(-1.0, min(1.0, dot)))
+                steps = max(1, int(math.ceil(angle / step)))
+                for k in range(steps + 1):
+                    a = start + angle * k / steps
+                    result.append(p + distance * np.array((math.cos(a), math.sin(a))))
+        elif cross < -1e-12:
+            # Inner corner. When both edges are long enough, with room for
+            # the corners on their other ends, the offset edges meet right
+            # there. Otherwise they are connected through the corner and
+            # the little loop this makes is cleaned up later. The corner is
+            # moved a hair into the piece, so the connections of two right
+            # angles on one short edge cross instead of overlapping
+            reach = distance * abs(cross) / (1 + dot) if dot > -1 + 1e-12 else float('inf')
+            if reach <= min(lengths[i - 1], lengths[i]) / 2:
+                result.append(p + distance * (n1 + n2) / (1 + dot))
+            else:
+                inward = n1 + n2
+                result.append(p + distance * n1)
+                result.append(p - distance * 1e-4 * inward / max(float(np.linalg.norm(inward)), 1e-12))
+                result.append(p + distance * n2)
+        else:
+            result.append(p + distance * n1)
+
+    return np.array(result)
+
+def sorted_unique(values):
+    values = np.sort(values)
+    return values[np.r_[True, values[1:] != values[:-1]]]
+
+def segment_pairs(start, end, cell_size):
+    """ Pairs of segments that can cross, as two index arrays. Segments are
+    sampled at half a cell, every sample puts the segment in the 3 x 3 cells
+    around it, so crossing segments always share a cell """
+    lengths = np.linalg.norm(end - start, axis=1)
+    steps = np.ceil(lengths / (cell_size / 2)).astype(np.int64) + 1
+    segment = np.repeat(np.arange(len(start)), steps)
+    t = (np.arange(steps.sum()) - np.repeat(np.cumsum(steps) - steps, steps)) / np.repeat(np.maximum(steps - 1, 1), steps)
+    cell = np.floor((start[segment] + t[:, None] * (end[segment] - start[segment])) / cell_size).astype(np.int64)
+
+    cell -= cell.min(axis=0) - 1
+    columns = int(cell[:, 0].max()) + 2
+    key = cell[:, 1] * columns + cell[:, 0]
+    key = np.concatenate([key + dy * columns + dx for dy in (-1, 0, 1) for dx in (-1, 0, 1)])
+    segment = np.tile(segment, 9)
+
+    # Every segment once per cell, sorted by cell
+    entries = sorted_unique(key * len(start) + segment)
+    key = entries // len(start)
+    segment = entries % len(start)
+
+    # Pair every entry with the ones after it in the same cell
+    run_start = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+    run_length = np.diff(np.r_[run_start, len(key)])
+    remaining = np.repeat(run_length, run_length) - (np.arange(len(key)) - np.repeat(run_start, run_length)) - 1
+
+    first = []
+    second = []
+    index = np.flatnonzero(remaining > 0)
+    k = 1
+    while len(index):
+        first.append(segment[index])
+        second.append(segment[index + k])
+        k += 1
+        index = index[remaining[index] >= k]
+    if not first:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    first = np.concatenate(first)
+    second = np.concatenate(second)
+    pairs = sorted_unique(np.minimum(first, second) * len(start) + np.maximum(first, second))
+    return pairs // len(start), pairs % len(start)
+
+def winding_number(point, start, end):
+    """ Winding number of all segments around point """
+    above = start[:, 1] <= point[1]
+    upward = above & (end[:, 1] > point[1])
+    downward = ~above & (end[:, 1] <= point[1])
+    side = (end[:, 0] - start[:, 0]) * (point[1] - start[:, 1]) - (point[0] - start[:, 0]) * (end[:, 1] - start[:, 1])
+    return int(np.count_nonzero(upward & (side > 0)) - np.count_nonzero(downward & (side < 0)))
+
+def offset_outlines(polylines, distance, join='ROUND', miter_limit=2.0, tolerance=0.1):
+    """ Grows the closed polylines of one piece by distance. The biggest one
+    is the outside of the piece, the others are holes in it.
+
+    join is 'ROUND' or 'MITER', round joins are at most tolerance away from
+    a real circle. Returns closed polylines, with the first point repeated """
+    loops = []
+    extent = 0.0
+    for points in polylines:
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if len(points) < 3:
+            continue
+        extent = max(extent, float(np.abs(points).max()))
+        loops.append(points)
+    if not loops or distance <= 0:
+        return [[tuple(p) for p in points] for points in loops]
+
+    epsilon = max(extent, 1.0) * 1e-9
+    loops = [clean(points, epsilon) for points in loops]
+    loops = [points for points in loops if len(points) >= 3]
+    areas = [signed_area(points) for points in loops]
+    if not loops:
+        return []
+
+    # The outside goes counter-clockwise and the holes clockwise, so the
+    # inside of the piece is always on the left
+    outside = int(np.argmax(np.abs(areas)))
+    for i, area in enumerate(areas):
+        if (area < 0) == (i == outside):
+            loops[i] = loops[i][::-1]
+
+    # Detail much smaller than the tolerance or the allowance doesn't change
+    # the result, but every inner corner adds crossings. A notch of width w
+    # changes the allowance by at most w * w / (8 * distance), so jagged
+    # edges are smoothed down to a few points per allowance width
+    simplify_tolerance = max(tolerance / 2, distance / 64)
+    span = math.sqrt(8 * distance * simplify_tolerance)
+    loops = [simplify(points, simplify_tolerance, span) for points in loops]
+    loops = [points for points in loops if len(points) >= 3]
+
+    raw = [offset_loop(points, distance, join, miter_limit, tolerance) for points in loops]
+    raw = [clean(points, epsilon) for points in raw]
+    raw = [points for points in raw if len(points) >= 3]
+
+    # All segments of all curves, segment s goes from start[s] to end[s]
+    loop_of = np.concatenate([np.full(len(points), i) for i, points in enumerate(raw)])
+    first_segment = np.cumsum([0] + [len(points) for points in raw])
+    start = np.concatenate(raw)
+    end = np.concatenate([np.roll(points, -1, axis=0) for points in raw])
+
+    # Crossings, on a grid sized by the allowance: what is left of jagged
+    # edges are connections as long as the allowance, with cells much
+    # smaller than that every one of them lands in a lot of cells
+    cell_size = max(distance / 4, tolerance, epsilon)
+    a, b = segment_pairs(start, end, cell_size)
+
+    # Neighboring segments of a curve touch in their shared point
+    position = np.arange(len(start)) - first_segment[loop_of]
+    size = first_segment[loop_of + 1] - first_segment[loop_of]
+    neighbors = (loop_of[a] == loop_of[b]) & (
+        ((position[a] + 1) % size[a] == position[b]) | ((position[b] + 1) % size[b] == position[a])
+    )
+    a = a[~neighbors]
+    b = b[~neighbors]
+
+    da = end[a] - start[a]
+    db = end[b] - start[b]
+    denominator = da[:, 0] * db[:, 1] - da[:, 1] * db[:, 0]
+    offset = start[b] - start[a]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = (offset[:, 0] * db[:, 1] - offset[:, 1] * db[:, 0]) / denominator
+        u = (offset[:, 0] * da[:, 1] - offset[:, 1] * da[:, 0]) / denominator
+    hit = (denominator != 0) & (t >= 0) & (t < 1) & (u >= 0) & (u < 1)
+    a, b, t, u, denominator = a[hit], b[hit], t[hit], u[hit], denominator[hit]
+    crossing_point = start[a] + t[:, None] * (end[a] - start[a])
+
+    # Every crossing shows up on both segments. Passing it changes the
+    # winding number on both sides of a curve by one, up when the other
+    # curve comes from the right
+    crossing = np.arange(len(a))
+    event_segment = np.concatenate((a, b))
+    event_t = np.concatenate((t, u))
+    event_crossing = np.concatenate((crossing, crossing))
+    event_change = np.concatenate((np.where(denominator < 0, 1, -1), np.where(denominator > 0, 1, -1)))
+    order = np.lexsort((event_t, event_segment))
+    event_segment = event_segment[order]
+    event_t = event_t[order]
+    event_crossing = event_crossing[order]
+    event_change = event_change[order]
+    event_offsets = np.searchsorted(event_segment, first_segment)
+
+    # Stretches of the curves between crossings, the ones with nothing on
+    # their outside are part of the result
+    runs = []
+    for i, points in enumerate(raw):
+        events = np.arange(event_offsets[i], event_offsets[i + 1])
+        s0 = first_segment[i]
+
+        # Winding number on the right of the start of the curve
+        first_t = event_t[events[0]] if len(events) and event_segment[events[0]] == s0 else 1.0
+        direction = end[s0] - start[s0]
+        right = np.array((direction[1], -direction[0])) / max(np.linalg.norm(direction), epsilon)
+        probe = start[s0] + direction * first_t / 2 + right * max(extent, 1.0) * 1e-7
+        winding = winding_number(probe, start, end)
+
+        if len(events) == 0:
+            if winding == 0:
+                runs.append((None, None, points))
+            continue
+
+        # The winding number after every crossing, only the stretches that
+        # end up with nothing outside of them are walked
+        n = len(points)
+        following = np.roll(events, -1)
+        after = winding + np.cumsum(event_change[events])
+        for k in np.flatnonzero(after == 0):
+            here = events[k]
+            there = following[k]
+            steps = (event_segment[there] - event_segment[here]) % n
+            if steps == 0 and k == len(events) - 1:
+                steps = n
+            segments = s0 + (event_segment[here] - s0 + 1 + np.arange(steps)) % n
+            runs.append((event_crossing[here], event_crossing[there], np.concatenate((
+                crossing_point[event_crossing[here]][None], start[segments], crossing_point[event_crossing[there]][None]
+            ))))
+
+    # Chain the kept stretches through the crossings they end in
+    starting = {}
+    for index, run in enumerate(runs):
+        if run[0] is not None:
+            starting.setdefault(run[0], []).append(index)
+
+    used = [False] * len(runs)
+    result = []
+    for index, run in enumerate(runs):
+        if used[index]:
+            continue
+        used[index] = True
+        if run[0] is None:
+            outline = run[2]
+        else:
+            parts = [run[2][:-1]]
+            next_crossing = run[1]
+            while True:
+                following = [j for j in starting.get(next_crossing, []) if not used[j]]
+                if not following:
+                    break
+                used[following[0]] = True
+                parts.append(runs[following[0]][2][:-1])
+                next_crossing = runs[following[0]][1]
+            outline = np.concatenate(parts)
+
+        if len(outline) >= 3 and abs(signed_area(outline)) > distance * distance * 1e-3:
+            result.append([tuple(p) for p in outline] + [tuple(outline[0])])
+
+    return result
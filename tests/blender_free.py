@@ -0,0 +1,8 @@
+import pytest
+
+
+def pytest_collect_directory(path, parent):
+    # pytest imports the __init__ of a package before running the tests in
+    # it, and the one of the add-on imports bpy
+    if path == parent.config.rootpath:
+        return pytest.Dir.from_parent(parent, path=path)
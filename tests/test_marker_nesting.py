@@ -0,0 +1,68 @@
+import numpy as np
+
+import marker_nesting
+
+
+def square(size, x=0.0, y=0.0):
+    return [[(x, y), (x + size, y), (x + size, y + size), (x, y + size), (x, y)]]
+
+
+def placed_cells(pieces, placements, cell_size):
+    """ Rasterized pieces at their placements, as sets of cells """
+    cells = []
+    for polylines, (x, y, turns) in zip(pieces, placements):
+        turned = [marker_nesting.turn(p, turns) for p in polylines]
+        min_x, min_y, _, _ = marker_nesting.polyline_bounds(turned)
+        mask = marker_nesting.rasterize([p - (min_x, min_y) for p in turned], cell_size)
+        rows, columns = np.nonzero(mask)
+        cells.append({(int(round(y / cell_size)) + r, int(round(x / cell_size)) + c) for r, c in zip(rows, columns)})
+    return cells
+
+
+def test_turn():
+    points = marker_nesting.turn([(1, 0)], 1)
+    assert np.allclose(points, [(0, -1)])
+    assert np.allclose(marker_nesting.turn([(1, 2)], 4), [(1, 2)])
+
+
+def test_rasterize_fills_the_inside():
+    mask = marker_nesting.rasterize(square(50), 5.0)
+    assert mask.shape == (11, 11)
+    assert mask[:10, :10].all()
+
+
+def test_pieces_fit_the_width_and_dont_overlap():
+    rng = np.random.default_rng(0)
+    pieces = [square(float(size)) for size in rng.uniform(20, 120, 25)]
+    placements, length, _ = marker_nesting.nest(pieces, 400, cell_size=5.0, spacing=5.0, time_budget=0.5)
+
+    assert all(placement is not None for placement in placements)
+    for polylines, (x, y, turns) in zip(pieces, placements):
+        turned = np.concatenate([marker_nesting.turn(p, turns) for p in polylines])
+        width = turned[:, 0].max() - turned[:, 0].min()
+        assert x >= 0 and x + width <= 400 + 5.0
+    cells = placed_cells(pieces, placements, 5.0)
+    for i, a in enumerate(cells):
+        assert not any(a & b for b in cells[i + 1:])
+    assert length > 0
+
+
+def test_pieces_wider_than_the_fabric_are_left_out():
+    placements, _, _ = marker_nesting.nest([square(500), square(50)], 200, rotation='NONE', time_budget=0)
+    assert placements[0] is None
+    assert placements[1] is not None
+
+
+def test_more_time_never_makes_the_marker_longer():
+    rng = np.random.default_rng(1)
+    pieces = [square(float(size)) for size in rng.uniform(20, 100, 20)]
+    _, first, stats = marker_nesting.nest(pieces, 300, time_budget=0)
+    assert stats["attempts"] == 1 and stats["first_length"] == first
+
+    placements, improved, stats = marker_nesting.nest(pieces, 300, time_budget=1.0)
+    assert stats["attempts"] > 1
+    assert improved <= first and stats["first_length"] == first
+    # Layouts that reuse the pieces before a swap still don't overlap
+    cells = placed_cells(pieces, placements, 5.0)
+    for i, a in enumerate(cells):
+        assert not any(a & b for b in cells[i + 1:])
@@ -0,0 +1,101 @@
+import math
+import random
+
+import mesh_islands
+
+
+class Loop:
+    __slots__ = ("vert", "link_loop_next")
+
+
+class Vector(tuple):
+    """ The parts of mathutils.Vector that collapse_short_edges uses """
+
+    def copy(self):
+        return Vector(self)
+
+    def __add__(self, other):
+        return Vector(a + b for a, b in zip(self, other))
+
+    def __sub__(self, other):
+        return Vector(a - b for a, b in zip(self, other))
+
+    def __truediv__(self, value):
+        return Vector(a / value for a in self)
+
+    @property
+    def length(self):
+        return math.sqrt(sum(a * a for a in self))
+
+
+class Vert:
+    __slots__ = ("co",)
+
+    def __init__(self, x, y=0.0, z=0.0):
+        self.co = Vector((x, y, z))
+
+
+def rings(*sizes):
+    loops = []
+    for ring_index, size in enumerate(sizes):
+        ring = [Loop() for _ in range(size)]
+        for i, loop in enumerate(ring):
+            loop.vert = (ring_index, i)
+            loop.link_loop_next = ring[(i + 1) % size]
+        loops += ring
+    return loops
+
+
+def test_chain_loops_follows_every_outline():
+    loops = rings(12, 5, 30)
+    random.Random(0).shuffle(loops)
+
+    groups = mesh_islands.chain_loops(loops)
+
+    assert sorted(len(group) for group in groups) == [5, 12, 30]
+    for group in groups:
+        # Every loop ends where the next one starts
+        for loop, following in zip(group, group[1:]):
+            assert loop.link_loop_next is following
+        assert len({loop.vert[0] for loop in group}) == 1
+
+
+def test_chain_loops_takes_loops_in_either_direction():
+    a, b, c = (Loop() for _ in range(3))
+    a.vert, a.link_loop_next = 0, Loop()
+    a.link_loop_next.vert = 1
+    # b runs from 2 back to 1
+    b.vert, b.link_loop_next = 2, Loop()
+    b.link_loop_next.vert = 1
+    c.vert, c.link_loop_next = 2, Loop()
+    c.link_loop_next.vert = 3
+
+    assert mesh_islands.chain_loops([a, b, c]) == [[a, b, c]]
+
+
+def test_collapse_merges_short_edges():
+    verts = [Vert(x) for x in (0.0, 0.1, 1.0, 1.05, 2.0)]
+    edges = list(zip(verts, verts[1:]))
+
+    result = mesh_islands.collapse_short_edges(edges, 0.5)
+
+    groups = sorted((position[0], sorted(v.co[0] for v in members)) for position, members in result)
+    assert [members for _, members in groups] == [[0.0, 0.1], [1.0, 1.05], [2.0]]
+    assert [round(x, 6) for x, _ in groups] == [0.05, 1.025, 2.0]
+
+
+def test_collapse_keeps_the_last_edge():
+    verts = [Vert(x * 0.01) for x in range(6)]
+    result = mesh_islands.collapse_short_edges(list(zip(verts, verts[1:])), 1.0)
+    # Six verts and five edges, four collapses leave one edge between two groups
+    assert len(result) == 2
+    assert sum(len(members) for _, members in result) == 6
+
+
+def test_collapse_stops_at_long_edges():
+    verts = [Vert(x * 0.1) for x in range(8)] + [Vert(10.0)]
+    result = mesh_islands.collapse_short_edges(list(zip(verts, verts[1:])), 1.0)
+    assert len(result) == 2
+    assert sorted(len(m) for _, m in result) == [1, 8]
+    position = next(p for p, m in result if len(m) == 8)
+    assert 0.0 < position[0] < 0.7
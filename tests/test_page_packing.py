@@ -0,0 +1,42 @@
+import page_packing
+
+
+def overlaps(a, b):
+    return a[0] < b[0] + b[2] and b[0] < a[0] + a[2] and a[1] < b[1] + b[3] and b[1] < a[1] + a[3]
+
+
+def test_pieces_stay_on_the_page_and_apart():
+    sizes = [(60, 40), (30, 80), (90, 90), (20, 20), (45, 45), (70, 10), (10, 70), (50, 25)] * 3
+    placements, page_count = page_packing.pack(sizes, 210, 297, spacing=5)
+
+    rects = {}
+    for (width, height), placement in zip(sizes, placements):
+        page, x, y, rotated = placement
+        if rotated:
+            width, height = height, width
+        assert x >= 0 and y >= 0 and x + width <= 210 and y + height <= 297
+        rects.setdefault(page, []).append((x, y, width + 5, height + 5))
+
+    assert sorted(rects) == list(range(page_count))
+    for rects_on_page in rects.values():
+        for i, a in enumerate(rects_on_page):
+            assert not any(overlaps(a, b) for b in rects_on_page[i + 1:])
+
+
+def test_pieces_share_a_page_when_they_fit():
+    placements, page_count = page_packing.pack([(90, 90)] * 4, 200, 200, spacing=5)
+    assert page_count == 1
+    assert len({(x, y) for _, x, y, _ in placements}) == 4
+
+
+def test_oversized_pieces_are_left_out():
+    placements, page_count = page_packing.pack([(300, 10), (10, 10)], 200, 200, rotate=False)
+    assert placements[0] is None
+    assert placements[1] is not None
+    assert page_count == 1
+
+
+def test_rotation_fits_long_pieces():
+    placements, _ = page_packing.pack([(250, 50)], 100, 300, spacing=0)
+    assert placements[0] is not None and placements[0][3]
+    assert page_packing.pack([(250, 50)], 100, 300, rotate=False, spacing=0)[0] == [None]
@@ -0,0 +1,43 @@
+import page_tiling
+import pattern_svg
+
+
+def test_segment_intersects_rect():
+    rect = (0, 0, 10, 10)
+    assert page_tiling.segment_intersects_rect((-5, 5), (15, 5), rect)
+    assert page_tiling.segment_intersects_rect((2, 2), (3, 3), rect)
+    assert not page_tiling.segment_intersects_rect((-5, -5), (-1, 20), rect)
+    # Passes the corner on the outside
+    assert not page_tiling.segment_intersects_rect((8, 12), (12, 8.5), rect)
+
+
+def test_grid_covers_the_bounds():
+    grid = page_tiling.TileGrid((0, 0, 250, 90), 100, 100, 10, 5)
+    assert (grid.columns, grid.rows) == (3, 2)
+    assert grid.tile_rect(0, 0) == (-5, -5, 95, 95)
+    assert grid.tile_rect(1, 1) == (85, 85, 185, 185)
+
+
+def test_tiles_for_segment_matches_every_tile():
+    grid = page_tiling.TileGrid((0, 0, 400, 400), 100, 100, 10, 0)
+    segments = [((5, 5), (395, 390)), ((10, 300), (300, 20)), ((50, 50), (60, 60)), ((0, 200), (400, 200))]
+    for p0, p1 in segments:
+        expected = {
+            (column, row)
+            for column in range(grid.columns) for row in range(grid.rows)
+            if page_tiling.segment_intersects_rect(p0, p1, grid.tile_rect(column, row))
+        }
+        assert grid.tiles_for_segment(p0, p1) == expected
+
+
+def test_plan_pages_leaves_out_empty_pages():
+    group = pattern_svg.PatternGroup()
+    group.outlines.append([(0, 0), (50, 0), (50, 50), (0, 50), (0, 0)])
+    group.outlines.append([(250, 250), (260, 250), (260, 260), (250, 250)])
+    grid = page_tiling.TileGrid(group.bounds(), 100, 100, 0, 0)
+
+    pages = page_tiling.plan_pages(group, grid)
+
+    assert [(page.column, page.row) for page in pages] == [(0, 0), (2, 2)]
+    assert pages[0].outlines == [group.outlines[0]]
+    assert pages[1].outlines == [group.outlines[1]]
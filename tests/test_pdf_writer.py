@@ -0,0 +1,46 @@
+import re
+
+import pdf_writer
+
+
+def saved_pages(pdf, tmp_path):
+    """ The saved file, and the media box and user unit of every page """
+    path = tmp_path / "output.pdf"
+    pdf.save(str(path))
+    data = path.read_bytes().decode('latin-1')
+    pages = [
+        (float(width), float(height), float(unit or 1))
+        for width, height, unit in re.findall(r'/MediaBox \[0 0 ([\d.]+) ([\d.]+)\] (?:/UserUnit (\d+) )?', data)
+    ]
+    return data, pages
+
+
+def test_long_marker_stays_under_the_page_limit(tmp_path):
+    # About 300 pieces nested on a 1.5 m wide roll
+    width, length = 1500, 13000
+    scale = pdf_writer.POINTS_PER_MM
+    canvas = pdf_writer.PdfCanvas()
+    canvas.line(0, 0, width * scale, length * scale)
+    pdf = pdf_writer.PdfDocument(compress=False)
+    pdf.add_page(width * scale, length * scale, canvas)
+
+    data, [(page_width, page_height, unit)] = saved_pages(pdf, tmp_path)
+
+    assert data.startswith('%PDF-1.6\n')
+    assert max(page_width, page_height) <= pdf_writer.MAX_PAGE_SIZE
+    # Still printed at full size
+    assert abs(page_width * unit - width * scale) < 0.01
+    assert abs(page_height * unit - length * scale) < 0.01
+    assert '\nstream\n%.6g 0 0 %.6g 0 0 cm\n' % (1 / unit, 1 / unit) in data
+
+
+def test_small_pages_stay_pdf_1_4(tmp_path):
+    pdf = pdf_writer.PdfDocument()
+    pdf.add_page(595, 842, pdf_writer.PdfCanvas())
+    pdf.add_page(pdf_writer.MAX_PAGE_SIZE, 842, pdf_writer.PdfCanvas())
+
+    data, pages = saved_pages(pdf, tmp_path)
+
+    assert data.startswith('%PDF-1.4\n')
+    assert ' cm\n' not in data
+    assert pages == [(595, 842, 1), (pdf_writer.MAX_PAGE_SIZE, 842, 1)]
@@ -0,0 +1,127 @@
+import importlib
+import json
+import os
+import sys
+import types
+
+import pytest
+
+
+class FakeObject:
+
+    def __init__(self, name):
+        self.name = name
+        self.selected = False
+
+    def select_set(self, state):
+        self.selected = state
+
+
+class FakeObjects(list):
+    """ view_layer.objects, a collection with an active object """
+    active = None
+
+
+@pytest.fixture
+def pipeline(monkeypatch, tmp_path):
+    """ pipeline with the parts of bpy it uses faked, the add-on folder has
+    a name that isn't a valid Python name """
+    calls = []
+    view_layer = types.SimpleNamespace(objects=FakeObjects())
+
+    def export_sewingpattern(**options):
+        calls.append(options)
+        return {'FINISHED'}
+
+    bpy = types.SimpleNamespace(
+        app=types.SimpleNamespace(binary_path="/opt/blender/blender", background=True),
+        path=types.SimpleNamespace(
+            abspath=lambda path: str(tmp_path / path[2:]) if path.startswith("//") else path,
+            clean_name=lambda name: name.replace(" ", "_"),
+        ),
+        context=types.SimpleNamespace(view_layer=view_layer),
+        ops=types.SimpleNamespace(object=types.SimpleNamespace(export_sewingpattern=export_sewingpattern)),
+    )
+    monkeypatch.setitem(sys.modules, "bpy", bpy)
+    monkeypatch.delitem(sys.modules, "pipeline", raising=False)
+    module = importlib.import_module("pipeline")
+    monkeypatch.setattr(module, "__package__", "blender-seams-to-sewing-pattern")
+    module.export_calls = calls
+    module.view_layer = view_layer
+    yield module
+    sys.modules.pop("pipeline", None)
+
+
+def test_run_files_splits_the_cores(pipeline, monkeypatch, tmp_path):
+    commands = []
+
+    def run(command, **kwargs):
+        with open(command[command.index("--config") + 1]) as f:
+            commands.append((command, json.load(f)))
+        return types.SimpleNamespace(returncode=0 if len(commands) % 2 else 3, stdout="")
+
+    monkeypatch.setattr(pipeline.subprocess, "run", run)
+    monkeypatch.setattr(pipeline.os, "cpu_count", lambda: 8)
+    files = [str(tmp_path / f"{name}.blend") for name in "abcd"]
+    config = {**pipeline.default_config, "files": files, "workers": 2,
+              "remesh": {"iterations": 20}, "pattern": {"target_tris": 3000}}
+
+    results = pipeline.run_files(config)
+
+    assert sorted(results) == files
+    assert sorted(results.values()) == [0, 0, 3, 3]
+    assert sorted(command[2] for command, _ in commands) == files
+    for command, single in commands:
+        assert command[:2] == ["/opt/blender/blender", "-b"]
+        assert command[3] == "--python-expr"
+        # Two files at a time share the 8 cores
+        assert single["pattern"] == {"workers": 4, "target_tris": 3000}
+        assert single["remesh"] == {"workers": 4, "iterations": 20}
+        assert "files" not in single and "workers" not in single
+
+
+def test_run_files_keeps_the_given_workers(pipeline, monkeypatch, tmp_path):
+    configs = []
+
+    def run(command, **kwargs):
+        with open(command[command.index("--config") + 1]) as f:
+            configs.append(json.load(f))
+        return types.SimpleNamespace(returncode=0, stdout="")
+
+    monkeypatch.setattr(pipeline.subprocess, "run", run)
+    monkeypatch.setattr(pipeline.os, "cpu_count", lambda: 8)
+    config = {**pipeline.default_config, "files": [str(tmp_path / "a.blend")], "pattern": {"workers": 1}}
+
+    pipeline.run_files(config)
+
+    assert configs[0]["pattern"] == {"workers": 1}
+    assert configs[0]["remesh"] is None
+
+
+def test_child_expression_imports_the_add_on(pipeline, monkeypatch, tmp_path):
+    expressions = []
+    monkeypatch.setattr(pipeline.subprocess, "run", lambda command, **kwargs: (
+        expressions.append(command[command.index("--python-expr") + 1]) or types.SimpleNamespace(returncode=0, stdout="")
+    ))
+    pipeline.run_files({**pipeline.default_config, "files": [str(tmp_path / "a.blend")]})
+
+    ran = []
+    add_on = types.SimpleNamespace(main=lambda: ran.append(True))
+    monkeypatch.setitem(sys.modules, "blender-seams-to-sewing-pattern.pipeline", add_on)
+    exec(expressions[0], {})
+    assert ran == [True]
+
+
+def test_export_writes_to_the_output_directory(pipeline, tmp_path):
+    obj = FakeObject("Shirt front")
+    pipeline.view_layer.objects.extend([obj, FakeObject("Other")])
+    config = {**pipeline.default_config, "export": {"file_format": "SVG"}, "output_directory": "//patterns"}
+
+    status = pipeline.export(obj, config)
+
+    filepath = str(tmp_path / "patterns" / "Shirt_front.svg")
+    assert status == f"exported to {filepath}"
+    assert os.path.isdir(tmp_path / "patterns")
+    assert pipeline.export_calls == [{"filepath": filepath, "file_format": "SVG"}]
+    assert obj.selected and pipeline.view_layer.objects.active is obj
+    assert not pipeline.view_layer.objects[1].selected
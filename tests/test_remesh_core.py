@@ -0,0 +1,137 @@
+import sys
+import types
+
+import numpy as np
+import pytest
+
+import remesh_core
+import remesh_kernels
+
+
+def grid(size, jitter=0.3, seed=0):
+    """ A jittered grid of triangles over the unit square """
+    rng = np.random.default_rng(seed)
+    x, y = np.meshgrid(np.linspace(0, 1, size), np.linspace(0, 1, size), indexing='ij')
+    co = np.stack((x.ravel(), y.ravel(), np.zeros(size * size)), axis=1)
+    inner = (co[:, 0] > 0) & (co[:, 0] < 1) & (co[:, 1] > 0) & (co[:, 1] < 1)
+    co[inner, :2] += rng.uniform(-jitter, jitter, (inner.sum(), 2)) / size
+
+    corner = (np.arange(size - 1)[:, None] * size + np.arange(size - 1)[None, :]).ravel()
+    faces = np.concatenate((
+        np.stack((corner, corner + size, corner + size + 1), axis=1),
+        np.stack((corner, corner + size + 1, corner + 1), axis=1),
+    ))
+    return co, faces
+
+
+def bend(co):
+    """ Rolls the unit square up into half of a cylinder """
+    angle = co[:, 0] * np.pi
+    return np.stack((np.cos(angle) / np.pi, co[:, 1], np.sin(angle) / np.pi), axis=1)
+
+
+def test_remesh_island_reaches_the_edge_length():
+    co, faces = grid(20)
+    result = remesh_core.remesh_island({"co": co, "faces": faces}, {"edge_length": 0.05, "iterations": 10})
+
+    mesh = remesh_core.TriangleMesh(result["co"], result["faces"])
+    lengths = mesh.edge_lengths(mesh.edges())
+    assert abs(np.median(lengths) - 0.05) < 0.01
+    assert result["faces"].min() >= 0 and result["faces"].max() < len(result["co"])
+    # The outline stays where it was
+    assert np.allclose(result["co"].min(axis=0), co.min(axis=0))
+    assert np.allclose(result["co"].max(axis=0), co.max(axis=0))
+
+
+def test_converged():
+    busy = [(0.2, 0.05, 0.3)] * 4
+    assert not remesh_core.converged(busy[:3])
+    assert not remesh_core.converged(busy + [(0.1, 0.02, 0.2)] * 4)
+    # Quiet enough by itself
+    assert remesh_core.converged([(0.005, 0.001, 0.3)] * 4)
+    # Still busy, but no better than the window before
+    assert remesh_core.converged(busy * 2)
+
+
+def test_converge_stops_before_the_last_iteration():
+    co, faces = grid(30)
+    settings = {"edge_length": 0.025, "iterations": 30, "quads": False}
+    full = remesh_core.remesh_island({"co": co, "faces": faces}, settings)
+    early = remesh_core.remesh_island({"co": co, "faces": faces}, dict(settings, converge=True))
+
+    assert full["iterations"] == 30
+    assert early["iterations"] < 30
+    assert abs(len(early["faces"]) - len(full["faces"])) < 0.05 * len(full["faces"])
+
+
+def test_nearest_point_grid_matches_brute_force():
+    rng = np.random.default_rng(0)
+    for points in (rng.uniform(0, 1, (300, 3)) * (1, 1, 0), bend(rng.uniform(0, 1, (500, 3)))):
+        low = points.min(axis=0)
+        high = points.max(axis=0)
+        grid = remesh_kernels.NearestPointGrid(points, low, high, cell_count=len(points))
+        # Some of the queries are outside of the grid
+        queries = rng.uniform(low - 0.2, high + 0.2, (1000, 3))
+
+        found = grid.find(queries)
+
+        distance = ((queries[:, None] - points[None]) ** 2).sum(axis=2)
+        assert np.allclose(distance[np.arange(len(queries)), found], distance.min(axis=1))
+
+
+def test_surface_projector_matches_brute_force():
+    rng = np.random.default_rng(0)
+    # Large triangles around small ones, and a curved piece
+    for co, faces in (grid(6, jitter=0.45), (bend(grid(25)[0]), grid(25)[1])):
+        projector = remesh_core.SurfaceProjector(co, faces)
+        queries = co[rng.integers(len(co), size=500)] + rng.normal(0, 0.05, (500, 3))
+
+        projected = projector.project(queries)
+
+        corners = co[faces]
+        everywhere = remesh_core.closest_point_on_triangles(
+            np.repeat(queries, len(faces), axis=0),
+            np.tile(corners[:, 0], (len(queries), 1)),
+            np.tile(corners[:, 1], (len(queries), 1)),
+            np.tile(corners[:, 2], (len(queries), 1)),
+        ).reshape(len(queries), len(faces), 3)
+        closest = np.linalg.norm(everywhere - queries[:, None], axis=2).min(axis=1)
+        assert np.allclose(np.linalg.norm(projected - queries, axis=1), closest)
+
+
+def test_worker_processes_give_the_same_result(monkeypatch):
+    islands = [{"co": co, "faces": faces} for co, faces in (grid(12, seed=0), grid(15, seed=1))]
+    settings = {"edge_length": 0.08, "iterations": 5}
+    one_by_one = [remesh_core.remesh_island(island, settings) for island in islands]
+
+    # Workers load their own copy of the module, only remeshing in this
+    # process would fail
+    def in_this_process(island, settings):
+        raise AssertionError("remeshed without worker processes")
+    monkeypatch.setattr(remesh_core, "remesh_island", in_this_process)
+    in_workers = remesh_core.remesh_islands(islands, settings, workers=2)
+
+    for a, b in zip(in_workers, one_by_one):
+        assert np.array_equal(a["faces"], b["faces"])
+        assert np.allclose(a["co"], b["co"])
+
+
+def test_island_errors_are_raised_once(monkeypatch):
+    islands = [{"co": co, "faces": faces} for co, faces in (grid(5, seed=0), grid(5, seed=1))]
+
+    def in_this_process(island, settings):
+        raise AssertionError("remeshed again without worker processes")
+    monkeypatch.setattr(remesh_core, "remesh_island", in_this_process)
+
+    with pytest.raises(TypeError):
+        remesh_core.remesh_islands(islands, {"edge_length": 0.1, "unknown_setting": 1}, workers=2)
+
+
+def test_no_workers_when_python_is_blender(monkeypatch):
+    app = types.SimpleNamespace(binary_path=sys.executable)
+    monkeypatch.setitem(sys.modules, "bpy", types.SimpleNamespace(app=app))
+    assert remesh_core.spawn_problem() == "sys.executable is Blender, not Python"
+
+    islands = [{"co": co, "faces": faces} for co, faces in (grid(5, seed=0), grid(5, seed=1))]
+    results = remesh_core.remesh_islands(islands, {"edge_length": 0.2, "iterations": 2}, workers=2)
+    assert len(results) == 2
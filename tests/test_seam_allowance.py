@@ -0,0 +1,68 @@
+import numpy as np
+
+import seam_allowance
+
+
+def circle(radius, count, center=(0.0, 0.0), clockwise=False):
+    angle = np.linspace(0, 2 * np.pi, count, endpoint=False)
+    if clockwise:
+        angle = -angle
+    return np.stack((center[0] + radius * np.cos(angle), center[1] + radius * np.sin(angle)), axis=1)
+
+
+def distances_to_outline(points, outline):
+    """ Distance of every point to the closest segment of a closed outline """
+    start = np.asarray(outline, dtype=np.float64)
+    end = np.roll(start, -1, axis=0)
+    direction = end - start
+    t = np.clip(((points[:, None] - start[None]) * direction[None]).sum(axis=2) / (direction ** 2).sum(axis=1), 0, 1)
+    closest = start[None] + t[:, :, None] * direction[None]
+    return np.sqrt(((points[:, None] - closest) ** 2).sum(axis=2)).min(axis=1)
+
+
+def test_square_grows_by_the_distance():
+    square = [(0, 0), (100, 0), (100, 100), (0, 100)]
+    for join in ('ROUND', 'MITER'):
+        (outline,) = seam_allowance.offset_outlines([square], 10, join)
+        assert outline[0] == outline[-1]
+        points = np.array(outline[:-1])
+        assert np.allclose(points.min(axis=0), (-10, -10), atol=0.2)
+        assert np.allclose(points.max(axis=0), (110, 110), atol=0.2)
+        assert distances_to_outline(points, square).min() >= 10 - 0.2
+
+
+def test_round_joins_stay_within_the_tolerance():
+    square = [(0, 0), (100, 0), (100, 100), (0, 100)]
+    (outline,) = seam_allowance.offset_outlines([square], 10, 'ROUND', tolerance=0.1)
+    distance = distances_to_outline(np.array(outline[:-1]), square)
+    assert np.all(np.abs(distance - 10) <= 0.1 + 1e-6)
+
+
+def test_noisy_outline_keeps_its_distance():
+    rng = np.random.default_rng(0)
+    points = circle(50, 2000) * (1 + rng.uniform(-0.005, 0.005, (2000, 1)))
+    (outline,) = seam_allowance.offset_outlines([points], 5, 'ROUND')
+    distance = distances_to_outline(np.array(outline[:-1]), points)
+    assert distance.min() >= 5 - 0.2
+    # The jagged outline is simplified, not followed point by point
+    assert len(outline) < len(points)
+
+
+def test_holes_shrink():
+    outside = circle(100, 200)
+    hole = circle(40, 100, clockwise=True)
+    result = seam_allowance.offset_outlines([outside, hole], 10)
+    assert len(result) == 2
+    sizes = sorted(np.abs(np.array(r)).max() for r in result)
+    assert abs(sizes[0] - 30) < 1 and abs(sizes[1] - 110) < 1
+
+
+def test_hole_closes_when_it_is_too_small():
+    result = seam_allowance.offset_outlines([circle(100, 200), circle(5, 50)], 10)
+    assert len(result) == 1
+
+
+def test_nothing_to_grow():
+    square = [(0, 0), (1, 0), (1, 1), (0, 1)]
+    assert seam_allowance.offset_outlines([square], 0) == [[(0.0, 0.0), (1.0, 0.0), (1.0, 1.0), (0.0, 1.0)]]
+    assert seam_allowance.offset_outlines([[(0, 0), (1, 1)]], 5) == []